@@ -0,0 +1,103 @@
+"""
+Service-role data access (bypasses RLS) over the shared connection pool.
+
+Writes the API must make on a user's behalf but that RLS forbids (usage
+accounting, subscription changes from Stripe webhooks) go through here as
+plain async PostgREST calls. The synchronous supabase-py client used to do
+this blocked the event loop, and every live WebSocket on the worker with it,
+for a full round trip per call.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from cache import TTLCache
+from supabase_http import SupabaseSession
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+# Without the RPC: seconds already counted per session on this worker (sessions live on one socket)
+_counted_sessions = TTLCache(maxsize=10000, ttl=24 * 3600)
+
+
+def is_configured() -> bool:
+    return bool(SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY)
+
+
+def admin_session() -> SupabaseSession:
+    return SupabaseSession(
+        SUPABASE_URL,
+        headers={
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Content-Type": "application/json"
+        }
+    )
+
+
+async def update_profile(user_id: str, fields: Dict[str, Any]) -> bool:
+    """Patch one profile row; returns False when no such profile exists"""
+    async with admin_session() as client:
+        response = await client.patch(
+            "/rest/v1/profiles",
+            params={"id": f"eq.{user_id}", "select": "id"},
+            json=fields,
+            headers={"Prefer": "return=representation"}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Profile update failed: {response.text}")
+        return bool(response.json())
+
+
+async def increment_usage(user_id: str, seconds: int, session_id: str) -> Optional[int]:
+    """Count a session's recorded seconds against the user's usage; returns the new total.
+
+    `seconds` is the session's running total, not a delta: the increment_usage
+    RPC (migration 012) only adds what it hasn't counted for session_id yet,
+    so saving a session twice, or retrying a save, never double-counts.
+    """
+    async with admin_session() as client:
+        response = await client.post(
+            "/rest/v1/rpc/increment_usage",
+            json={"p_user_id": user_id, "p_seconds": seconds, "p_session_id": session_id}
+        )
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code != 404:
+            raise RuntimeError(f"increment_usage failed: {response.text}")
+
+        # RPC not deployed yet: read-modify-write (racy across sessions), adding only
+        # what this worker hasn't counted for the session yet
+        logger.warning("⚠️ increment_usage RPC missing (run migration 012); falling back to read + update")
+        counted = _counted_sessions.get(session_id, 0)
+        delta = max(seconds - counted, 0)
+        # Claimed before the round trips so an overlapping save of the same session adds nothing
+        _counted_sessions.set(session_id, counted + delta)
+        try:
+            res = await client.get(
+                "/rest/v1/profiles",
+                params={"id": f"eq.{user_id}", "select": "usage_seconds"}
+            )
+            if res.status_code != 200:
+                raise RuntimeError(f"Usage lookup failed: {res.text}")
+            if not res.json():
+                _counted_sessions.set(session_id, counted)
+                return None
+            total = res.json()[0].get("usage_seconds") or 0
+            if not delta:
+                return total
+            total += delta
+            res = await client.patch(
+                "/rest/v1/profiles",
+                params={"id": f"eq.{user_id}"},
+                json={"usage_seconds": total}
+            )
+            if res.status_code not in [200, 204]:
+                raise RuntimeError(f"Usage update failed: {res.text}")
+        except Exception:
+            _counted_sessions.set(session_id, counted)
+            raise
+        return total
@@ -0,0 +1,256 @@
+"""
+Audio buffering, WAV helpers and FLAC encoding for live recording sessions
+"""
+import asyncio
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Tuple, Union
+
+import flac
+
+# 16-bit PCM
+SAMPLE_WIDTH = 2
+WAV_HEADER_SIZE = 44
+# Size of the blocks handed to the uploader when streaming
+STREAM_BLOCK_SIZE = 256 * 1024
+
+# PCM kept in RAM per session before it is spilled to disk (~32s of 16kHz mono)
+AUDIO_BUFFER_MEMORY_BYTES = int(os.getenv("AUDIO_BUFFER_MEMORY_BYTES", str(1024 * 1024)))
+# Where spill files go (defaults to the system temp dir)
+AUDIO_SPILL_DIR = os.getenv("AUDIO_SPILL_DIR") or None
+# "flac" compresses finished sessions before upload; "wav" uploads raw PCM
+AUDIO_UPLOAD_FORMAT = os.getenv("AUDIO_UPLOAD_FORMAT", "flac").lower()
+AUDIO_ENCODER_WORKERS = int(os.getenv("AUDIO_ENCODER_WORKERS", "2"))
+
+_encoder_pool: Optional[ProcessPoolExecutor] = None
+
+
+def wav_header(data_size: int, sample_rate: int = 16000, channels: int = 1, sample_width: int = SAMPLE_WIDTH) -> bytes:
+    """Canonical 44-byte PCM WAV header for `data_size` bytes of audio"""
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, block_align, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+# Audio buffer class to store audio chunks during recording
+class AudioBuffer:
+    """PCM buffer for one live session that spills to a temp file.
+
+    The newest audio is copied into a preallocated bytearray window of
+    `memory_limit` bytes; once the window is full it is appended to the spill
+    file as raw PCM and a fresh window is started. Reads memory-map the spill
+    file and hand out memoryview slices, so neither RAM use nor copying grows
+    with recording length.
+    """
+
+    __slots__ = (
+        "sample_rate", "channels", "memory_limit", "spill_dir",
+        "_window", "_window_bytes", "_spilled_bytes", "_spill_file",
+    )
+
+    def __init__(self, memory_limit: Optional[int] = None, spill_dir: Optional[str] = None):
+        self.sample_rate = 16000
+        self.channels = 1
+        self.memory_limit = max(1, AUDIO_BUFFER_MEMORY_BYTES if memory_limit is None else memory_limit)
+        self.spill_dir = spill_dir or AUDIO_SPILL_DIR
+        self._window = bytearray(self.memory_limit)
+        self._window_bytes = 0
+        self._spilled_bytes = 0
+        self._spill_file = None
+
+    def add_chunk(self, chunk: bytes):
+        """Add audio chunk to buffer"""
+        end = self._window_bytes + len(chunk)
+        if end < self.memory_limit:
+            self._window[self._window_bytes:end] = chunk
+            self._window_bytes = end
+            return
+        data = memoryview(chunk).cast("B")
+        while data:
+            free = self.memory_limit - self._window_bytes
+            take = min(free, len(data))
+            # Same-length slice assignment never resizes, so exported views stay valid
+            self._window[self._window_bytes:self._window_bytes + take] = data[:take]
+            self._window_bytes += take
+            data = data[take:]
+            if self._window_bytes == self.memory_limit:
+                self._spill()
+
+    def _open_spill_file(self):
+        if self._spill_file is None:
+            # Named so the encoder process can open it; deleted when closed
+            self._spill_file = tempfile.NamedTemporaryFile(prefix="verbact-audio-", suffix=".pcm", dir=self.spill_dir)
+
+    def _spill(self):
+        """Append the window to the spill file and start a new one"""
+        if not self._window_bytes:
+            return
+        self._open_spill_file()
+        self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.write(memoryview(self._window)[:self._window_bytes])
+        self._spill_file.flush()
+        self._spilled_bytes += self._window_bytes
+        # Readers may still hold views of the old window, so it is replaced rather than reused
+        self._window = bytearray(self.memory_limit)
+        self._window_bytes = 0
+
+    def persist(self) -> Tuple[str, int]:
+        """Flush everything buffered so far to the spill file; returns (path, byte_count).
+
+        Audio added afterwards lands past `byte_count`, so readers of the
+        returned prefix are unaffected.
+        """
+        self._spill()
+        self._open_spill_file()
+        return self._spill_file.name, self._spilled_bytes
+
+    def get_byte_count(self) -> int:
+        """Total buffered PCM bytes (spilled + in memory)"""
+        return self._spilled_bytes + self._window_bytes
+
+    def get_memory_bytes(self) -> int:
+        """PCM bytes currently held in the in-RAM window"""
+        return self._window_bytes
+
+    def get_wav_size(self) -> int:
+        """Size of the WAV file iter_wav() produces"""
+        total = self.get_byte_count()
+        return WAV_HEADER_SIZE + total if total else 0
+
+    def _snapshot(self) -> Tuple[int, memoryview]:
+        # Taken up front so audio appended while streaming doesn't change what we yield
+        return self._spilled_bytes, memoryview(self._window)[:self._window_bytes]
+
+    def _iter_snapshot(self, spilled: int, window: memoryview, block_size: int) -> Iterator[memoryview]:
+        if spilled:
+            # Not closed explicitly: the mapping is released once the last yielded view is dropped
+            mapped = memoryview(mmap.mmap(self._spill_file.fileno(), spilled, access=mmap.ACCESS_READ))
+            for offset in range(0, spilled, block_size):
+                yield mapped[offset:offset + block_size]
+        for offset in range(0, len(window), block_size):
+            yield window[offset:offset + block_size]
+
+    def iter_pcm(self, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[memoryview]:
+        """Yield all buffered PCM in order as zero-copy memoryview blocks"""
+        spilled, window = self._snapshot()
+        return self._iter_snapshot(spilled, window, block_size)
+
+    def iter_wav(self, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[Union[bytes, memoryview]]:
+        """Return the buffered audio as a WAV file in blocks of at most `block_size`.
+
+        The header is synthesized from the known length and the PCM blocks are
+        memoryviews over the window and the mapped spill file, so nothing is
+        copied or concatenated up front.
+        """
+        spilled, window = self._snapshot()
+        total = spilled + len(window)
+        if not total:
+            return iter(())
+        header = wav_header(total, self.sample_rate, self.channels)
+        return itertools.chain((header,), self._iter_snapshot(spilled, window, block_size))
+
+    def get_wav_bytes(self) -> bytes:
+        """Convert buffered audio to WAV file bytes (materializes everything; prefer iter_wav)"""
+        return b"".join(self.iter_wav())
+
+    def get_duration_seconds(self) -> float:
+        """Calculate total duration in seconds"""
+        # 16-bit = 2 bytes per sample
+        total_samples = self.get_byte_count() // SAMPLE_WIDTH
+        return total_samples / (self.sample_rate * self.channels)
+
+    def clear(self):
+        """Drop all buffered audio and release the spill file"""
+        self._window = bytearray(self.memory_limit)
+        self._window_bytes = 0
+        self._spilled_bytes = 0
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def close(self):
+        """Release the spill file and the in-RAM window"""
+        self._window = bytearray()
+        self._window_bytes = 0
+        self._spilled_bytes = 0
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+
+class EncodedAudio:
+    """An encoded recording on disk, streamed to the uploader and then deleted"""
+
+    def __init__(self, path: str, size: int, content_type: str):
+        self.path = path
+        self.size = size
+        self.content_type = content_type
+
+    def iter_blocks(self, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+
+    def close(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_encoder_pool() -> ProcessPoolExecutor:
+    global _encoder_pool
+    if _encoder_pool is None:
+        # spawn: forking a process that runs an event loop and HTTP pool threads is unsafe
+        _encoder_pool = ProcessPoolExecutor(
+            max_workers=AUDIO_ENCODER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _encoder_pool
+
+
+def shutdown_encoder_pool():
+    global _encoder_pool
+    if _encoder_pool is not None:
+        _encoder_pool.shutdown(wait=False, cancel_futures=True)
+        _encoder_pool = None
+
+
+async def encode_flac(
+    buffer: AudioBuffer,
+    start: int = 0,
+    end: Optional[int] = None,
+    first_frame: int = 0,
+    header: bool = True
+) -> EncodedAudio:
+    """Compress buffered PCM bytes [start, end) to FLAC in a worker process.
+
+    Defaults to everything buffered so far as a complete file; header=False
+    produces bare frames numbered from `first_frame` (see flac.iter_frames).
+    """
+    src_path, nbytes = buffer.persist()
+    end = nbytes if end is None else min(end, nbytes)
+    fd, dst_path = tempfile.mkstemp(prefix="verbact-audio-", suffix=".flac", dir=buffer.spill_dir)
+    os.close(fd)
+    try:
+        size = await asyncio.get_running_loop().run_in_executor(
+            get_encoder_pool(), flac.encode_file, src_path, start, end, dst_path,
+            buffer.sample_rate, buffer.channels, first_frame, header
+        )
+    except BaseException:
+        os.unlink(dst_path)
+        raise
+    return EncodedAudio(dst_path, size, "audio/flac")
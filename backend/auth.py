@@ -0,0 +1,179 @@
+"""
+Supabase access-token verification with a verified-token cache.
+
+Tokens are resolved to a user once and then served from a TTL+LRU cache
+keyed by a SHA-256 of the token, never longer than the JWT's own `exp`.
+When SUPABASE_JWT_SECRET (HS256 projects) or AUTH_VERIFY_JWKS=true
+(asymmetric signing keys) is configured the signature is checked locally
+and the /auth/v1/user round-trip is skipped entirely.
+
+Note: a cached or locally verified token stays valid for up to
+AUTH_CACHE_TTL_SECONDS after the session is revoked in Supabase.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import jwt
+from fastapi import HTTPException
+
+from cache import TTLCache
+from supabase_http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+AUTH_VERIFY_JWKS = os.getenv("AUTH_VERIFY_JWKS", "false").lower() == "true"
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_REFRESH_SECONDS = 600
+
+token_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
+local_verifications = 0
+remote_verifications = 0
+
+_jwks: Dict[str, jwt.PyJWK] = {}
+_jwks_fetched_at = 0.0
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _unverified_claims(token: str) -> Optional[dict]:
+    """Decode the JWT payload without checking the signature (only used for `exp`)"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def _user_from_claims(claims: dict) -> dict:
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+    }
+
+
+async def _refresh_jwks() -> None:
+    global _jwks, _jwks_fetched_at
+    response = await get_http_client().get(
+        f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+        headers={"apikey": SUPABASE_KEY},
+    )
+    response.raise_for_status()
+    keys = {}
+    for key in response.json().get("keys", []):
+        try:
+            keys[key.get("kid")] = jwt.PyJWK(key)
+        except jwt.PyJWTError:
+            continue
+    _jwks = keys
+    _jwks_fetched_at = time.monotonic()
+
+
+async def _verify_locally(token: str) -> Optional[dict]:
+    """Verify signature, audience and expiry without calling Supabase.
+
+    Returns None when local verification is not configured for this token's
+    algorithm, so the caller falls back to /auth/v1/user.
+    """
+    global local_verifications
+    if not SUPABASE_JWT_SECRET and not AUTH_VERIFY_JWKS:
+        return None
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    alg = header.get("alg")
+    if alg == "HS256" and SUPABASE_JWT_SECRET:
+        key = SUPABASE_JWT_SECRET
+    elif alg != "HS256" and AUTH_VERIFY_JWKS:
+        kid = header.get("kid")
+        if kid not in _jwks or time.monotonic() - _jwks_fetched_at > JWKS_REFRESH_SECONDS:
+            try:
+                await _refresh_jwks()
+            except Exception as e:
+                logger.warning(f"⚠️ JWKS refresh failed, falling back to /auth/v1/user: {e}")
+                return None
+        if kid not in _jwks:
+            return None
+        key = _jwks[kid].key
+    else:
+        return None
+
+    try:
+        claims = jwt.decode(token, key, algorithms=[alg], audience=JWT_AUDIENCE)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    local_verifications += 1
+    return _user_from_claims(claims)
+
+
+async def _verify_remotely(token: str) -> dict:
+    global remote_verifications
+    remote_verifications += 1
+    response = await get_http_client().get(
+        f"{SUPABASE_URL}/auth/v1/user",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "apikey": SUPABASE_KEY
+        }
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return response.json()
+
+
+async def _resolve(token: str, key: str) -> dict:
+    claims = _unverified_claims(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    exp = claims.get("exp")
+    if exp is not None and (isinstance(exp, bool) or not isinstance(exp, (int, float))):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if exp is not None and exp <= time.time():
+        raise HTTPException(status_code=401, detail="Token expired")
+
+    user = await _verify_locally(token)
+    if user is None:
+        user = await _verify_remotely(token)
+
+    # Never serve a token from cache past its own expiry
+    ttl = exp - time.time() if exp is not None else None
+    token_cache.set(key, user, ttl)
+    return user
+
+
+async def get_user(token: str) -> dict:
+    """Resolve an access token to the Supabase user, raising 401 if invalid"""
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing token")
+    key = _token_key(token)
+    return await token_cache.get_or_load(key, lambda: _resolve(token, key))
+
+
+def invalidate(token: str) -> None:
+    token_cache.pop(_token_key(token))
+
+
+def cache_stats() -> dict:
+    return {
+        **token_cache.stats(),
+        "local_verifications": local_verifications,
+        "remote_verifications": remote_verifications,
+    }
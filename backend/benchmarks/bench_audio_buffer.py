@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of AudioBuffer for long live sessions.
+
+Feeds 1h and 4h of 16kHz mono PCM in websocket-sized frames and compares
+the original list-of-chunks buffer with the current AudioBuffer:
+
+  append      time to add every frame
+  duration    cost of one get_duration_seconds() call at the end
+  wav stream  time to walk iter_wav() (what save_session_data uploads)
+  peak heap   tracemalloc peak while buffering
+
+    python -m benchmarks.bench_audio_buffer --hours 1 4
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+import wave
+
+BYTES_PER_SECOND = 16000 * 2
+FRAME = 8192  # typical websocket audio frame (256ms)
+
+
+class ListAudioBuffer:
+    """AudioBuffer as it was before spilling: a list of frames summed on demand"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def add_chunk(self, chunk: bytes):
+        self.chunks.append(chunk)
+
+    def get_duration_seconds(self) -> float:
+        total_bytes = sum(len(chunk) for chunk in self.chunks)
+        return total_bytes // 2 / 16000
+
+    def iter_wav(self):
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes(b"".join(self.chunks))
+        yield wav_buffer.getvalue()
+
+    def close(self):
+        self.chunks = []
+
+
+def measure(label: str, buffer, hours: float) -> None:
+    frames = int(hours * 3600 * BYTES_PER_SECOND) // FRAME
+    frame = memoryview(os.urandom(FRAME))
+
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for _ in range(frames):
+        # A fresh bytes object per frame, like websocket.receive_bytes()
+        buffer.add_chunk(frame.tobytes())
+    append_s = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    duration = buffer.get_duration_seconds()
+    duration_us = (time.perf_counter() - started) * 1e6
+
+    started = time.perf_counter()
+    wav_size = sum(len(block) for block in buffer.iter_wav())
+    stream_s = time.perf_counter() - started
+    buffer.close()
+
+    print(
+        f"{hours:>4}h {label:<12} append {append_s:6.2f}s ({append_s / frames * 1e6:5.2f}us/frame)  "
+        f"duration {duration_us:9.1f}us  wav stream {stream_s:6.2f}s  "
+        f"peak heap +{(peak - base) / 1024 / 1024:7.1f} MB  [{duration:.0f}s, {wav_size / 1024 / 1024:.0f} MB]"
+    )
+
+
+def main():
+    from audio import AudioBuffer
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    for hours in args.hours:
+        measure("list (before)", ListAudioBuffer(), hours)
+        measure("AudioBuffer", AudioBuffer(), hours)
+
+
+if __name__ == "__main__":
+    main()
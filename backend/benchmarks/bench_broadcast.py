@@ -0,0 +1,103 @@
+"""
+Speaker-side cost of fanning transcripts out to live share viewers.
+
+Simulates a speaker publishing Deepgram results (4 interims per final)
+to N viewers, 2% of which are slow (20ms per send), using in-memory
+sockets. Compares the old inline loop (`await viewer.send_text` for every
+viewer inside receive_from_deepgram) with BroadcastHub.publish().
+
+  stall     time the speaker's receive loop is blocked per message
+  delivery  publish -> received latency for the fast viewers
+
+    python -m benchmarks.bench_broadcast --viewers 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import format_latencies
+
+SLOW_FRACTION = 0.02
+SLOW_SEND_SECONDS = 0.02
+
+
+class SimulatedViewer:
+    def __init__(self, slow: bool):
+        self.slow = slow
+        self.latencies = []
+
+    async def send_text(self, text: str):
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_SECONDS)
+        else:
+            await asyncio.sleep(0)
+            message = json.loads(text)
+            if message["is_final"]:
+                self.latencies.append((time.perf_counter() - message["timestamp"]) * 1000)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def make_viewers(count: int):
+    slow_every = int(1 / SLOW_FRACTION)
+    return [SimulatedViewer(slow=(i % slow_every == slow_every - 1)) for i in range(count)]
+
+
+def messages(count: int):
+    for i in range(count):
+        yield {"transcript": f"message {i}", "is_final": i % 5 == 4, "confidence": 0.9}
+
+
+async def run_inline(viewer_count: int, message_count: int):
+    viewers = make_viewers(viewer_count)
+    stalls = []
+    for message in messages(message_count):
+        message["timestamp"] = time.perf_counter()
+        started = time.perf_counter()
+        json_msg = json.dumps(message)
+        for viewer in viewers:
+            try:
+                await viewer.send_text(json_msg)
+            except Exception:
+                pass
+        stalls.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return stalls, [l for v in viewers if not v.slow for l in v.latencies]
+
+
+async def run_hub(viewer_count: int, message_count: int):
+    from broadcast import BroadcastHub
+
+    hub = BroadcastHub()
+    viewers = make_viewers(viewer_count)
+    for viewer in viewers:
+        hub.subscribe("rec", viewer)
+    stalls = []
+    for message in messages(message_count):
+        message["timestamp"] = time.perf_counter()
+        started = time.perf_counter()
+        hub.publish("rec", message)
+        stalls.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.5)
+    hub.close_recording("rec")
+    return stalls, [l for v in viewers if not v.slow for l in v.latencies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    for count in args.viewers:
+        for label, runner in (("inline await", run_inline), ("BroadcastHub", run_hub)):
+            stalls, delivery = asyncio.run(runner(count, args.messages))
+            print(format_latencies(f"{count} viewers, {label}: stall", stalls))
+            print(format_latencies(f"{count} viewers, {label}: delivery", delivery))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time to first transcript with and without the speculative Deepgram connect.
+
+Starts the stub Supabase (STUB_LATENCY_MS per request, so the token check
+and the profile lookup each cost a round trip), the mock Deepgram with a
+connect delay standing in for DNS + TLS + upgrade to the real API, and the
+backend twice: DEEPGRAM_PREWARM=false (connect after auth, as before) and
+true (connect concurrently with auth). The auth cache is off, so every
+session pays for a full cold start.
+
+Each session opens /ws/transcribe and immediately streams audio in real
+time, as the web recorder does. Time to first transcript runs from the
+first chunk sent to the first result received. The mock produces its first
+interim after --interim-ms of audio. That audio, plus the mock's result
+delay, is a floor common to both modes, and connection setup only shows
+when it takes longer than the floor audio does to arrive. Audio queued during
+setup reaches the mock in a burst.
+
+    python -m benchmarks.bench_deepgram_prewarm --sessions 20 --connect-ms 250 --stub-latency-ms 60
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import websockets
+
+from benchmarks.common import STUB_TOKEN, backend_env, format_latencies, free_port, percentile, run_server
+
+CHUNK_MS = 100
+CHUNK = bytes(16000 * 2 * CHUNK_MS // 1000)
+
+
+async def first_transcript_ms(ws_url: str) -> float:
+    async with websockets.connect(f"{ws_url}/ws/transcribe?token={STUB_TOKEN}") as ws:
+        first = asyncio.get_running_loop().create_future()
+
+        async def receive():
+            async for raw in ws:
+                if json.loads(raw).get("transcript"):
+                    first.set_result(time.perf_counter())
+                    return
+
+        receiver = asyncio.create_task(receive())
+        started = time.perf_counter()
+        k = 0
+        while not first.done():
+            await ws.send(CHUNK)
+            k += 1
+            await asyncio.wait([first], timeout=max(0.0, started + k * CHUNK_MS / 1000 - time.perf_counter()))
+        receiver.cancel()
+        return (first.result() - started) * 1000
+
+
+async def run(ws_url: str, sessions: int) -> list:
+    samples = []
+    for _ in range(sessions):
+        samples.append(await first_transcript_ms(ws_url))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--connect-ms", type=float, default=250, help="mock Deepgram connect delay")
+    parser.add_argument("--deepgram-delay-ms", type=float, default=150, help="mock Deepgram result delay")
+    parser.add_argument("--stub-latency-ms", type=float, default=60)
+    parser.add_argument("--interim-ms", type=float, default=300, help="audio per mock interim result")
+    args = parser.parse_args()
+
+    stub_port, deepgram_port = free_port(), free_port()
+    stub_env = {"STUB_RECORDINGS": "1", "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    deepgram_env = {
+        "MOCK_DG_CONNECT_MS": str(args.connect_ms),
+        "MOCK_DG_DELAY_MS": str(args.deepgram_delay_ms),
+        "MOCK_DG_INTERIM_SECONDS": str(args.interim_ms / 1000),
+    }
+    print(f"connect {args.connect_ms:.0f}ms, Supabase round trip {args.stub_latency_ms:.0f}ms, "
+          f"first result after {args.interim_ms:.0f}ms of audio + {args.deepgram_delay_ms:.0f}ms")
+    results = {}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env), \
+            run_server("benchmarks.mock_deepgram:app", deepgram_port, deepgram_env):
+        for label, prewarm in (("connect after auth", "false"), ("speculative connect", "true")):
+            backend_port = free_port()
+            env = backend_env(
+                stub_port,
+                DEEPGRAM_URL=f"ws://127.0.0.1:{deepgram_port}/v1/listen",
+                DEEPGRAM_API_KEY="mock-deepgram-key",
+                DEEPGRAM_PREWARM=prewarm,
+                AUTH_CACHE_TTL_SECONDS="0",
+                AUDIO_SEGMENT_SECONDS="0",
+                LOG_LEVEL="WARNING",
+            )
+            with run_server("main:app", backend_port, env):
+                samples = asyncio.run(run(f"ws://127.0.0.1:{backend_port}", args.sessions))
+            results[label] = samples
+            print(format_latencies(f"{label:<22} first transcript", samples))
+    before, after = (percentile(s, 50) for s in results.values())
+    print(f"p50 time to first transcript: {before - after:.0f}ms faster ({100 * (before - after) / before:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Size and encode time of FLAC vs WAV uploads for a live session.
+
+Buffers N minutes of synthetic speech-like 16kHz PCM (voiced bursts,
+background noise and pauses) in an AudioBuffer, then encodes it through
+audio.encode_flac in the worker pool, as save_session_data does.
+
+    python -m benchmarks.bench_flac_encode --minutes 10
+"""
+import argparse
+import asyncio
+import math
+import random
+import struct
+import time
+
+SAMPLE_RATE = 16000
+BUCKET_LIMIT = 50 * 1024 * 1024  # 002_storage_setup.sql
+
+
+def speech_like_pcm(seconds: float, seed: int = 1) -> bytes:
+    rnd = random.Random(seed)
+    samples = []
+    for i in range(int(seconds * SAMPLE_RATE)):
+        t = i / SAMPLE_RATE
+        envelope = max(0.0, math.sin(2 * math.pi * 0.7 * t)) ** 2
+        pitch = 140 + 40 * math.sin(2 * math.pi * 0.3 * t)
+        value = envelope * (
+            3000 * math.sin(2 * math.pi * pitch * t)
+            + 1500 * math.sin(2 * math.pi * 3 * pitch * t + 1)
+            + 700 * math.sin(2 * math.pi * 1500 * t)
+        ) + rnd.gauss(0, 60)
+        if t % 5 > 4.2:
+            value = 0  # pause
+        samples.append(max(-32768, min(32767, int(value))))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+async def run(minutes: float) -> None:
+    from audio import AudioBuffer, encode_flac, shutdown_encoder_pool
+
+    # One synthetic minute, repeated
+    minute = speech_like_pcm(60)
+    buffer = AudioBuffer()
+    for _ in range(int(minutes)):
+        for offset in range(0, len(minute), 8192):
+            buffer.add_chunk(minute[offset:offset + 8192])
+
+    wav_size = buffer.get_wav_size()
+    started = time.perf_counter()
+    encoded = await encode_flac(buffer)
+    elapsed = time.perf_counter() - started
+    encoded.close()
+    buffer.close()
+    shutdown_encoder_pool()
+
+    wav_per_min = wav_size / minutes
+    flac_per_min = encoded.size / minutes
+    print(f"{minutes:g} min session")
+    print(f"  WAV   {wav_size / 1024 / 1024:7.1f} MB  ({wav_per_min / 1024 / 1024:.2f} MB/min, "
+          f"50MB limit after {BUCKET_LIMIT / wav_per_min:5.1f} min)")
+    print(f"  FLAC  {encoded.size / 1024 / 1024:7.1f} MB  ({flac_per_min / 1024 / 1024:.2f} MB/min, "
+          f"50MB limit after {BUCKET_LIMIT / flac_per_min:5.1f} min)  ratio {encoded.size / wav_size:.2f}")
+    print(f"  encode {elapsed:.1f}s in a worker process ({elapsed / minutes:.2f}s per audio minute)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.minutes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Memory and join cost of the live transcript history kept for late joiners.
+
+Simulates a session of N minutes (one final every 3s, 8 interims before
+each) and compares the old unbounded list of every broadcast message,
+replayed one send per message, with TranscriptHistory and its single
+snapshot frame.
+
+  memory  bytes retained by the history (tracemalloc)
+  join    time to hand a new viewer everything so far (sends + serialization)
+
+    python -m benchmarks.bench_live_history --minutes 10 60 120
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+FINAL_EVERY_SECONDS = 3
+INTERIMS_PER_FINAL = 8
+JOINS = 20
+
+
+class CountingViewer:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(0)
+        self.frames += 1
+        self.bytes += len(text)
+
+
+def messages(minutes: float):
+    words = "the quick brown fox jumps over the lazy dog again and again".split()
+    for i in range(int(minutes * 60 / FINAL_EVERY_SECONDS)):
+        sentence = [words[(i + k) % len(words)] for k in range(10)]
+        for n in range(1, INTERIMS_PER_FINAL + 1):
+            yield {"transcript": " ".join(sentence[:n]), "is_final": False, "confidence": 0.8,
+                   "timestamp": time.time(), "start": i * 3.0, "end": i * 3.0 + n * 0.3}
+        yield {"transcript": " ".join(sentence), "is_final": True, "confidence": 0.95,
+               "timestamp": time.time(), "start": i * 3.0, "end": i * 3.0 + 2.9}
+
+
+def build(minutes: float, compacted: bool):
+    from broadcast import TranscriptHistory
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    if compacted:
+        history = TranscriptHistory()
+        for message in messages(minutes):
+            history.add(message)
+    else:
+        history = []
+        for message in messages(minutes):
+            history.append(message)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return history, retained
+
+
+async def join(history, compacted: bool):
+    viewer = CountingViewer()
+    started = time.perf_counter()
+    if compacted:
+        await viewer.send_text(history.snapshot())
+    else:
+        for message in history:
+            await viewer.send_text(json.dumps(message))
+    return (time.perf_counter() - started) * 1000, viewer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60, 120])
+    args = parser.parse_args()
+
+    for minutes in args.minutes:
+        for label, compacted in (("full replay", False), ("snapshot", True)):
+            history, retained = build(minutes, compacted)
+            timings = []
+            for _ in range(JOINS):
+                elapsed, viewer = asyncio.run(join(history, compacted))
+                timings.append(elapsed)
+            timings.sort()
+            print(f"{minutes:>5g} min  {label:<11}  memory {retained / 1024 / 1024:6.2f} MB   "
+                  f"join median {timings[len(timings) // 2]:7.2f}ms   "
+                  f"{viewer.frames:>6} frames, {viewer.bytes / 1024:7.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cross-worker live share through the Redis broker.
+
+Runs two brokers ("workers") against one Redis: the speaker publishes on
+worker A while viewers are connected to worker B. Half the viewers join
+before the session starts and half join midway (snapshot + live tail).
+Checks that every viewer ends up with exactly the speaker's finals, in
+order, and reports publish -> delivered latency on the remote worker.
+
+Needs a Redis server, e.g. `docker run --rm -p 6379:6379 redis:7-alpine`.
+
+    python -m benchmarks.bench_live_pubsub --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import format_latencies
+
+INTERIMS_PER_FINAL = 4
+
+
+class RecordingViewer:
+    def __init__(self):
+        self.finals = []
+        self.latencies = []
+
+    async def send_text(self, text: str):
+        message = json.loads(text)
+        if message.get("type") == "snapshot":
+            self.finals = [f["transcript"] for f in message["finals"]]
+        elif message["is_final"]:
+            self.finals.append(message["transcript"])
+            self.latencies.append((time.time() - message["timestamp"]) * 1000)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+async def run(url: str, viewer_count: int, final_count: int, rate: float):
+    from broadcast import BroadcastHub
+    from pubsub import RedisBroker
+
+    worker_a, worker_b = RedisBroker(BroadcastHub(), url), RedisBroker(BroadcastHub(), url)
+    await worker_a.start()
+    await worker_b.start()
+    recording_id = f"bench-{int(time.time())}"
+    viewers = []
+
+    async def join():
+        viewer = RecordingViewer()
+        history = await worker_b.watch(recording_id)
+        worker_b.hub.subscribe(recording_id, viewer, [history.snapshot()] if history else [])
+        viewers.append(viewer)
+
+    for _ in range(viewer_count // 2):
+        await join()
+    await worker_a.set_live(recording_id)
+    assert await worker_b.is_live(recording_id)
+
+    spoken = []
+    for i in range(final_count):
+        for n in range(1, INTERIMS_PER_FINAL + 1):
+            worker_a.publish(recording_id, {"transcript": f"sentence {i} part {n}", "is_final": False,
+                                            "confidence": 0.8, "timestamp": time.time()})
+            await asyncio.sleep(1 / rate)
+        spoken.append(f"sentence {i}")
+        worker_a.publish(recording_id, {"transcript": spoken[-1], "is_final": True, "confidence": 0.9,
+                                        "timestamp": time.time(), "start": i, "end": i + 1})
+        if i == final_count // 2:
+            for _ in range(viewer_count - viewer_count // 2):
+                await join()
+        await asyncio.sleep(1 / rate)
+
+    await asyncio.sleep(0.5)
+    complete = sum(viewer.finals == spoken for viewer in viewers)
+    latencies = [l for viewer in viewers for l in viewer.latencies]
+    print(format_latencies(f"{viewer_count} remote viewers, {final_count} finals: delivery", latencies))
+    print(f"viewers with exactly the speaker's finals: {complete}/{len(viewers)}")
+    print(f"worker A {worker_a.stats()}")
+    print(f"worker B {worker_b.stats()}")
+
+    await worker_a.end(recording_id)
+    await asyncio.sleep(0.2)
+    assert not await worker_b.is_live(recording_id)
+    for _ in viewers:
+        await worker_b.unwatch(recording_id)
+    await worker_a.close()
+    await worker_b.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--viewers", type=int, default=200)
+    parser.add_argument("--finals", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=200, help="messages per second from the speaker")
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url, args.viewers, args.finals, args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+End-to-end load test: N speakers on /ws/transcribe and M live viewers on
+/ws/watch against a real backend process.
+
+Three local servers are started: the stub Supabase (Auth, PostgREST,
+Storage), the mock Deepgram (scripted Results at streaming cadence, see
+mock_deepgram.py) and the backend itself (`uvicorn main:app`, a separate
+process so its CPU and memory can be read from /proc). Every speaker
+streams linear16 audio in real time, 100ms per chunk, for --duration
+seconds and then sends stop_recording, which saves the session. Viewers are
+spread round-robin over the speakers' share links.
+
+Reported:
+  throughput   audio seconds streamed per wall second, transcript messages/s
+  latency      audio-to-transcript latency as the client sees it (from sending
+               the chunk holding a result's last sample to receiving the
+               result), interim and final, for speakers and viewers
+  memory       backend RSS growth per viewer and per speaker (Linux /proc)
+  CPU          backend process CPU time over the streaming phase
+  server view  transcript latency and event-loop lag from /health
+
+The driver runs on the same machine, so leave it some CPU for large runs.
+
+    python -m benchmarks.bench_load --speakers 20 --viewers 100 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import struct
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.common import STUB_TOKEN, backend_env, format_latencies, free_port, run_server
+
+SAMPLE_RATE = 16000
+CHUNK_MS = 100
+CHUNK_BYTES = SAMPLE_RATE * 2 * CHUNK_MS // 1000
+# Speakers keep listening this long after their last chunk before stopping
+TAIL_SECONDS = 1.0
+
+
+def tone_chunks(seconds: int) -> List[bytes]:
+    """A second of quiet 440Hz tone plus a little hash, cut into chunks (FLAC has real work to do)"""
+    samples = [
+        int(3000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) + (i * 7919 % 64) - 32
+        for i in range(SAMPLE_RATE)
+    ]
+    second = struct.pack(f"<{len(samples)}h", *samples)
+    chunks = [second[i:i + CHUNK_BYTES] for i in range(0, len(second), CHUNK_BYTES)]
+    return chunks * seconds
+
+
+class ProcStats:
+    """RSS and CPU time of another process, from /proc (Linux only)"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+
+    def rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15; the split starts at field 3
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+
+class Results:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = {
+            "speaker interim": [], "speaker final": [], "viewer interim": [], "viewer final": [],
+        }
+        self.messages = {"speaker": 0, "viewer": 0}
+        self.errors: List[str] = []
+
+    def record(self, role: str, message: dict, sent_at: List[float], received_at: float) -> None:
+        transcript = message.get("transcript")
+        if not transcript or "@" not in transcript:
+            return
+        self.messages[role] += 1
+        end_ms = int(transcript.rsplit("@", 1)[1])
+        index = -(-end_ms // CHUNK_MS) - 1
+        if 0 <= index < len(sent_at):
+            kind = "final" if message.get("is_final") else "interim"
+            self.latency[f"{role} {kind}"].append((received_at - sent_at[index]) * 1000)
+
+
+async def active_sessions(http: httpx.AsyncClient) -> int:
+    for line in (await http.get("/metrics")).text.splitlines():
+        if line.startswith("verbact_active_sessions "):
+            return int(float(line.split()[1]))
+    return 0
+
+
+async def seed_shares(stub_url: str, speakers: int) -> List[str]:
+    async with httpx.AsyncClient(base_url=stub_url) as client:
+        recordings = (await client.get(f"/rest/v1/recordings?select=id&limit={speakers}")).json()
+        recording_ids = [r["id"] for r in recordings]
+        await client.post("/rest/v1/live_shares", json=[
+            {"recording_id": rec_id, "share_token": f"load-share-{i}", "is_active": True, "expires_at": None}
+            for i, rec_id in enumerate(recording_ids)
+        ])
+    return recording_ids
+
+
+async def speaker(ws_url: str, index: int, recording_id: str, chunks: List[bytes],
+                  sent_at: List[float], results: Results) -> None:
+    try:
+        async with websockets.connect(f"{ws_url}/ws/transcribe?token={STUB_TOKEN}") as ws:
+            await ws.send(json.dumps({"type": "configure", "recording_id": recording_id, "title": f"Load {index}"}))
+
+            async def receive():
+                async for raw in ws:
+                    results.record("speaker", json.loads(raw), sent_at, time.perf_counter())
+
+            receiver = asyncio.create_task(receive())
+            started = time.perf_counter()
+            for k, chunk in enumerate(chunks):
+                sent_at.append(time.perf_counter())
+                await ws.send(chunk)
+                # Absolute schedule, so a slow send doesn't stretch the stream
+                await asyncio.sleep(max(0.0, started + (k + 1) * CHUNK_MS / 1000 - time.perf_counter()))
+            await asyncio.sleep(TAIL_SECONDS)  # let the last results arrive
+            await ws.send(json.dumps({"type": "stop_recording"}))
+            receiver.cancel()
+    except Exception as e:
+        results.errors.append(f"speaker {index}: {e!r}")
+
+
+async def viewer(ws_url: str, index: int, share_token: str, sent_at: List[float],
+                 results: Results, connected: asyncio.Event, done: asyncio.Event) -> None:
+    try:
+        async with websockets.connect(f"{ws_url}/ws/watch/{share_token}") as ws:
+            connected.set()
+
+            async def receive():
+                async for raw in ws:
+                    message = json.loads(raw)
+                    if message.get("type") != "snapshot":
+                        results.record("viewer", message, sent_at, time.perf_counter())
+
+            receiver = asyncio.create_task(receive())
+            await done.wait()
+            receiver.cancel()
+    except Exception as e:
+        connected.set()
+        results.errors.append(f"viewer {index}: {e!r}")
+
+
+async def run(backend_port: int, stub_url: str, proc: ProcStats, args) -> None:
+    base_url = f"http://127.0.0.1:{backend_port}"
+    ws_url = f"ws://127.0.0.1:{backend_port}"
+    recording_ids = await seed_shares(stub_url, args.speakers)
+    chunks = tone_chunks(args.duration)
+    sent_at: Dict[str, List[float]] = {rec_id: [] for rec_id in recording_ids}
+    results = Results()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        await http.get("/health")
+        baseline_mb = proc.rss_mb()
+
+        done = asyncio.Event()
+        viewer_events = [asyncio.Event() for _ in range(args.viewers)]
+        viewers = [
+            asyncio.create_task(viewer(
+                ws_url, j, f"load-share-{j % args.speakers}", sent_at[recording_ids[j % args.speakers]],
+                results, viewer_events[j], done
+            ))
+            for j in range(args.viewers)
+        ]
+        await asyncio.gather(*(event.wait() for event in viewer_events))
+        await asyncio.sleep(0.5)
+        viewers_mb = proc.rss_mb()
+
+        cpu_before = proc.cpu_seconds()
+        peak_mb = viewers_mb
+        started = time.perf_counter()
+        speakers = asyncio.gather(*(
+            speaker(ws_url, i, rec_id, chunks, sent_at[rec_id], results)
+            for i, rec_id in enumerate(recording_ids)
+        ))
+        while not speakers.done():
+            peak_mb = max(peak_mb, proc.rss_mb())
+            await asyncio.sleep(0.25)
+        elapsed = time.perf_counter() - started
+        cpu = proc.cpu_seconds() - cpu_before
+
+        # Sessions save after stop_recording; wait for them so teardown doesn't cut uploads off
+        drain_started = time.perf_counter()
+        while await active_sessions(http) and time.perf_counter() - drain_started < 60:
+            await asyncio.sleep(0.1)
+        drain = time.perf_counter() - drain_started
+
+        done.set()
+        await asyncio.gather(*viewers)
+        health = (await http.get("/health")).json()
+
+    audio_seconds = sum(len(times) for times in sent_at.values()) * CHUNK_MS / 1000
+    streaming = max(elapsed - TAIL_SECONDS, 1e-9)
+    print(f"{args.speakers} speakers x {args.duration}s, {args.viewers} viewers, "
+          f"mock Deepgram delay {args.deepgram_delay_ms:.0f}ms")
+    print(f"throughput: {audio_seconds / streaming:7.1f} audio s/s   "
+          f"{results.messages['speaker'] / streaming:7.1f} speaker msgs/s   "
+          f"{results.messages['viewer'] / streaming:7.1f} viewer msgs/s")
+    for label, samples in results.latency.items():
+        print(format_latencies(label, samples))
+    print(f"memory: baseline {baseline_mb:.1f}MB, "
+          f"{(viewers_mb - baseline_mb) * 1024 / max(args.viewers, 1):.1f}KB per viewer, "
+          f"{(peak_mb - viewers_mb) * 1024 / max(args.speakers, 1):.1f}KB per speaker (peak {peak_mb:.1f}MB)")
+    print(f"cpu: {cpu:.2f}s over {elapsed:.1f}s = {100 * cpu / elapsed:.1f}% of one core "
+          f"({1000 * cpu / max(audio_seconds, 1):.2f}ms CPU per audio second)")
+    print(f"sessions saved and closed {drain:.2f}s after the last speaker stopped")
+    print(f"server transcript latency: {health.get('transcript_latency')}")
+    print(f"server event loop: {health.get('event_loop')}")
+    if results.errors:
+        print(f"{len(results.errors)} errors, first: {results.errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speakers", type=int, default=10)
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--duration", type=int, default=20, help="seconds of audio per speaker")
+    parser.add_argument("--deepgram-delay-ms", type=float, default=150)
+    parser.add_argument("--stub-latency-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    stub_port, deepgram_port, backend_port = free_port(), free_port(), free_port()
+    stub_env = {"STUB_RECORDINGS": str(args.speakers), "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    deepgram_env = {"MOCK_DG_DELAY_MS": str(args.deepgram_delay_ms)}
+    env = backend_env(
+        stub_port,
+        DEEPGRAM_URL=f"ws://127.0.0.1:{deepgram_port}/v1/listen",
+        DEEPGRAM_API_KEY="mock-deepgram-key",
+        LOG_LEVEL="WARNING",
+    )
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env), \
+            run_server("benchmarks.mock_deepgram:app", deepgram_port, deepgram_env), \
+            run_server("main:app", backend_port, env) as backend:
+        asyncio.run(run(backend_port, f"http://127.0.0.1:{stub_port}", ProcStats(backend.pid), args))
+
+
+if __name__ == "__main__":
+    main()
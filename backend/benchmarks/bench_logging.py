@@ -0,0 +1,67 @@
+"""
+Cost of one log call on the event loop thread.
+
+  print override    the previous main.print: open debug.log, append, close,
+                    then write to stdout (console output discarded here)
+  logger.info       logs.configure_logging(): level check + enqueue; the
+                    listener thread formats and writes the JSON file
+  logger.debug off  the same call below LOG_LEVEL: one cached level check
+
+    python -m benchmarks.bench_logging --calls 20000
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+
+def per_call_us(fn, calls: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_file = os.path.join(tmp, "old.log")
+
+        def print_override(i):
+            msg = f"[{i}] 💓 Keepalive #{i} sent"
+            with open(old_file, "a", encoding="utf-8") as f:
+                f.write(f"[{datetime.now().isoformat()}] {msg}\n")
+            print(msg)
+
+        with redirect_stdout(io.StringIO()):
+            old = per_call_us(print_override, args.calls)
+
+        os.environ.update({"LOG_FILE": os.path.join(tmp, "new.log"), "LOG_LEVEL": "INFO"})
+        import logs
+        logs.configure_logging()
+        # Console output off for the measurement; the JSON file is still written
+        for handler in logs._listener.handlers:
+            if not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.CRITICAL)
+        log = logging.LoggerAdapter(logging.getLogger("bench"), {"client_id": "bench"})
+        enabled = per_call_us(lambda i: log.info("💓 Keepalive #%d sent", i), args.calls)
+        disabled = per_call_us(lambda i: log.debug("💓 Keepalive #%d sent", i), args.calls)
+        t0 = time.perf_counter()
+        logs.shutdown_logging()
+        drain = time.perf_counter() - t0
+
+    print(f"print override     {old:8.2f}µs per call (blocking file open/append/close)")
+    print(f"logger.info        {enabled:8.2f}µs per call (+{drain * 1000:.0f}ms for the listener to drain)")
+    print(f"logger.debug off   {disabled:8.2f}µs per call")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
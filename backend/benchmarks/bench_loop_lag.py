@@ -0,0 +1,78 @@
+"""
+Event-loop lag while service-role writes run: blocking vs async.
+
+Runs the LoopLagMonitor from loop_monitor.py while N sessions save their
+usage concurrently against the stub Supabase (STUB_LATENCY_MS per request):
+
+  blocking   select + update on a synchronous httpx.Client, which is what
+             supabase-py's .execute() does under the hood (previous behaviour)
+  async      admin.increment_usage(): one RPC on the shared async pool
+
+The lag is how long every other coroutine on the worker (live WebSockets,
+viewer fan-out) had to wait.
+
+    python -m benchmarks.bench_loop_lag --sessions 50 --stub-latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import STUB_ANON_KEY, backend_env, free_port, run_server
+
+STUB_USER_ID = "00000000-0000-4000-8000-000000000001"
+
+
+async def run(stub_url: str, sessions: int) -> None:
+    import admin
+    import supabase_http
+    from loop_monitor import LoopLagMonitor
+
+    # The app opens the pool at startup; building it (SSL context) is a one-off stall
+    await supabase_http.open_pool()
+    headers = {"apikey": STUB_ANON_KEY, "Authorization": f"Bearer {STUB_ANON_KEY}"}
+    sync_client = httpx.Client(base_url=stub_url, headers=headers)
+
+    async def blocking_save(i: int):
+        await asyncio.sleep(0)
+        rows = sync_client.get("/rest/v1/profiles", params={"id": f"eq.{STUB_USER_ID}", "select": "usage_seconds"}).json()
+        usage = (rows[0].get("usage_seconds") or 0) + 60
+        sync_client.patch("/rest/v1/profiles", params={"id": f"eq.{STUB_USER_ID}"}, json={"usage_seconds": usage})
+
+    async def async_save(i: int):
+        await admin.increment_usage(STUB_USER_ID, 60, f"bench-session-{i}")
+
+    for label, save in (("blocking", blocking_save), ("async", async_save)):
+        monitor = LoopLagMonitor(interval=0.005)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await asyncio.gather(*(save(i) for i in range(sessions)))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        stats = monitor.stats()
+        print(f"{label:<9} {sessions} saves in {elapsed * 1000:7.1f}ms   loop lag "
+              f"p50={stats['p50_ms']:6.2f}ms  p99={stats['p99_ms']:7.2f}ms  max={stats['max_ms']:7.2f}ms")
+
+    sync_client.close()
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--stub-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    os.environ.update(backend_env(stub_port, SUPABASE_SERVICE_ROLE_KEY=STUB_ANON_KEY))
+    with run_server("benchmarks.stub_supabase:app", stub_port,
+                    {"STUB_RECORDINGS": "0", "STUB_LATENCY_MS": str(args.stub_latency_ms)}):
+        asyncio.run(run(f"http://127.0.0.1:{stub_port}", args.sessions))
+
+
+if __name__ == "__main__":
+    main()
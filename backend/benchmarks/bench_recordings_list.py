@@ -0,0 +1,95 @@
+"""
+p50/p99 latency of GET /api/recordings against a local stub Supabase.
+
+The backend runs in-process (ASGI transport) while the stub Supabase runs
+as a separate uvicorn server. Two modes are compared:
+
+  per-call client (before)  every Supabase call builds and tears down its own
+                            httpx.AsyncClient, as main.py used to
+  shared pool (after)       one application-lifetime client with keep-alive
+
+Over loopback there is no TLS handshake, so real-world gains against a
+remote Supabase project are larger than what is reported here.
+
+    python -m benchmarks.bench_recordings_list --requests 300 --recordings 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import (
+    STUB_TOKEN, backend_env, format_latencies, free_port, run_server,
+)
+
+
+async def drive(app, requests: int, query: str = "") -> list:
+    url = f"http://backend/api/recordings?token={STUB_TOKEN}{query}"
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, timeout=60) as client:
+        (await client.get(url)).raise_for_status()  # warm-up
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = await client.get(url)
+            samples.append((time.perf_counter() - t0) * 1000)
+            response.raise_for_status()
+    return samples
+
+
+def per_call_clients():
+    """Patch the pool getter so every call gets a fresh client (the old behaviour)"""
+    import supabase_http
+    created = []
+    original = supabase_http.get_http_client
+
+    def factory():
+        client = httpx.AsyncClient()
+        created.append(client)
+        return client
+
+    async def close_all():
+        while created:
+            await created.pop().aclose()
+
+    return factory, close_all, original
+
+
+async def run_modes(requests: int) -> None:
+    import main
+    import supabase_http
+
+    samples = await drive(main.app, requests)
+    print(format_latencies("shared pool (after)", samples))
+    await supabase_http.close_pool()
+
+    factory, close_all, original = per_call_clients()
+    main.get_http_client = supabase_http.get_http_client = factory
+    try:
+        samples = []
+        for _ in range(requests):
+            samples.extend(await drive(main.app, 1))
+            await close_all()
+        print(format_latencies("per-call client (before)", samples))
+    finally:
+        main.get_http_client = supabase_http.get_http_client = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--recordings", type=int, default=20, help="recordings seeded in the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub_env = {"STUB_RECORDINGS": str(args.recordings), "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+        os.environ.update(backend_env(stub_port))
+        asyncio.run(run_modes(args.requests))
+
+
+if __name__ == "__main__":
+    main()
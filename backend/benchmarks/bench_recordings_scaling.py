@@ -0,0 +1,72 @@
+"""
+GET /api/recordings latency as the number of recordings grows.
+
+For each listing size the stub Supabase is reseeded and three signing
+strategies are measured:
+
+  sequential (before)  one create_signed_url round-trip per recording
+  bulk, cold cache     one /object/sign/recordings call per listing
+  bulk, warm cache     signed URLs served from the path-keyed cache
+
+    python -m benchmarks.bench_recordings_scaling --sizes 10,100,300
+"""
+import argparse
+import asyncio
+import os
+
+from benchmarks.bench_recordings_list import drive
+from benchmarks.common import backend_env, format_latencies, free_port, run_server
+
+
+async def sign_sequentially(paths, token, expires_in=3600):
+    import storage
+    signed = {}
+    for path in paths:
+        storage.signed_url_cache.pop(path)
+        url = await storage.create_signed_url(path, token, expires_in)
+        if url:
+            signed[path] = url
+    return signed
+
+
+async def measure(size: int, requests: int) -> None:
+    import main
+    import storage
+    import supabase_http
+
+    bulk = main.create_signed_urls
+    main.create_signed_urls = sign_sequentially
+    try:
+        print(format_latencies(f"[{size}] sequential (before)", await drive(main.app, requests)))
+    finally:
+        main.create_signed_urls = bulk
+
+    samples = []
+    for _ in range(requests):
+        storage.signed_url_cache.clear()
+        samples.extend(await drive(main.app, 1))
+    print(format_latencies(f"[{size}] bulk, cold cache", samples))
+
+    print(format_latencies(f"[{size}] bulk, warm cache", await drive(main.app, requests)))
+    storage.signed_url_cache.clear()
+    # The pooled client is bound to this event loop
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,300")
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--stub-latency-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    os.environ.update(backend_env(stub_port))
+    for size in (int(s) for s in args.sizes.split(",")):
+        stub_env = {"STUB_RECORDINGS": str(size), "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+        with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+            asyncio.run(measure(size, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Stop-to-saved latency of the audio step of save_session_data.
+
+For each session length, buffers speech-like PCM the way the transcribe
+WebSocket does and times what happens after stop_recording:
+
+  one-shot   encode the whole session to FLAC, then upload it (previous behaviour)
+  segmented  SegmentUploader.finalize(): tail segment + manifest only, since
+             full segments were uploaded in the background while "recording"
+
+It also checks that background compaction rebuilds the same FLAC stream as
+the one-shot encoder (apart from the MD5 field, which segments leave unset).
+
+    python -m benchmarks.bench_session_save --minutes 5 15 30
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_flac_encode import speech_like_pcm
+from benchmarks.common import STUB_TOKEN, backend_env, free_port, run_server
+
+FRAME = 8192  # typical websocket audio frame
+
+
+async def run(minutes_list) -> None:
+    import segments
+    import storage
+    import supabase_http
+    from audio import AudioBuffer, encode_flac, shutdown_encoder_pool
+
+    minute = speech_like_pcm(60)
+    # ~20s of extra audio so the tail segment is not empty
+    tail = minute[:20 * 16000 * 2]
+
+    for minutes in minutes_list:
+        buffer = AudioBuffer()
+        uploader = segments.SegmentUploader(buffer, "bench", f"session-{minutes}", STUB_TOKEN)
+        for pcm in [minute] * int(minutes) + [tail]:
+            for offset in range(0, len(pcm), FRAME):
+                buffer.add_chunk(pcm[offset:offset + FRAME])
+                uploader.maybe_flush()
+            # Real sessions take a minute per minute of audio; let the background flush keep up
+            while uploader._flush_task and not uploader._flush_task.done():
+                await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        encoded = await encode_flac(buffer)
+        try:
+            await storage.upload_to_supabase_storage(
+                "bench", f"oneshot-{minutes}", encoded.iter_blocks(), STUB_TOKEN, "audio/flac",
+                content_length=encoded.size
+            )
+        finally:
+            encoded.close()
+        oneshot = time.perf_counter() - started
+
+        started = time.perf_counter()
+        manifest_path = await uploader.finalize()
+        segmented = time.perf_counter() - started
+
+        compacted = asyncio.Event()
+
+        async def on_compacted(path):
+            compacted.set()
+
+        started = time.perf_counter()
+        uploader.compact_in_background(on_compacted)
+        await compacted.wait()
+        compact = time.perf_counter() - started
+        await uploader._compact_task
+
+        expected = await storage.download_object(f"bench/oneshot-{minutes}.flac", STUB_TOKEN)
+        actual = await storage.download_object(f"bench/session-{minutes}.flac", STUB_TOKEN)
+        # STREAMINFO ends with the 16-byte MD5 at offset 26..42
+        same = actual[:26] == expected[:26] and actual[42:] == expected[42:]
+        print(f"{minutes:>4g} min  one-shot {oneshot:6.2f}s   segmented {segmented:5.2f}s "
+              f"({len(uploader.segments)} segments, {manifest_path})   "
+              f"background compaction {compact:5.2f}s   identical stream: {same}")
+        buffer.close()
+
+    shutdown_encoder_pool()
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5, 15, 30])
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    os.environ.update(backend_env(stub_port))
+    with run_server("benchmarks.stub_supabase:app", stub_port, {"STUB_RECORDINGS": "0", "STUB_LATENCY_MS": "0"}):
+        asyncio.run(run(args.minutes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Latency and database load of GET /api/shares/{token} for a popular link.
+
+Seeds one shared recording in the stub Supabase and has C concurrent
+clients fetch its share page R times each. Three modes are compared:
+
+  three selects (before)  live_shares, then recordings, then transcripts
+  embedded select         one PostgREST request; cache disabled, but
+                          concurrent misses are still coalesced
+  embedded + cache        the same with the share cache (what main.py does)
+
+The stub's request counter shows how many lookups reach the database.
+Clients and backend share one event loop, so the cached mode's tail is
+the first wave of clients queuing behind everyone else's cache hits.
+
+    python -m benchmarks.bench_share_lookup --clients 50 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import backend_env, format_latencies, free_port, run_server
+
+SHARE_TOKEN = "bench-share-token"
+
+
+async def seed(stub_url: str, transcripts: int) -> None:
+    async with httpx.AsyncClient(base_url=stub_url) as client:
+        recordings = (await client.get("/rest/v1/recordings?select=id&limit=1")).json()
+        recording_id = recordings[0]["id"]
+        await client.post("/rest/v1/live_shares", json={
+            "id": str(uuid.uuid4()), "recording_id": recording_id, "share_token": SHARE_TOKEN,
+            "is_active": True, "expires_at": None,
+        })
+        await client.post("/rest/v1/transcripts", json=[
+            {"recording_id": recording_id, "text": f"segment {i}", "start_time": i * 2.0,
+             "end_time": i * 2.0 + 1.8, "confidence": 0.9, "is_final": True}
+            for i in range(transcripts)
+        ])
+
+
+async def legacy_get_share(stub_url: str) -> dict:
+    """The pre-cache handler: three sequential selects"""
+    from supabase_http import get_http_client
+
+    client = get_http_client()
+    share = (await client.get(f"{stub_url}/rest/v1/live_shares?share_token=eq.{SHARE_TOKEN}&select=*")).json()[0]
+    recording_id = share["recording_id"]
+    recording = (await client.get(f"{stub_url}/rest/v1/recordings?id=eq.{recording_id}&select=*")).json()[0]
+    transcripts = (await client.get(
+        f"{stub_url}/rest/v1/transcripts?recording_id=eq.{recording_id}&order=start_time.asc&select=*"
+    )).json()
+    return {"title": recording["title"], "transcripts": transcripts}
+
+
+async def stub_requests(stub_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        counts = (await client.get(f"{stub_url}/_stats")).json()["requests"]
+    return sum(n for key, n in counts.items() if key.startswith("GET /rest/v1"))
+
+
+async def drive(fetch, clients: int, requests: int) -> list:
+    samples = []
+
+    async def client_loop():
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            await fetch()
+            samples.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    return samples
+
+
+async def run(stub_url: str, clients: int, requests: int, transcripts: int) -> None:
+    import main
+    import shares
+    import supabase_http
+
+    await seed(stub_url, transcripts)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=60) as backend:
+
+        async def via_backend():
+            response = await backend.get(f"/api/shares/{SHARE_TOKEN}")
+            response.raise_for_status()
+            assert len(response.json()["transcripts"]) == transcripts
+
+        async def legacy():
+            assert len((await legacy_get_share(stub_url))["transcripts"]) == transcripts
+
+        cache_ttl = shares.share_cache.ttl
+        for label, fetch, ttl in (
+            ("three selects (before)", legacy, 0),
+            ("embedded select", via_backend, 0),
+            ("embedded + cache", via_backend, cache_ttl),
+        ):
+            shares.share_cache.clear()
+            shares.share_cache.ttl = ttl
+            before = await stub_requests(stub_url)
+            started = time.perf_counter()
+            samples = await drive(fetch, clients, requests)
+            elapsed = time.perf_counter() - started
+            db = await stub_requests(stub_url) - before
+            print(format_latencies(f"{label:<24}", samples)
+                  + f"  {len(samples) / elapsed:7.0f} req/s  {db:5d} DB requests")
+        print(f"share cache: {shares.cache_stats()}")
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--transcripts", type=int, default=200, help="transcript segments in the shared recording")
+    parser.add_argument("--stub-latency-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub_env = {"STUB_RECORDINGS": "1", "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+        os.environ.update(backend_env(stub_port))
+        asyncio.run(run(f"http://127.0.0.1:{stub_port}", args.clients, args.requests, args.transcripts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Repeat views of a long finished transcript via GET /api/recordings/{id}.
+
+Seeds one recording with N transcript segments in the stub Supabase and
+fetches it R times in three modes:
+
+  uncached (before)   transcripts refetched and re-encoded every time
+  cached + gzip       rendered once per updated_at, served pre-compressed
+  If-None-Match       the browser already holds the version: 304, no body
+
+Reports latency, bytes on the wire per view and transcript queries that
+reached the database.
+
+    python -m benchmarks.bench_transcript_cache --segments 2000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import STUB_TOKEN, backend_env, format_latencies, free_port, run_server
+
+
+async def seed(stub_url: str, segments: int) -> str:
+    async with httpx.AsyncClient(base_url=stub_url) as client:
+        recording_id = (await client.get("/rest/v1/recordings?select=id&limit=1")).json()[0]["id"]
+        await client.post("/rest/v1/transcripts", json=[
+            {"recording_id": recording_id, "text": f"this is transcript segment number {i} of the talk",
+             "start_time": i * 2.0, "end_time": i * 2.0 + 1.8, "confidence": 0.93, "is_final": True}
+            for i in range(segments)
+        ])
+    return recording_id
+
+
+async def transcript_queries(stub_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        counts = (await client.get(f"{stub_url}/_stats")).json()["requests"]
+    return counts.get("GET /rest/v1/transcripts", 0)
+
+
+async def run(stub_url: str, segments: int, requests: int) -> None:
+    import main
+    import response_cache
+    import supabase_http
+
+    recording_id = await seed(stub_url, segments)
+    url = f"/api/recordings/{recording_id}?token={STUB_TOKEN}"
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=60) as backend:
+        first = await backend.get(url, headers={"Accept-Encoding": "gzip"})
+        first.raise_for_status()
+        assert len(first.json()["transcripts"]) == segments
+        etag = first.headers["etag"]
+
+        async def live(recording_id):
+            return True
+
+        for label, headers, uncached in (
+            ("uncached (before)", {"Accept-Encoding": "gzip"}, True),
+            ("cached + gzip", {"Accept-Encoding": "gzip"}, False),
+            ("If-None-Match", {"Accept-Encoding": "gzip", "If-None-Match": etag}, False),
+        ):
+            original = main.live_broker.is_live
+            if uncached:
+                # Live recordings skip the cache: the old code path
+                main.live_broker.is_live = live
+            try:
+                before = await transcript_queries(stub_url)
+                samples, wire = [], 0
+                for _ in range(requests):
+                    t0 = time.perf_counter()
+                    response = await backend.get(url, headers=headers)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    assert response.status_code in (200, 304)
+                    wire += response.num_bytes_downloaded
+                queries = await transcript_queries(stub_url) - before
+            finally:
+                main.live_broker.is_live = original
+            print(format_latencies(f"{label:<18}", samples)
+                  + f"  {wire / requests / 1024:8.1f} KB/view  {queries:4d} transcript queries")
+        print(f"response cache: {response_cache.cache_stats()}")
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--stub-latency-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub_env = {"STUB_RECORDINGS": "1", "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+        os.environ.update(backend_env(stub_port))
+        asyncio.run(run(f"http://127.0.0.1:{stub_port}", args.segments, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Saving a 5,000-segment transcript against a local stub PostgREST.
+
+  per-segment POST (before)  one round-trip per segment, as create_recording did
+  chunked bulk insert        TRANSCRIPT_BATCH_SIZE rows per POST
+  replace_transcripts RPC    delete + insert in a single transactional call
+
+    python -m benchmarks.bench_transcript_insert --segments 5000 --batch-size 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import STUB_TOKEN, backend_env, free_port, run_server
+
+
+def make_segments(count: int):
+    from models import TranscriptSegment
+    return [
+        TranscriptSegment(text=f"segment number {i} of the meeting", start_time=i * 1.5,
+                          end_time=i * 1.5 + 1.4, confidence=0.97)
+        for i in range(count)
+    ]
+
+
+async def run(segments: int, batch_size: int) -> None:
+    import supabase_http
+    import transcripts
+    from main import get_supabase_client
+
+    recording_id = "00000000-0000-4000-8000-00000000beef"
+    segs = make_segments(segments)
+    session = await get_supabase_client(STUB_TOKEN)
+
+    async def per_segment():
+        for row in transcripts.segment_rows(recording_id, segs):
+            await session.post("/rest/v1/transcripts", json=row)
+
+    cases = [
+        ("per-segment POST (before)", per_segment),
+        (f"chunked bulk ({batch_size}/req)",
+         lambda: transcripts.insert_transcripts(session, recording_id, segs, batch_size)),
+        ("replace_transcripts RPC", lambda: transcripts.replace_transcripts(session, recording_id, segs)),
+    ]
+    for label, case in cases:
+        t0 = time.perf_counter()
+        await case()
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<30} {segments} segments in {elapsed * 1000:9.1f}ms")
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--stub-latency-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    os.environ.update(backend_env(stub_port))
+    with run_server("benchmarks.stub_supabase:app", stub_port,
+                    {"STUB_RECORDINGS": "0", "STUB_LATENCY_MS": str(args.stub_latency_ms)}):
+        asyncio.run(run(args.segments, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
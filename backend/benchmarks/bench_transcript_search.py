@@ -0,0 +1,185 @@
+"""
+Full-text transcript search over a synthetic corpus in real Postgres.
+
+The stub Supabase can't say anything useful about a GIN index, so this
+benchmark talks to Postgres directly. Point it at a DISPOSABLE database
+(it creates and truncates `recordings` / `transcripts`, and an `auth.uid()`
+that reads request.jwt.claim.sub if none exists):
+
+  1. seeds N segments of Zipf-distributed pseudo-words over R recordings
+     owned by U users
+  2. applies supabase/migrations/011_transcript_search.sql (generated
+     tsvector column, GIN index, search_transcripts function)
+  3. times, for rare / common / multi-word queries as one user:
+       ILIKE scan          substring match over the user's segments
+       search (page 1)     search_transcripts(): ranked, with snippets
+       search (pages 1-3)  same, following the keyset cursor twice
+
+Requires psycopg 3 (pip install "psycopg[binary]").
+
+    python -m benchmarks.bench_transcript_search --dsn postgresql://postgres@localhost/bench
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+
+from benchmarks.common import BACKEND_DIR, format_latencies
+
+MIGRATION = os.path.join(BACKEND_DIR, "..", "supabase", "migrations", "011_transcript_search.sql")
+
+SCHEMA = """
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+CREATE SCHEMA IF NOT EXISTS auth;
+DO $$
+BEGIN
+  IF to_regprocedure('auth.uid()') IS NULL THEN
+    CREATE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE
+      AS 'SELECT nullif(current_setting(''request.jwt.claim.sub'', true), '''')::uuid';
+  END IF;
+END $$;
+CREATE TABLE IF NOT EXISTS recordings (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID,
+  title TEXT NOT NULL DEFAULT 'Untitled Recording'
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  recording_id UUID REFERENCES recordings(id) ON DELETE CASCADE,
+  text TEXT NOT NULL,
+  start_time REAL NOT NULL,
+  end_time REAL NOT NULL,
+  confidence REAL,
+  is_final BOOLEAN DEFAULT true,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_time ON transcripts(recording_id, start_time);
+ALTER TABLE transcripts DROP COLUMN IF EXISTS search_vector;
+TRUNCATE recordings, transcripts;
+"""
+
+# Segments are 8-16 words drawn with a Zipf-like skew from the vocabulary
+SEED_TRANSCRIPTS = """
+INSERT INTO transcripts (recording_id, text, start_time, end_time, confidence)
+SELECT rec.id,
+       (SELECT string_agg((%(vocab)s::text[])[1 + floor(%(size)s * power(random(), 3))::int], ' ')
+        FROM generate_series(1, 8 + (g.n + w.k * 0) %% 9) AS w(k)),
+       g.n * 2.0, g.n * 2.0 + 1.8, 0.9
+FROM recordings rec
+CROSS JOIN generate_series(0, %(per_recording)s - 1) AS g(n)
+"""
+
+
+def vocabulary(size: int, rng: random.Random):
+    syllables = ["ka", "lo", "mi", "ren", "sa", "tor", "vel", "qu", "dan", "pe", "ris", "no", "ba", "ul", "xe"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda _: rng.random())
+
+
+def timed(cur, sql, params, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, rows
+
+
+def search_page(cur, query, limit, pages):
+    after = (None, None)
+    for _ in range(pages):
+        cur.execute(
+            "SELECT * FROM search_transcripts(%s, %s, %s, %s)",
+            (query, limit, after[0], after[1])
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return rows
+        after = (rows[-1][5], rows[-1][0])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"), required=not os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--segments", type=int, default=1_000_000)
+    parser.add_argument("--recordings", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit('psycopg 3 is required: pip install "psycopg[binary]"')
+
+    rng = random.Random(0)
+    vocab = vocabulary(args.vocabulary, rng)
+    users = [str(uuid.UUID(int=i + 1)) for i in range(args.users)]
+    per_recording = args.segments // args.recordings
+
+    with psycopg.connect(args.dsn, autocommit=True) as conn, conn.cursor() as cur:
+        cur.execute(SCHEMA)
+        cur.execute(
+            "INSERT INTO recordings (user_id, title) "
+            "SELECT (%s::uuid[])[1 + n %% %s], 'Recording ' || n FROM generate_series(0, %s - 1) AS n",
+            (users, len(users), args.recordings)
+        )
+        t0 = time.perf_counter()
+        cur.execute(SEED_TRANSCRIPTS, {"vocab": vocab, "size": len(vocab) - 1, "per_recording": per_recording})
+        print(f"seeded {args.recordings * per_recording} segments in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        with open(MIGRATION) as f:
+            cur.execute(f.read())
+        cur.execute("ANALYZE transcripts; ANALYZE recordings")
+        print(f"migration 011 (column + GIN index) in {time.perf_counter() - t0:.1f}s")
+        cur.execute(
+            "SELECT pg_size_pretty(pg_table_size('transcripts')), "
+            "pg_size_pretty(pg_relation_size('idx_transcripts_search'))"
+        )
+        table_size, index_size = cur.fetchone()
+        print(f"transcripts table {table_size}, idx_transcripts_search {index_size}\n")
+
+        cur.execute("SELECT set_config('request.jwt.claim.sub', %s, false)", (users[0],))
+        queries = {
+            "rare word": vocab[-1],
+            "mid word": vocab[len(vocab) // 20],
+            "common word": vocab[0],
+            "two words": f"{vocab[3]} {vocab[40]}",
+        }
+        for label, query in queries.items():
+            pattern = f"%{query.split()[0]}%"
+            ilike, _ = timed(cur, """
+                SELECT t.id, t.recording_id, t.start_time FROM transcripts t
+                JOIN recordings r ON r.id = t.recording_id
+                WHERE r.user_id = auth.uid() AND t.text ILIKE %s
+                ORDER BY t.recording_id, t.start_time LIMIT 20
+            """, (pattern,), args.runs)
+            first, rows = timed(cur, "SELECT * FROM search_transcripts(%s, 20)", (query,), args.runs)
+            third = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                search_page(cur, query, 20, 3)
+                third.append((time.perf_counter() - t0) * 1000)
+            cur.execute(
+                "SELECT count(*) FROM transcripts t JOIN recordings r ON r.id = t.recording_id "
+                "WHERE r.user_id = auth.uid() AND t.search_vector @@ websearch_to_tsquery('english', %s)",
+                (query,)
+            )
+            matches = cur.fetchone()[0]
+            print(f"{label} '{query}': {matches} matching segments for this user")
+            print("  " + format_latencies("ILIKE scan", ilike))
+            print("  " + format_latencies("search (page 1)", first))
+            print("  " + format_latencies("search (pages 1-3)", third))
+            if rows:
+                print(f"  top hit: rank {rows[0][5]:.3f}  {rows[0][6]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Playback seeks on a long recording: whole transcript vs a time window.
+
+Seeds one recording with N segments (2s each) in the stub Supabase and
+performs R random seeks, each asking for the WINDOW seconds after the
+playhead:
+
+  full document        GET /api/recordings/{id} (cached, gzip) per seek
+  window (live)        ?from=&to= on a live recording: bisect over an index of
+                       the session's in-memory finals, rebuilt per new final
+  window (index)       ?from=&to= on a finished one: bisect over the cached index
+
+Also times TranscriptIndex.window on its own.
+
+    python -m benchmarks.bench_transcript_seek --segments 30000 --requests 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks.common import STUB_TOKEN, backend_env, format_latencies, free_port, run_server
+from benchmarks.bench_transcript_stream import seed
+
+
+def with_token(url: str) -> str:
+    return url + ("&" if "?" in url else "?") + f"token={STUB_TOKEN}"
+
+
+async def run(stub_url: str, segments: int, requests: int, window: float) -> None:
+    import main
+    import supabase_http
+    import transcript_index
+    from broadcast import TranscriptHistory
+
+    recording_id = await seed(stub_url, segments)
+    async with httpx.AsyncClient(base_url=stub_url, timeout=120) as client:
+        rows = (await client.get(f"/rest/v1/transcripts?recording_id=eq.{recording_id}&select=*")).json()
+    history = TranscriptHistory()
+    for row in sorted(rows, key=lambda r: r["start_time"]):
+        history.add({"transcript": row["text"], "is_final": True, "confidence": row["confidence"],
+                     "start": row["start_time"], "end": row["end_time"]})
+    rng = random.Random(0)
+    seeks = [rng.uniform(0, segments * 2.0) for _ in range(requests)]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=120) as backend:
+        async def live(recording_id):
+            return True
+
+        modes = (
+            ("full document", lambda t: f"/api/recordings/{recording_id}", False),
+            ("window (live)", lambda t: f"/api/recordings/{recording_id}/transcripts?from={t}&to={t + window}", True),
+            ("window (index)", lambda t: f"/api/recordings/{recording_id}/transcripts?from={t}&to={t + window}", False),
+        )
+        for label, path, is_live in modes:
+            original = main.live_broker.is_live
+            if is_live:
+                main.live_broker.is_live = live
+                main.live_broker.histories[recording_id] = history
+            try:
+                # Warm the response cache / index outside the measurement
+                (await backend.get(with_token(path(0.0)))).raise_for_status()
+                samples, wire = [], 0
+                for t in seeks:
+                    t0 = time.perf_counter()
+                    response = await backend.get(with_token(path(t)), headers={"Accept-Encoding": "gzip"})
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    response.raise_for_status()
+                    wire += response.num_bytes_downloaded
+            finally:
+                main.live_broker.is_live = original
+                main.live_broker.histories.pop(recording_id, None)
+            print(format_latencies(f"{label:<18}", samples) + f"  {wire / requests / 1024:8.1f} KB/seek")
+
+    index = transcript_index.TranscriptIndex(rows)
+    t0 = time.perf_counter()
+    for t in seeks:
+        index.window(t, t + window)
+    per_seek = (time.perf_counter() - t0) / len(seeks) * 1e6
+    print(f"TranscriptIndex.window over {len(index)} segments: {per_seek:.1f}µs per seek")
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=30000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--stub-latency-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub_env = {"STUB_RECORDINGS": "1", "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+        os.environ.update(backend_env(stub_port))
+        asyncio.run(run(f"http://127.0.0.1:{stub_port}", args.segments, args.requests, args.window))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Export a long transcript: one JSON document vs the streaming endpoint.
+
+Seeds one recording with N transcript segments in the stub Supabase, then
+runs the backend as a real uvicorn server (the in-process ASGI transport
+buffers whole responses, which would hide time-to-first-byte). Each mode
+gets a fresh server so its peak RSS (VmHWM) is its own:
+
+  GET /api/recordings/{id}     every segment fetched, encoded and sent at once
+  .../transcripts/stream       keyset pages written as they arrive (NDJSON)
+
+The stub filters and sorts the whole table for every page, so the stream's
+total time here grows with N squared; Postgres seeks the (recording_id,
+start_time) index for each page instead. Compare TTFB and peak RSS.
+
+    python -m benchmarks.bench_transcript_stream --segments 1000 10000 30000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import STUB_TOKEN, backend_env, free_port, run_server
+
+
+async def seed(stub_url: str, segments: int) -> str:
+    async with httpx.AsyncClient(base_url=stub_url, timeout=120) as client:
+        recording_id = (await client.get("/rest/v1/recordings?select=id&limit=1")).json()[0]["id"]
+        await client.delete(f"/rest/v1/transcripts?recording_id=eq.{recording_id}")
+        await client.post("/rest/v1/transcripts", json=[
+            {"recording_id": recording_id, "text": f"this is transcript segment number {i} of the talk",
+             "start_time": i * 2.0, "end_time": i * 2.0 + 1.8, "confidence": 0.93, "is_final": True}
+            for i in range(segments)
+        ])
+    return recording_id
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def fetch(url: str):
+    async with httpx.AsyncClient(timeout=300) as client:
+        t0 = time.perf_counter()
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            first_byte = None
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - t0
+            total = time.perf_counter() - t0
+            size = response.num_bytes_downloaded
+    return first_byte * 1000, total * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, nargs="+", default=[1000, 10000, 30000])
+    parser.add_argument("--stub-latency-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub_env = {"STUB_RECORDINGS": "1", "STUB_LATENCY_MS": str(args.stub_latency_ms)}
+    with run_server("benchmarks.stub_supabase:app", stub_port, stub_env):
+        stub_url = f"http://127.0.0.1:{stub_port}"
+        for segments in args.segments:
+            recording_id = asyncio.run(seed(stub_url, segments))
+            for label, path in (
+                ("full document", f"/api/recordings/{recording_id}"),
+                ("stream (ndjson)", f"/api/recordings/{recording_id}/transcripts/stream"),
+            ):
+                port = free_port()
+                with run_server("main:app", port, backend_env(stub_port)) as proc:
+                    ttfb, total, size = asyncio.run(fetch(f"http://127.0.0.1:{port}{path}?token={STUB_TOKEN}"))
+                    rss = peak_rss_mb(proc.pid)
+                print(f"{segments:6d} segments  {label:<16} ttfb={ttfb:8.1f}ms  total={total:8.1f}ms  "
+                      f"{size / 1024:8.0f} KB  peak RSS={rss:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Peak memory of uploading a recording to a local stub Storage.
+
+Measures extra Python heap (tracemalloc peak above the starting point)
+for a 50MB recording on both upload paths:
+
+  create_recording   UploadFile read whole + multipart  vs  streamed blocks
+  save_session_data  AudioBuffer.get_wav_bytes()        vs  AudioBuffer.iter_wav()
+
+    python -m benchmarks.bench_upload_memory --megabytes 50
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+import wave
+
+from benchmarks.common import STUB_TOKEN, backend_env, free_port, run_server
+
+CHUNK = 8192  # typical websocket audio frame
+
+
+def make_upload(size: int):
+    from starlette.datastructures import Headers, UploadFile
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    for _ in range(size // len(block)):
+        spooled.write(block)
+    spooled.seek(0)
+    return UploadFile(file=spooled, size=size, headers=Headers({"content-type": "audio/webm"}))
+
+
+def make_buffer(size: int):
+    from audio import AudioBuffer
+    buffer = AudioBuffer()
+    frame = os.urandom(CHUNK)
+    for _ in range(size // CHUNK):
+        buffer.add_chunk(bytes(frame))
+    return buffer
+
+
+def legacy_wav_bytes(buffer) -> bytes:
+    """AudioBuffer.get_wav_bytes() as it was before streaming"""
+    audio_data = b"".join(buffer.iter_pcm())
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(audio_data)
+    wav_buffer.seek(0)
+    return wav_buffer.read()
+
+
+async def legacy_upload(data: bytes, content_type: str) -> None:
+    """Multipart upload of a fully materialized file, as before"""
+    import storage
+    from supabase_http import get_http_client
+    response = await get_http_client().post(
+        f"{storage.SUPABASE_URL}/storage/v1/object/recordings/bench/legacy",
+        headers={"Authorization": f"Bearer {STUB_TOKEN}", "apikey": storage.SUPABASE_KEY, "x-upsert": "true"},
+        files={"file": ("recording", data, content_type)},
+    )
+    response.raise_for_status()
+
+
+async def measure(label: str, coro_factory) -> None:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    await coro_factory()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<44} peak +{(peak - base) / 1024 / 1024:8.1f} MB")
+
+
+async def run(size: int) -> None:
+    import storage
+    import supabase_http
+
+    async def upload_before():
+        upload = make_upload(size)
+        await measure("create_recording: read() + multipart (before)",
+                      lambda: _read_and_upload(upload))
+
+    async def _read_and_upload(upload):
+        await legacy_upload(await upload.read(), "audio/webm")
+
+    async def upload_after():
+        upload = make_upload(size)
+        await measure("create_recording: streamed (after)", lambda: storage.upload_to_supabase_storage(
+            "bench", "upload", storage.iter_upload_file(upload), STUB_TOKEN, "audio/webm", content_length=upload.size))
+
+    buffer = make_buffer(size)
+
+    async def session_before():
+        await legacy_upload(legacy_wav_bytes(buffer), "audio/wav")
+
+    async def session_after():
+        await storage.upload_to_supabase_storage(
+            "bench", "session", buffer.iter_wav(), STUB_TOKEN, "audio/wav", content_length=buffer.get_wav_size())
+
+    await upload_before()
+    await upload_after()
+    await measure("save_session_data: get_wav_bytes (before)", session_before)
+    await measure("save_session_data: iter_wav (after)", session_after)
+    await supabase_http.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, default=50)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    os.environ.update(backend_env(stub_port))
+    with run_server("benchmarks.stub_supabase:app", stub_port, {"STUB_RECORDINGS": "0", "STUB_LATENCY_MS": "0"}):
+        asyncio.run(run(args.megabytes * 1024 * 1024))
+
+
+if __name__ == "__main__":
+    main()
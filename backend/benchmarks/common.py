@@ -0,0 +1,77 @@
+"""
+Shared helpers for the local benchmarks (server processes, percentiles)
+"""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Placeholder credentials understood by the stub servers
+STUB_TOKEN = "stub-user-token"
+STUB_ANON_KEY = "stub-anon-key"
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+@contextlib.contextmanager
+def run_server(app_path: str, port: int, env: Optional[Dict[str, str]] = None) -> Iterator[subprocess.Popen]:
+    """Run `uvicorn app_path` from the backend directory for the duration of the block"""
+    cmd = [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env={**os.environ, **(env or {})})
+    try:
+        wait_for_port(port)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def backend_env(supabase_port: int, **extra: str) -> Dict[str, str]:
+    """Environment that points the backend at a local stub Supabase (console logging only)"""
+    env = {
+        "SUPABASE_URL": f"http://127.0.0.1:{supabase_port}",
+        "SUPABASE_ANON_KEY": STUB_ANON_KEY,
+        "LOG_FILE": "",
+    }
+    env.update(extra)
+    return env
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def format_latencies(label: str, samples_ms: List[float]) -> str:
+    return (f"{label:<28} n={len(samples_ms):<5} "
+            f"p50={percentile(samples_ms, 50):7.2f}ms  "
+            f"p99={percentile(samples_ms, 99):7.2f}ms  "
+            f"max={max(samples_ms, default=0):7.2f}ms")
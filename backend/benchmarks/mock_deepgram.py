@@ -0,0 +1,143 @@
+"""
+Local stand-in for Deepgram's streaming endpoint (/v1/listen).
+
+It accepts linear16 audio (encoding/sample_rate/channels from the query
+string, as the backend sends them) and replays scripted Results at
+Deepgram's cadence. Every MOCK_DG_INTERIM_SECONDS of audio received
+produces an interim result covering the current utterance so far. Once
+an utterance reaches MOCK_DG_UTTERANCE_SECONDS, it is finalized with
+is_final/speech_final and followed by an UtteranceEnd. Each result is sent
+MOCK_DG_DELAY_MS after the audio it covers has arrived, which stands in
+for model and network time.
+
+`start`/`duration` are real stream offsets. The last word of every
+transcript is "@<ms>", the stream offset in milliseconds where the
+result's audio ends, so a load driver can measure audio-to-transcript
+latency from the client's side. Run with:
+
+    uvicorn benchmarks.mock_deepgram:app --port 54322
+
+Environment:
+    MOCK_DG_INTERIM_SECONDS    audio per interim result (default 1.0)
+    MOCK_DG_UTTERANCE_SECONDS  utterance length before a final (default 3.0)
+    MOCK_DG_DELAY_MS           delay before each result is sent (default 150)
+    MOCK_DG_CONNECT_MS         delay before the upgrade is accepted, standing in
+                               for DNS + TLS to the real API (default 0)
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+INTERIM_SECONDS = float(os.getenv("MOCK_DG_INTERIM_SECONDS", "1.0"))
+UTTERANCE_SECONDS = float(os.getenv("MOCK_DG_UTTERANCE_SECONDS", "3.0"))
+DELAY = float(os.getenv("MOCK_DG_DELAY_MS", "150")) / 1000
+CONNECT_DELAY = float(os.getenv("MOCK_DG_CONNECT_MS", "0")) / 1000
+
+# Roughly 2.5 words per second of speech
+WORDS_PER_SECOND = 2.5
+SCRIPT = (
+    "the quarterly numbers look better than we expected but the churn in the "
+    "enterprise segment still worries me so let us walk through the renewal "
+    "pipeline before we commit to the hiring plan for next year"
+).split()
+
+app = FastAPI()
+
+stats: Dict[str, int] = {"connections": 0, "open": 0, "audio_bytes": 0, "results": 0}
+
+
+def _result(request_id: str, start: float, end: float, is_final: bool, words: List[str]) -> dict:
+    step = (end - start) / max(len(words), 1)
+    word_list = [
+        {"word": w, "start": round(start + i * step, 3), "end": round(start + (i + 1) * step, 3), "confidence": 0.98}
+        for i, w in enumerate(words)
+    ]
+    return {
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": round(end - start, 3),
+        "start": round(start, 3),
+        "is_final": is_final,
+        "speech_final": is_final,
+        "channel": {"alternatives": [{"transcript": " ".join(words), "confidence": 0.98, "words": word_list}]},
+        "metadata": {"request_id": request_id},
+    }
+
+
+@app.get("/_stats")
+async def get_stats():
+    return stats
+
+
+@app.websocket("/v1/listen")
+async def listen(websocket: WebSocket):
+    if CONNECT_DELAY:
+        await asyncio.sleep(CONNECT_DELAY)
+    await websocket.accept()
+    params = websocket.query_params
+    bytes_per_second = int(params.get("sample_rate", "16000")) * int(params.get("channels", "1")) * 2
+    request_id = str(uuid.uuid4())
+    stats["connections"] += 1
+    stats["open"] += 1
+
+    # (due time, message) in send order; a single writer keeps results ordered
+    outbox: asyncio.Queue = asyncio.Queue()
+    words = itertools.cycle(SCRIPT)
+
+    async def writer():
+        while True:
+            due, message = await outbox.get()
+            if message is None:
+                return
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await websocket.send_text(json.dumps(message))
+            stats["results"] += message["type"] == "Results"
+
+    writer_task = asyncio.create_task(writer())
+    # Counted in bytes so chunk boundaries line up exactly with result boundaries
+    interim_bytes = round(INTERIM_SECONDS * bytes_per_second)
+    received = 0
+    emitted = 0
+    utterance_start = 0.0
+    utterance_words: List[str] = []
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                if json.loads(message["text"]).get("type") == "CloseStream":
+                    break
+                continue  # KeepAlive
+            chunk = message.get("bytes") or b""
+            stats["audio_bytes"] += len(chunk)
+            received += len(chunk)
+            due = time.monotonic() + DELAY
+            while received - emitted >= interim_bytes:
+                emitted += interim_bytes
+                emitted_to = emitted / bytes_per_second
+                utterance_words.extend(next(words) for _ in range(round(INTERIM_SECONDS * WORDS_PER_SECOND)))
+                is_final = emitted_to - utterance_start >= UTTERANCE_SECONDS - 1e-9
+                text = utterance_words + [f"@{round(emitted_to * 1000)}"]
+                outbox.put_nowait((due, _result(request_id, utterance_start, emitted_to, is_final, text)))
+                if is_final:
+                    outbox.put_nowait((due, {"type": "UtteranceEnd", "last_word_end": round(emitted_to, 3)}))
+                    utterance_start = emitted_to
+                    utterance_words = []
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stats["open"] -= 1
+        outbox.put_nowait((0, None))
+        try:
+            await writer_task
+        except Exception:
+            pass
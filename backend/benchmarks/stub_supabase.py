@@ -0,0 +1,357 @@
+"""
+Minimal in-memory stand-in for Supabase Auth, PostgREST and Storage.
+
+Only the endpoints and filter operators the backend actually uses are
+implemented. Run with:  uvicorn benchmarks.stub_supabase:app --port 54321
+
+Environment:
+    STUB_RECORDINGS   number of recordings seeded for the stub user (default 50)
+    STUB_LATENCY_MS   artificial per-request server latency (default 2)
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+STUB_USER_ID = "00000000-0000-4000-8000-000000000001"
+STUB_EMAIL = "bench@verbact.local"
+LATENCY = float(os.getenv("STUB_LATENCY_MS", "2")) / 1000
+
+app = FastAPI()
+
+tables: Dict[str, List[dict]] = {
+    "recordings": [],
+    "transcripts": [],
+    "live_shares": [],
+    "profiles": [{"id": STUB_USER_ID, "email": STUB_EMAIL, "subscription_tier": "pro", "usage_seconds": 0}],
+}
+objects: Dict[str, bytes] = {}
+request_counts: Dict[str, int] = {}
+
+
+def _seed(count: int) -> None:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        created = (base + timedelta(minutes=i)).isoformat()
+        rec_id = str(uuid.UUID(int=i + 1))
+        tables["recordings"].append({
+            "id": rec_id,
+            "user_id": STUB_USER_ID,
+            "title": f"Recording {i}",
+            "audio_url": f"{STUB_USER_ID}/{rec_id}.wav",
+            "duration_seconds": 60,
+            "created_at": created,
+            "updated_at": created,
+        })
+
+
+_seed(int(os.getenv("STUB_RECORDINGS", "50")))
+
+
+@app.middleware("http")
+async def simulate_latency(request: Request, call_next):
+    key = f"{request.method} {'/'.join(request.url.path.split('/')[:4])}"
+    request_counts[key] = request_counts.get(key, 0) + 1
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    return await call_next(request)
+
+
+@app.get("/_stats")
+async def stats():
+    return {"requests": request_counts, "rows": {k: len(v) for k, v in tables.items()}, "objects": len(objects)}
+
+
+# ---------- Auth ----------
+
+@app.get("/auth/v1/user")
+async def auth_user(request: Request):
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="missing token")
+    return {"id": STUB_USER_ID, "email": STUB_EMAIL, "aud": "authenticated"}
+
+
+# ---------- PostgREST ----------
+
+def _coerce(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return {"true": True, "false": False, "null": None}.get(value, value)
+
+
+def _matches(row: dict, column: str, expr: str) -> bool:
+    op, _, raw = expr.partition(".")
+    value = _coerce(raw)
+    current = row.get(column)
+    if op == "eq":
+        return current == value or str(current) == raw
+    if op == "neq":
+        return current != value
+    if current is None:
+        return False
+    if op == "lt":
+        return current < value if not isinstance(current, str) else current < raw
+    if op == "lte":
+        return current <= value if not isinstance(current, str) else current <= raw
+    if op == "gt":
+        return current > value if not isinstance(current, str) else current > raw
+    if op == "gte":
+        return current >= value if not isinstance(current, str) else current >= raw
+    return True
+
+
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _split_top_level(body: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for ch in body:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(op: str, body: str) -> tuple:
+    """Parse `or=(a.lt.1,and(b.eq.2,c.gt.3))` style expressions once per request"""
+    terms = []
+    for term in _split_top_level(body):
+        if term.startswith(("and(", "or(")):
+            inner_op, _, rest = term.partition("(")
+            terms.append(_parse_logic(inner_op, rest[:-1]))
+        else:
+            column, _, expr = term.partition(".")
+            terms.append((column, expr.replace('"', "")))
+    return op, terms
+
+
+def _matches_logic(row: dict, tree: tuple) -> bool:
+    op, terms = tree
+    results = (
+        _matches_logic(row, term) if isinstance(term[1], list) else _matches(row, *term)
+        for term in terms
+    )
+    return any(results) if op == "or" else all(results)
+
+
+def _filter(table: str, params) -> List[dict]:
+    rows = tables.setdefault(table, [])
+    for column, expr in params.multi_items():
+        if column in _RESERVED or "." in column:
+            continue
+        if column in ("or", "and"):
+            tree = _parse_logic(column, expr[1:-1])
+            rows = [r for r in rows if _matches_logic(r, tree)]
+        else:
+            rows = [r for r in rows if _matches(r, column, expr)]
+    return rows
+
+
+def _embed(table: str, row: dict, child: str, select: str, params, path: str):
+    """Embedded resource: many-to-one when row has `{child}_id`, otherwise one-to-many"""
+    fk = child[:-1] + "_id"
+    if fk in row:
+        parent = next((r for r in tables.get(child, []) if r["id"] == row[fk]), None)
+        return _project([parent], select, child, params, path)[0] if parent else None
+    children = [r for r in tables.get(child, []) if r.get(table[:-1] + "_id") == row["id"]]
+    return _project(_order(children, params.get(f"{path}.order", "")), select, child, params, path)
+
+
+def _project(rows: List[dict], select: str, table: str = "", params=None, path: str = "") -> List[dict]:
+    if not select or select == "*":
+        return rows
+    columns, embeds = [], []
+    for item in _split_top_level(select):
+        name, paren, rest = item.partition("(")
+        if paren:
+            embeds.append((name, rest[:-1]))
+        else:
+            columns.append(item)
+    projected = []
+    for r in rows:
+        out = dict(r) if "*" in columns else {c: r.get(c) for c in columns}
+        for child, child_select in embeds:
+            out[child] = _embed(table, r, child, child_select, params, f"{path}.{child}".lstrip("."))
+        projected.append(out)
+    return projected
+
+
+def _order(rows: List[dict], order: str) -> List[dict]:
+    for clause in reversed(order.split(",")):
+        if not clause:
+            continue
+        column, _, direction = clause.partition(".")
+        rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith("desc"))
+    return rows
+
+
+@app.api_route("/rest/v1/{table}", methods=["GET", "HEAD"])
+async def rest_select(table: str, request: Request):
+    params = request.query_params
+    rows = _order(_filter(table, params), params.get("order", ""))
+    offset = int(params.get("offset", 0))
+    limit = params.get("limit")
+    page = rows[offset:offset + int(limit)] if limit else rows[offset:]
+    headers = {}
+    if "count=exact" in request.headers.get("prefer", ""):
+        headers["Content-Range"] = f"{offset}-{offset + max(len(page) - 1, 0)}/{len(rows)}"
+    if request.method == "HEAD":
+        return Response(headers={"Content-Range": f"*/{len(rows)}"})
+    return JSONResponse(_project(page, params.get("select", "*"), table, params), headers=headers)
+
+
+@app.post("/rest/v1/{table}")
+async def rest_insert(table: str, request: Request):
+    payload = await request.json()
+    rows = payload if isinstance(payload, list) else [payload]
+    store = tables.setdefault(table, [])
+    upsert = "merge-duplicates" in request.headers.get("prefer", "")
+    now = datetime.now(timezone.utc).isoformat()
+    for row in rows:
+        row = {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **row}
+        existing = next((r for r in store if r["id"] == row["id"]), None) if upsert else None
+        if existing is not None:
+            existing.update(row)
+        else:
+            store.append(row)
+    return Response(status_code=201)
+
+
+@app.patch("/rest/v1/{table}")
+async def rest_update(table: str, request: Request):
+    changes = await request.json()
+    rows = _filter(table, request.query_params)
+    for row in rows:
+        row.update(changes)
+    if "return=representation" in request.headers.get("prefer", ""):
+        return JSONResponse(rows)
+    return Response(status_code=204)
+
+
+@app.delete("/rest/v1/{table}")
+async def rest_delete(table: str, request: Request):
+    doomed = {id(r) for r in _filter(table, request.query_params)}
+    tables[table] = [r for r in tables.get(table, []) if id(r) not in doomed]
+    return Response(status_code=204)
+
+
+@app.post("/rest/v1/rpc/replace_transcripts")
+async def rpc_replace_transcripts(request: Request):
+    body = await request.json()
+    recording_id = body["p_recording_id"]
+    now = datetime.now(timezone.utc).isoformat()
+    kept = [t for t in tables["transcripts"] if t.get("recording_id") != recording_id]
+    kept.extend(
+        {"id": str(uuid.uuid4()), "recording_id": recording_id, "created_at": now, **seg}
+        for seg in body["p_segments"]
+    )
+    tables["transcripts"] = kept
+    return JSONResponse(len(body["p_segments"]))
+
+
+@app.post("/rest/v1/rpc/increment_usage")
+async def rpc_increment_usage(request: Request):
+    body = await request.json()
+    sessions = tables.setdefault("usage_sessions", [])
+    session = next((s for s in sessions if s["session_id"] == body["p_session_id"]), None)
+    if session is None:
+        session = {"session_id": body["p_session_id"], "user_id": body["p_user_id"], "seconds": 0}
+        sessions.append(session)
+    delta = max(body["p_seconds"] - session["seconds"], 0)
+    session["seconds"] += delta
+    profile = next((p for p in tables["profiles"] if p["id"] == body["p_user_id"]), None)
+    if profile is None:
+        return JSONResponse(None)
+    profile["usage_seconds"] = (profile.get("usage_seconds") or 0) + delta
+    return JSONResponse(profile["usage_seconds"])
+
+
+@app.post("/rest/v1/rpc/search_transcripts")
+async def rpc_search_transcripts(request: Request):
+    """Term-frequency stand-in for the tsvector search (no stemming, linear scan)"""
+    body = await request.json()
+    terms = [t for t in body["p_query"].lower().split() if t]
+    owned = {r["id"]: r["title"] for r in tables["recordings"] if r["user_id"] == STUB_USER_ID}
+    after = (body.get("p_after_rank"), body.get("p_after_id"))
+    hits = []
+    for t in tables["transcripts"]:
+        if t.get("recording_id") not in owned:
+            continue
+        words = t["text"].lower().split()
+        if not terms or not all(term in words for term in terms):
+            continue
+        rank = float(sum(words.count(term) for term in terms)) / 10
+        if after[0] is not None and (rank, t["id"]) >= after:
+            continue
+        snippet = " ".join(f"<mark>{w}</mark>" if w.lower() in terms else w for w in t["text"].split())
+        hits.append({
+            "id": t["id"], "recording_id": t["recording_id"], "recording_title": owned[t["recording_id"]],
+            "start_time": t["start_time"], "end_time": t["end_time"], "rank": rank, "snippet": snippet,
+        })
+    hits.sort(key=lambda h: (h["rank"], h["id"]), reverse=True)
+    return JSONResponse(hits[:body.get("p_limit", 20)])
+
+
+# ---------- Storage ----------
+
+@app.post("/storage/v1/object/sign/{bucket}")
+async def storage_sign_bulk(bucket: str, request: Request):
+    body = await request.json()
+    return [
+        {"error": None, "path": path, "signedURL": f"/object/sign/{bucket}/{path}?token=stub-signature"}
+        for path in body.get("paths", [])
+    ]
+
+
+@app.post("/storage/v1/object/sign/{bucket}/{path:path}")
+async def storage_sign(bucket: str, path: str):
+    return {"signedURL": f"/object/sign/{bucket}/{path}?token=stub-signature"}
+
+
+@app.get("/storage/v1/object/sign/{bucket}/{path:path}")
+async def storage_signed_download(bucket: str, path: str, token: str = ""):
+    if not token:
+        return JSONResponse({"error": "invalid_signature", "message": "Missing token"}, status_code=400)
+    return await storage_download(bucket, path)
+
+
+@app.post("/storage/v1/object/{bucket}/{path:path}")
+async def storage_upload(bucket: str, path: str, request: Request):
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+    objects[f"{bucket}/{path}"] = bytes(body)
+    return {"Key": f"{bucket}/{path}", "size": len(body)}
+
+
+@app.get("/storage/v1/object/{bucket}/{path:path}")
+async def storage_download(bucket: str, path: str):
+    key = f"{bucket}/{path}"
+    if key not in objects:
+        return JSONResponse({"error": "not_found", "message": "Object not found"}, status_code=400)
+    return Response(objects[key], media_type="application/octet-stream")
+
+
+@app.delete("/storage/v1/object/{bucket}")
+async def storage_delete_many(bucket: str, request: Request):
+    body = await request.json()
+    deleted = [p for p in body.get("prefixes", []) if objects.pop(f"{bucket}/{p}", None) is not None]
+    return [{"name": p} for p in deleted]
+
+
+@app.delete("/storage/v1/object/{bucket}/{path:path}")
+async def storage_delete(bucket: str, path: str):
+    objects.pop(f"{bucket}/{path}", None)
+    return Response(status_code=200)
@@ -0,0 +1,229 @@
+"""
+Fan-out of live transcript messages to share viewers.
+
+The speaker's receive loop only calls BroadcastHub.publish(), which
+serializes a message once and hands it to each viewer's channel without
+awaiting anything. Every viewer has its own writer task and a bounded
+queue:
+
+- final results are queued in order; a viewer whose queue is full, or
+  whose socket stalls for BROADCAST_SEND_TIMEOUT, is evicted (closed with
+  4008) instead of slowing anyone else down
+- interim results are coalesced: only the newest pending interim is kept,
+  and a final supersedes it
+
+TranscriptHistory is what late joiners get: finals plus the latest interim
+only, sent as a single "snapshot" frame instead of replaying every message.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import WebSocket
+
+from metrics import FANOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "256"))
+BROADCAST_SEND_TIMEOUT = float(os.getenv("BROADCAST_SEND_TIMEOUT", "10"))
+EVICT_CLOSE_CODE = 4008
+
+
+class TranscriptHistory:
+    """Finals plus the latest interim of one live recording.
+
+    Interims are superseded by the next result, so only one is kept; finals
+    are stored without the per-message timestamp and serialized once when
+    they arrive. The finals part of the snapshot frame is built on the first
+    join after a new final and reused until the next one.
+    """
+
+    __slots__ = ("_finals", "_finals_json", "_finals_frame", "_interim", "_size")
+
+    def __init__(self):
+        self._finals: List[dict] = []
+        self._finals_json: List[str] = []
+        self._finals_frame: Optional[str] = None
+        self._interim: Optional[dict] = None
+        self._size = 0
+
+    def add(self, message: dict):
+        if message.get("is_final"):
+            final = {
+                "transcript": message["transcript"],
+                "confidence": message.get("confidence"),
+                "start": message.get("start", 0),
+                "end": message.get("end", 0),
+            }
+            encoded = json.dumps(final)
+            self._finals.append(final)
+            self._finals_json.append(encoded)
+            self._finals_frame = None
+            self._size += len(encoded)
+            self._interim = None
+        else:
+            self._interim = {"transcript": message["transcript"], "confidence": message.get("confidence")}
+
+    @property
+    def finals(self) -> List[dict]:
+        return self._finals
+
+    @property
+    def interim(self) -> Optional[dict]:
+        return self._interim
+
+    def __len__(self) -> int:
+        return len(self._finals) + (self._interim is not None)
+
+    def snapshot(self) -> str:
+        """One frame with everything a new viewer needs"""
+        if self._finals_frame is None:
+            self._finals_frame = f'{{"type": "snapshot", "finals": [{", ".join(self._finals_json)}], "interim": '
+        interim = json.dumps(self._interim) if self._interim is not None else "null"
+        return self._finals_frame + interim + "}"
+
+    def stats(self) -> dict:
+        return {"finals": len(self._finals), "final_bytes": self._size, "has_interim": self._interim is not None}
+
+
+class ViewerChannel:
+    """One viewer's send queue and writer task"""
+
+    __slots__ = ("hub", "recording_id", "websocket", "queue", "interim", "wakeup", "closed", "task")
+
+    def __init__(self, hub: "BroadcastHub", recording_id: str, websocket: WebSocket, backlog: Iterable[str] = ()):
+        self.hub = hub
+        self.recording_id = recording_id
+        self.websocket = websocket
+        # History for late joiners goes out first and does not count against the queue limit
+        self.queue = deque(backlog)
+        self.interim: Optional[str] = None
+        self.wakeup = asyncio.Event()
+        if self.queue:
+            self.wakeup.set()
+        self.closed = False
+        self.task = asyncio.create_task(self._writer())
+
+    def offer(self, payload: str, is_final: bool) -> bool:
+        """Queue a message without blocking; False means the viewer can't keep up"""
+        if self.closed:
+            return False
+        if is_final:
+            if len(self.queue) >= BROADCAST_QUEUE_SIZE:
+                return False
+            self.queue.append(payload)
+            self.interim = None
+        else:
+            if self.interim is not None:
+                self.hub.coalesced += 1
+            self.interim = payload
+        self.wakeup.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue or self.interim is not None:
+                    if self.queue:
+                        payload = self.queue.popleft()
+                    else:
+                        payload, self.interim = self.interim, None
+                    await asyncio.wait_for(self.websocket.send_text(payload), BROADCAST_SEND_TIMEOUT)
+                    self.hub.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.hub.evict(self, f"send failed: {e!r}")
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self.interim = None
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
+class BroadcastHub:
+    """Live share viewers per recording"""
+
+    def __init__(self):
+        self.channels: Dict[str, Dict[int, ViewerChannel]] = {}
+        self.published = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.evicted = 0
+        self._closing = set()
+
+    def subscribe(self, recording_id: str, websocket: WebSocket, backlog: Iterable[str] = ()) -> ViewerChannel:
+        channel = ViewerChannel(self, recording_id, websocket, backlog)
+        self.channels.setdefault(recording_id, {})[id(channel)] = channel
+        return channel
+
+    def unsubscribe(self, channel: ViewerChannel):
+        channel.close()
+        viewers = self.channels.get(channel.recording_id)
+        if viewers is not None:
+            viewers.pop(id(channel), None)
+            if not viewers:
+                del self.channels[channel.recording_id]
+
+    def viewer_count(self, recording_id: str) -> int:
+        return len(self.channels.get(recording_id, ()))
+
+    def publish(self, recording_id: str, message: dict) -> int:
+        """Serialize once and enqueue for every viewer; never awaits. Returns the viewer count."""
+        viewers = self.channels.get(recording_id)
+        if not viewers:
+            return 0
+        started = time.perf_counter()
+        self.published += 1
+        payload = json.dumps(message)
+        is_final = bool(message.get("is_final"))
+        for channel in list(viewers.values()):
+            if not channel.offer(payload, is_final):
+                self.evict(channel, "send queue full")
+        FANOUT_SECONDS.observe(time.perf_counter() - started)
+        return len(viewers)
+
+    def evict(self, channel: ViewerChannel, reason: str):
+        if channel.closed:
+            return
+        self.evicted += 1
+        logger.info("🐢 Evicting live viewer of %s: %s", channel.recording_id, reason)
+        self.unsubscribe(channel)
+        self._schedule_close(channel, EVICT_CLOSE_CODE, "viewer too slow")
+
+    def _schedule_close(self, channel: ViewerChannel, code: int, reason: str):
+        task = asyncio.create_task(self._close_socket(channel.websocket, code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_socket(websocket: WebSocket, code: int, reason: str):
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), BROADCAST_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def close_recording(self, recording_id: str):
+        """The recording was deleted: unsubscribe its viewers and close their sockets normally"""
+        for channel in list(self.channels.get(recording_id, {}).values()):
+            self.unsubscribe(channel)
+            self._schedule_close(channel, 1000, "recording deleted")
+
+    def stats(self) -> dict:
+        return {
+            "recordings": len(self.channels),
+            "viewers": sum(len(v) for v in self.channels.values()),
+            "published": self.published,
+            "sent": self.sent,
+            "coalesced_interims": self.coalesced,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,78 @@
+"""
+Deepgram streaming connections for /ws/transcribe.
+
+Opening the upstream WebSocket (DNS, TCP, TLS, HTTP upgrade) used to start
+only after the token check and the profile lookup, so a speaker's first
+words waited for both round trips in sequence. With DEEPGRAM_PREWARM on
+(the default), the connection is started speculatively as soon as a
+socket arrives with a token, concurrently with auth. When auth fails, the
+connection is closed unused.
+
+Nothing is read from the client before the upstream is ready. Audio that
+arrives early waits in the ASGI receive queue (and then in TCP) and is
+forwarded in order once the session loop starts, so no extra copy is made.
+If the speculative attempt failed, one plain connect is tried before the
+session gives up.
+
+A pool of idle, pre-authenticated streams was not used. Deepgram closes
+streams that receive neither audio nor KeepAlive within about 10 seconds,
+and every stream is fixed to the query parameters it was opened with.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+# Streaming endpoint (overridable so load tests can point at a local mock)
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "wss://api.deepgram.com/v1/listen")
+# Interim results enabled for real-time transcription
+DEEPGRAM_PARAMS = (
+    "model=nova-2&smart_format=true&interim_results=true&filler_words=false&punctuate=true"
+    "&encoding=linear16&sample_rate=16000&channels=1&endpointing=200"
+)
+DEEPGRAM_PREWARM = os.getenv("DEEPGRAM_PREWARM", "true").lower() == "true"
+DEEPGRAM_CONNECT_TIMEOUT = float(os.getenv("DEEPGRAM_CONNECT_TIMEOUT", "10"))
+
+
+async def connect(api_key: str):
+    """Open one streaming connection"""
+    return await websockets.connect(
+        f"{DEEPGRAM_URL}?{DEEPGRAM_PARAMS}",
+        additional_headers={"Authorization": f"Token {api_key}"},
+        open_timeout=DEEPGRAM_CONNECT_TIMEOUT,
+    )
+
+
+class UpstreamConnection:
+    """A Deepgram connection that may already be opening while the client authenticates"""
+
+    def __init__(self, api_key: str, speculative: bool = DEEPGRAM_PREWARM):
+        self.api_key = api_key
+        self._task: Optional[asyncio.Task] = asyncio.create_task(connect(api_key)) if speculative else None
+
+    async def get(self):
+        """The open connection; falls back to a fresh connect if the early attempt failed"""
+        if self._task is not None:
+            task, self._task = self._task, None
+            try:
+                return await task
+            except Exception as e:
+                logger.warning(f"⚠️ Speculative Deepgram connect failed ({e!r}); retrying")
+        return await connect(self.api_key)
+
+    async def discard(self) -> None:
+        """Drop an unused speculative connection (auth failed)"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        if not task.done():
+            task.cancel()
+        try:
+            connection = await task
+        except (asyncio.CancelledError, Exception):
+            return
+        await connection.close()
@@ -0,0 +1,104 @@
+"""
+Audio-to-transcript latency for live sessions.
+
+Deepgram stamps every result with `start` and `duration`, in seconds of the
+audio stream we sent. The tracker keeps a mark for every chunk forwarded
+(how many seconds of audio had been sent, and when), so a result covering
+audio up to `start + duration` can be matched to the moment the chunk
+holding its last sample left this server. The difference between that
+moment and the result's arrival is the real audio-to-transcript latency,
+which includes Deepgram buffering, endpointing and the network in both
+directions. The older "time since the last chunk" figure mostly measured
+chunk cadence.
+
+Latency is kept per session (interim and final separately) and is also fed
+into the process-wide verbact_transcript_latency_seconds histogram.
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import metrics
+from audio import SAMPLE_WIDTH
+
+# Trim marks for audio that is already finalized once this many have piled up
+_PRUNE_THRESHOLD = 512
+
+
+class TranscriptLatencyTracker:
+    """Maps stream offsets to send times for one Deepgram connection"""
+
+    __slots__ = ("bytes_per_second", "bytes_sent", "clamped", "interim", "final", "_offsets", "_sent_at")
+
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, sample_width: int = SAMPLE_WIDTH):
+        self.bytes_per_second = sample_rate * channels * sample_width
+        self.bytes_sent = 0
+        # Results that claimed more audio than had been sent (matched to the newest chunk)
+        self.clamped = 0
+        self.interim = metrics.Histogram(metrics.LATENCY_BUCKETS)
+        self.final = metrics.Histogram(metrics.LATENCY_BUCKETS)
+        # Audio seconds sent after each chunk, and when that chunk was sent
+        self._offsets: List[float] = []
+        self._sent_at: List[float] = []
+
+    @property
+    def audio_seconds_sent(self) -> float:
+        return self.bytes_sent / self.bytes_per_second
+
+    def on_audio_sent(self, size_bytes: int, now: Optional[float] = None) -> None:
+        self.bytes_sent += size_bytes
+        self._offsets.append(self.bytes_sent / self.bytes_per_second)
+        self._sent_at.append(time.perf_counter() if now is None else now)
+
+    def on_result(self, start: float, duration: float, is_final: bool, now: Optional[float] = None) -> Optional[float]:
+        """Record one Deepgram result; returns its latency in seconds (None before any audio)"""
+        if not self._offsets:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        end = start + duration
+        index = bisect_left(self._offsets, end)
+        if index == len(self._offsets):
+            # Rounding in Deepgram's timestamps can overshoot the stream by a sample or two
+            index -= 1
+            if end - self._offsets[index] > 0.01:
+                self.clamped += 1
+        latency = max(0.0, now - self._sent_at[index])
+
+        (self.final if is_final else self.interim).observe(latency)
+        metrics.TRANSCRIPT_LATENCY.labels("final" if is_final else "interim").observe(latency)
+
+        if is_final and index > _PRUNE_THRESHOLD:
+            # Later results only cover audio after this final, so earlier marks are dead
+            del self._offsets[:index]
+            del self._sent_at[:index]
+        return latency
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "audio_seconds_sent": round(self.audio_seconds_sent, 2),
+            "interim": histogram_summary(self.interim),
+            "final": histogram_summary(self.final),
+            "clamped": self.clamped,
+        }
+
+
+def histogram_summary(histogram: metrics.Histogram) -> Dict[str, float]:
+    """Count and percentiles in milliseconds"""
+    if not histogram.count:
+        return {"count": 0}
+    return {
+        "count": histogram.count,
+        "p50_ms": round(histogram.quantile(0.50) * 1000, 1),
+        "p95_ms": round(histogram.quantile(0.95) * 1000, 1),
+        "p99_ms": round(histogram.quantile(0.99) * 1000, 1),
+        "max_ms": round(histogram.max * 1000, 1),
+    }
+
+
+def aggregate_stats() -> Dict[str, Dict[str, float]]:
+    """Worker-wide latency percentiles since startup, for /health"""
+    return {
+        result: histogram_summary(metrics.TRANSCRIPT_LATENCY.labels(result))
+        for result in ("interim", "final")
+    }
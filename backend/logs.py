@@ -0,0 +1,143 @@
+"""
+Structured, non-blocking logging for the API process.
+
+Log calls on the event loop only check the level and put the record on an
+in-memory queue (QueueHandler). A QueueListener thread does the formatting
+I/O: human-readable lines to stderr and, if LOG_FILE is set, JSON lines to a
+size-rotated file.
+Records below LOG_LEVEL are dropped by the logger's cached level check
+before any message formatting, so hot-path logger.debug("...%s", x) calls
+cost almost nothing when debug logging is off.
+
+Environment:
+    LOG_LEVEL           DEBUG / INFO / WARNING ... (default INFO, DEBUG when DEBUG=true)
+    LOG_FORMAT          console format: text (default) or json
+    LOG_FILE            JSON log file (default none: stderr only)
+    LOG_FILE_MAX_BYTES  rotate the file at this size (default 10 MB)
+    LOG_FILE_BACKUPS    rotated files to keep (default 5)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Optional
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Chatty third-party loggers (one INFO line per HTTP request)
+_QUIET_LOGGERS = ("httpx", "httpcore", "hpack", "websockets")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ContextFormatter(logging.Formatter):
+    """Plain text, with any `extra` context (client_id, recording_id, ...) appended"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_FIELDS and not key.startswith("_")
+        )
+        return f"{line} [{context}]" if context else line
+
+
+class _PreparedQueueHandler(logging.handlers.QueueHandler):
+    """Merge args into the message on enqueue but keep the record's own fields.
+
+    The stock prepare() replaces msg with fully formatted output, which would
+    leave the listener's formatters nothing structured to work with.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The root logger has no other handler, so the record can be changed in place
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks can't cross threads safely once the frame is gone
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging() -> None:
+    """Route the root logger through a queue to console + rotating JSON file (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    default_level = "DEBUG" if os.getenv("DEBUG", "false").lower() == "true" else "INFO"
+    level = getattr(logging, os.getenv("LOG_LEVEL", default_level).upper(), logging.INFO)
+
+    console = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(ContextFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+    handlers = [console]
+
+    log_file = os.getenv("LOG_FILE", "")
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_FILE_BACKUPS", "5")),
+            encoding="utf-8",
+            delay=True,
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    # Skip record fields nothing here prints (see "Optimization" in the logging HOWTO):
+    # the caller's file/line lookup walks the stack on every call
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_PreparedQueueHandler(log_queue))
+    root.setLevel(level)
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
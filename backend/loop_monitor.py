@@ -0,0 +1,82 @@
+"""
+Event-loop lag monitor.
+
+A background task asks to wake up every LOOP_LAG_INTERVAL seconds and
+records how late it actually woke up. Anything that blocks the loop (a
+synchronous HTTP call, file I/O, heavy CPU work) shows up directly as lag,
+and that is also how long every live WebSocket on the worker stalled.
+/health reports the recent lag percentiles and the worst stall.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from metrics import LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+# Stalls longer than this are counted (and logged when LOOP_LAG_WARN is set)
+LOOP_LAG_STALL_MS = float(os.getenv("LOOP_LAG_STALL_MS", "100"))
+
+
+class LoopLagMonitor:
+    """Samples scheduling delay of the running event loop"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, samples: int = 600):
+        self.interval = interval
+        self.lags_ms = deque(maxlen=samples)
+        self.max_ms = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        warn = os.getenv("LOOP_LAG_WARN", "false").lower() == "true"
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, (time.perf_counter() - expected) * 1000)
+            self.record(lag)
+            if warn and lag >= LOOP_LAG_STALL_MS:
+                logger.warning(f"⚠️ Event loop stalled for {lag:.0f}ms")
+
+    def record(self, lag_ms: float) -> None:
+        self.lags_ms.append(lag_ms)
+        LOOP_LAG_SECONDS.observe(lag_ms / 1000)
+        if lag_ms > self.max_ms:
+            self.max_ms = lag_ms
+        if lag_ms >= LOOP_LAG_STALL_MS:
+            self.stalls += 1
+
+    def stats(self) -> Dict[str, float]:
+        ordered = sorted(self.lags_ms)
+
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2) if ordered else 0.0
+
+        return {
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "recent_max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "stalls": self.stalls,
+        }
+
+
+loop_monitor = LoopLagMonitor()
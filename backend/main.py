@@ -1,43 +1,78 @@
-from fastapi import FastAPI, WebSocket, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, WebSocket, HTTPException, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import os
 import asyncio
 import json
+import logging
 from dotenv import load_dotenv
-import websockets
 from datetime import datetime, timedelta, timezone
-from collections import deque
 import time
 import uuid
-import httpx
-import io
-import wave
-import struct
+import base64
 import secrets
-from typing import Dict, List, Optional, Set
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 from models import (
     RecordingCreate, RecordingUpdate, RecordingResponse,
     LiveShareCreate, LiveShareResponse, ShareViewResponse,
     TranscriptSegment
 )
+from supabase_http import SupabaseSession, get_http_client, open_pool, close_pool
 load_dotenv()
 
+from logs import configure_logging
+# Before the other modules log anything
+configure_logging()
+logger = logging.getLogger(__name__)
+
+import admin
+import auth
+import deepgram
+import latency
+import metrics
+import response_cache
+import shares
+import storage
+from auth import get_user
+from storage import (
+    upload_to_supabase_storage, iter_upload_file, create_signed_url,
+    delete_from_supabase_storage
+)
+from audio import AudioBuffer, AUDIO_UPLOAD_FORMAT, encode_flac, shutdown_encoder_pool
+from transcripts import (
+    parse_segments, insert_transcripts, replace_transcripts, fetch_transcript_page,
+    fetch_all_transcripts, stream_transcript_export, search_transcripts,
+    EXPORT_MEDIA_TYPES, TRANSCRIPT_COLUMNS, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+)
+import transcript_index
+from loop_monitor import loop_monitor
+from broadcast import BroadcastHub
+from pubsub import create_broker
+from segments import (
+    SegmentUploader, AUDIO_SEGMENT_SECONDS, AUDIO_URL_SECRET, sign_audio_paths, playback_url, is_manifest_path,
+    verify_playback, load_playback_plan, playback_plans, parse_range, iter_playback_audio, playback_size,
+    delete_segmented
+)
+
 # Debug mode
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
-app = FastAPI()
-
-# Setup file logging
-def log_to_file(msg):
-    with open("debug.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat()}] {msg}\n")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client (keep-alive, HTTP/2) shared by every Supabase call
+    await open_pool()
+    await live_broker.start()
+    loop_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_monitor.stop()
+        await live_broker.close()
+        await close_pool()
+        shutdown_encoder_pool()
 
-# Override print to also log to file (simple hack for debugging)
-original_print = print
-def print(*args, **kwargs):
-    msg = " ".join(map(str, args))
-    log_to_file(msg)
-    original_print(*args, **kwargs)
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +80,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 from routers import payments
@@ -52,17 +88,38 @@ app.include_router(payments.router, prefix="/api/payments", tags=["payments"])
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "ok",
+        "timestamp": datetime.now().isoformat(),
+        "caches": {
+            "auth": auth.cache_stats(),
+            "signed_urls": storage.signed_url_cache.stats(),
+            "shares": shares.cache_stats(),
+            "responses": response_cache.cache_stats(),
+            "transcript_index": transcript_index.cache_stats()
+        },
+        "broadcast": broadcast_hub.stats(),
+        "live": live_broker.stats(),
+        "event_loop": loop_monitor.stats(),
+        "transcript_latency": latency.aggregate_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus scrape target (this worker's numbers only)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Performance tracking class
 class PerformanceMetrics:
-    def __init__(self):
+    """Per-session stats for the debug log; also feeds the process-wide /metrics"""
+
+    def __init__(self, sample_rate=16000, channels=1):
         self.chunks_sent = 0
         self.transcripts_received = 0
         self.total_bytes_sent = 0
-        self.chunk_timestamps = deque(maxlen=100)  # Track last 100 chunks
-        self.latencies = deque(maxlen=50)  # Track last 50 latencies
+        self.latency = latency.TranscriptLatencyTracker(sample_rate, channels)
         self.start_time = time.time()
+        self.first_chunk_time = None
         self.last_chunk_time = None
         self.last_transcript_time = None
         
@@ -70,33 +127,28 @@ class PerformanceMetrics:
         self.chunks_sent += 1
         self.total_bytes_sent += size_bytes
         current_time = time.time()
-        self.chunk_timestamps.append(current_time)
+        if self.first_chunk_time is None:
+            self.first_chunk_time = current_time
         self.last_chunk_time = current_time
+        self.latency.on_audio_sent(size_bytes)
+        metrics.AUDIO_CHUNKS.inc()
+        metrics.AUDIO_BYTES.inc(size_bytes)
         
-    def log_transcript_received(self):
+    def log_transcript_received(self, is_final, start, duration, received_at=None):
+        """Count a result and measure its audio-to-transcript latency (ms)"""
         self.transcripts_received += 1
-        current_time = time.time()
-        self.last_transcript_time = current_time
-        
-        # Calculate latency if we have a recent chunk
-        if self.last_chunk_time:
-            latency = (current_time - self.last_chunk_time) * 1000  # Convert to ms
-            self.latencies.append(latency)
-            return latency
-        return None
+        self.last_transcript_time = time.time()
+        metrics.TRANSCRIPTS_RECEIVED.labels("true" if is_final else "false").inc()
+        seconds = self.latency.on_result(start, duration, is_final, received_at)
+        return seconds * 1000 if seconds is not None else None
     
     def get_chunks_per_second(self):
-        if len(self.chunk_timestamps) < 2:
+        if self.chunks_sent < 2:
             return 0
-        time_span = self.chunk_timestamps[-1] - self.chunk_timestamps[0]
+        time_span = self.last_chunk_time - self.first_chunk_time
         if time_span == 0:
             return 0
-        return len(self.chunk_timestamps) / time_span
-    
-    def get_avg_latency(self):
-        if not self.latencies:
-            return 0
-        return sum(self.latencies) / len(self.latencies)
+        return (self.chunks_sent - 1) / time_span
     
     def get_stats_summary(self):
         runtime = time.time() - self.start_time
@@ -106,62 +158,17 @@ class PerformanceMetrics:
             "transcripts_received": self.transcripts_received,
             "total_bytes": self.total_bytes_sent,
             "chunks_per_sec": round(self.get_chunks_per_second(), 2),
-            "avg_latency_ms": round(self.get_avg_latency(), 2),
-            "min_latency_ms": round(min(self.latencies), 2) if self.latencies else 0,
-            "max_latency_ms": round(max(self.latencies), 2) if self.latencies else 0
+            "latency": self.latency.summary()
         }
 
-# Audio buffer class to store audio chunks during recording
-class AudioBuffer:
-    def __init__(self):
-        self.chunks = []
-        self.sample_rate = 16000
-        self.channels = 1
-        
-    def add_chunk(self, chunk: bytes):
-        """Add audio chunk to buffer"""
-        self.chunks.append(chunk)
-    
-    def get_wav_bytes(self) -> bytes:
-        """Convert buffered chunks to WAV file bytes"""
-        if not self.chunks:
-            return b""
-        
-        # Convert bytes to int16 array
-        audio_data = b"".join(self.chunks)
-        
-        # Create WAV file in memory
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(self.channels)
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(self.sample_rate)
-            wav_file.writeframes(audio_data)
-        
-        wav_buffer.seek(0)
-        return wav_buffer.read()
-    
-    def get_duration_seconds(self) -> float:
-        """Calculate total duration in seconds"""
-        if not self.chunks:
-            return 0.0
-        total_bytes = sum(len(chunk) for chunk in self.chunks)
-        # 16-bit = 2 bytes per sample
-        total_samples = total_bytes // 2
-        return total_samples / self.sample_rate
-    
-    def clear(self):
-        """Clear all buffered chunks"""
-        self.chunks = []
-
 # Supabase client initialization
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
 
 async def get_supabase_client(token: str):
-    """Create Supabase client with user token"""
-    return httpx.AsyncClient(
-        base_url=SUPABASE_URL,
+    """Supabase REST session with user token (backed by the shared connection pool)"""
+    return SupabaseSession(
+        SUPABASE_URL,
         headers={
             "Authorization": f"Bearer {token}",
             "apikey": SUPABASE_KEY,
@@ -169,74 +176,11 @@ async def get_supabase_client(token: str):
         }
     )
 
-# Admin client for service role operations (Bypass RLS)
-from supabase import create_client, Client
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase_admin: Optional[Client] = None
-if SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
-    try:
-        supabase_admin = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-        print("✅ Supabase Admin initialized")
-    except Exception as e:
-        print(f"⚠️ Failed to init Supabase Admin: {e}")
-
-async def upload_to_supabase_storage(user_id: str, recording_id: str, audio_bytes: bytes, token: str, content_type: str = "audio/wav") -> str:
-    """Upload audio file to Supabase Storage and return the storage path"""
-    # Determine extension based on content_type
-    ext = "webm" if "webm" in content_type else "wav"
-    filename = f"{user_id}/{recording_id}.{ext}"
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{SUPABASE_URL}/storage/v1/object/recordings/{filename}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "apikey": SUPABASE_KEY,
-                "x-upsert": "true" # Allow overwriting existing files
-            },
-            files={"file": (f"recording.{ext}", audio_bytes, content_type)}
-        )
-        
-        if response.status_code not in [200, 201]:
-            raise HTTPException(status_code=500, detail=f"Storage upload failed: {response.text}")
-        
-        # Return internal storage path, NOT public URL
-        return filename
-
-async def create_signed_url(filename: str, token: str, expires_in: int = 3600) -> str:
-    """Create a signed URL for a file in storage"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{SUPABASE_URL}/storage/v1/object/sign/recordings/{filename}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "apikey": SUPABASE_KEY,
-                "Content-Type": "application/json"
-            },
-            json={"expiresIn": expires_in}
-        )
-        
-        if response.status_code != 200:
-            print(f"Failed to sign URL for {filename}: {response.text}")
-            return None
-            
-        data = response.json()
-        # The signedURL returned is relative to the Supabase URL
-        return f"{SUPABASE_URL}/storage/v1{data['signedURL']}"
-
-async def delete_from_supabase_storage(filename: str, token: str) -> None:
-    """Delete a file from Supabase Storage (ignore missing)"""
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(
-            f"{SUPABASE_URL}/storage/v1/object/recordings/{filename}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "apikey": SUPABASE_KEY,
-            }
-        )
-        if response.status_code not in [200, 204]:
-            # Log but don't fail the entire request
-            print(f"Storage delete warning for {filename}: {response.status_code} {response.text}")
+# Service role operations (bypass RLS) go through the async admin module
+if not admin.is_configured():
+    logger.warning("⚠️ SUPABASE_SERVICE_ROLE_KEY not found. Usage accounting and playback of segmented recordings are disabled.")
+if not AUDIO_URL_SECRET:
+    logger.warning("⚠️ AUDIO_URL_SECRET not found. Recordings still stored as segments can't be played until compacted.")
 
 # Active recording buffers (keyed by client_id)
 active_buffers: Dict[str, AudioBuffer] = {}
@@ -261,20 +205,8 @@ async def init_recording(
     """Initialize a recording placeholder (for live sharing)"""
     try:
         # Verify user
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
             
         recording_id = id if id else str(uuid.uuid4())
         
@@ -298,6 +230,8 @@ async def init_recording(
                 
         return {"id": recording_id}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -314,36 +248,26 @@ async def create_recording(
     """Save a new recording or update an existing one"""
     try:
         # Verify user token
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
         
         # Use provided ID or generate new one
         recording_id = id if id else str(uuid.uuid4())
         
-        print(f"DEBUG: create_recording called. ID={recording_id}, Title={title}, Duration={duration_seconds}")
+        logger.debug("create_recording called. ID=%s, Title=%s, Duration=%s", recording_id, title, duration_seconds)
+
+        # Validate transcripts before doing any uploads
+        segments = parse_segments(transcripts)
 
-        # Upload audio to Storage
-        audio_bytes = await audio_file.read()
-        print(f"DEBUG: Audio file size: {len(audio_bytes)} bytes")
+        # Stream audio to Storage straight from the spooled upload
+        logger.debug("Audio file size: %s bytes", audio_file.size)
         
         content_type = audio_file.content_type or "audio/webm"
-        audio_url = await upload_to_supabase_storage(user_id, recording_id, audio_bytes, token, content_type)
-        print(f"DEBUG: Audio uploaded to: {audio_url}")
-        
-        # Parse transcripts
-        transcripts_list = json.loads(transcripts)
+        audio_url = await upload_to_supabase_storage(
+            user_id, recording_id, iter_upload_file(audio_file), token, content_type,
+            content_length=audio_file.size
+        )
+        logger.debug("Audio uploaded to: %s", audio_url)
         
         async with await get_supabase_client(token) as supabase_client:
             recording_data = {
@@ -354,17 +278,17 @@ async def create_recording(
                 "duration_seconds": duration_seconds
             }
             
-            print(f"Saving recording {recording_id}: {title}, {duration_seconds}s (Audio Path: {audio_url})")
+            logger.info("Saving recording %s: %s, %ss (Audio Path: %s)", recording_id, title, duration_seconds, audio_url)
             
             # Verify duration is valid
             if duration_seconds == 0:
-                print(f"⚠️ WARNING: Saving recording with 0 duration! ID: {recording_id}")
+                logger.warning(f"⚠️ Saving recording with 0 duration! ID: {recording_id}")
             
             # If ID is provided, try to UPDATE first
             if id:
                 # Try PATCH
                 # Explicitly update title and other fields
-                print(f"DEBUG: Attempting PATCH for ID {recording_id}")
+                logger.debug("Attempting PATCH for ID %s", recording_id)
                 update_response = await supabase_client.patch(
                     f"/rest/v1/recordings?id=eq.{recording_id}",
                     json={
@@ -375,55 +299,42 @@ async def create_recording(
                     }
                 )
                 if update_response.status_code == 204:
-                    print(f"Updated existing recording {recording_id}")
+                    logger.info("Updated existing recording %s", recording_id)
                 else:
                     # If update fails (e.g. not found), fall back to upsert
-                    print(f"Update failed ({update_response.status_code}), falling back to upsert. Response: {update_response.text}")
+                    logger.warning(f"Update failed ({update_response.status_code}), falling back to upsert. Response: {update_response.text}")
                     recording_response = await supabase_client.post(
                         "/rest/v1/recordings",
                         json=recording_data,
                         headers={"Prefer": "resolution=merge-duplicates"}
                     )
                     if recording_response.status_code not in [200, 201, 204]:
-                        print(f"DEBUG: Upsert failed: {recording_response.text}")
+                        logger.error(f"Upsert failed: {recording_response.text}")
                         raise HTTPException(status_code=500, detail=f"Database error: {recording_response.text}")
             else:
                 # New recording, just insert
-                print(f"DEBUG: Inserting new recording {recording_id}")
+                logger.debug("Inserting new recording %s", recording_id)
                 recording_response = await supabase_client.post(
                     "/rest/v1/recordings",
                     json=recording_data
                 )
                 if recording_response.status_code not in [200, 201, 204]:
-                    print(f"DEBUG: Insert failed: {recording_response.text}")
+                    logger.error(f"Insert failed: {recording_response.text}")
                     raise HTTPException(status_code=500, detail=f"Database error: {recording_response.text}")
             
-            # Insert transcripts (delete existing first if updating to avoid duplicates?)
-            # For simplicity, we'll just insert. If ID conflict, we might need to handle it.
-            # But transcripts have their own IDs.
-            # If updating, we might want to clear old transcripts first.
+            # Updates replace old segments atomically; new recordings just bulk insert
             if id:
-                await supabase_client.delete(f"/rest/v1/transcripts?recording_id=eq.{recording_id}")
-
-            for trans in transcripts_list:
-                transcript_data = {
-                    "recording_id": recording_id,
-                    "text": trans["text"],
-                    "start_time": trans["start_time"],
-                    "end_time": trans["end_time"],
-                    "confidence": trans.get("confidence"),
-                    "is_final": trans.get("is_final", True)
-                }
-                
-                await supabase_client.post(
-                    "/rest/v1/transcripts",
-                    json=transcript_data
-                )
+                saved = await replace_transcripts(supabase_client, recording_id, segments)
+            else:
+                saved = await insert_transcripts(supabase_client, recording_id, segments)
+            logger.debug("Saved %s transcript segments", saved)
         
         return {"id": recording_id, "audio_url": audio_url}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error creating recording: {e}")
+        logger.error(f"Error creating recording: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -432,20 +343,8 @@ async def get_user_usage(token: str):
     """Get user's recording usage and remaining limits"""
     try:
         # Verify user
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
 
         async with await get_supabase_client(token) as supabase_client:
             # 1. Get Profile for Tier & Usage
@@ -499,66 +398,135 @@ async def get_user_usage(token: str):
             }
 
     except Exception as e:
-        print(f"Error fetching usage: {e}")
+        logger.error(f"Error fetching usage: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Recordings list pagination
+RECORDINGS_PAGE_SIZE = 50
+RECORDINGS_MAX_PAGE_SIZE = 200
+RECORDING_FIELDS = {"id", "user_id", "title", "audio_url", "duration_seconds", "created_at", "updated_at"}
+
+def encode_recordings_cursor(recording: Dict) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a row"""
+    raw = json.dumps([recording["created_at"], recording["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_recordings_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, rec_id = json.loads(raw)
+        uuid.UUID(str(rec_id))
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        return created_at, rec_id
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_recording_fields(fields: Optional[str]) -> str:
+    """Validate a `fields=` projection; id and created_at are always kept for the cursor"""
+    if not fields:
+        return "*"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(requested) - RECORDING_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    for required in ("created_at", "id"):
+        if required not in requested:
+            requested.append(required)
+    return ",".join(requested)
+
+
 @app.get("/api/recordings")
-async def get_recordings(token: str):
-    """Get all recordings for the authenticated user"""
+async def get_recordings(
+    request: Request,
+    response: Response,
+    token: str,
+    limit: Optional[int] = Query(None, ge=1, le=RECORDINGS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_count: bool = False
+):
+    """Get the authenticated user's recordings, newest first.
+
+    Paginated only when `limit` or `cursor` is given (pages default to
+    RECORDINGS_PAGE_SIZE), so clients that predate paging still get every
+    recording. Keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    response header back as `cursor` for the next page (absent on the last
+    page). X-Total-Count is only computed when `include_count=true`.
+    """
     try:
         # Verify user and get ID
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
 
-        async with await get_supabase_client(token) as supabase_client:
+        params = {
+            "select": parse_recording_fields(fields),
             # Explicitly filter by user_id as a safeguard
-            response = await supabase_client.get(
-                f"/rest/v1/recordings?select=*&user_id=eq.{user_id}&order=created_at.desc"
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
+            "user_id": f"eq.{user_id}",
+            "order": "created_at.desc,id.desc",
+        }
+        paginated = limit is not None or cursor is not None
+        if paginated:
+            limit = limit or RECORDINGS_PAGE_SIZE
+            # One extra row tells us whether another page exists
+            params["limit"] = str(limit + 1)
+        if cursor:
+            created_at, rec_id = decode_recordings_cursor(cursor)
+            params["or"] = f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{rec_id}))'
+
+        async with await get_supabase_client(token) as supabase_client:
+            page_request = supabase_client.get("/rest/v1/recordings", params=params)
+            if include_count:
+                # Separate HEAD so the count covers all of the user's rows, not just those after the cursor
+                count_request = supabase_client.request(
+                    "HEAD",
+                    "/rest/v1/recordings",
+                    params={"select": "id", "user_id": f"eq.{user_id}"},
+                    headers={"Prefer": "count=exact"}
+                )
+                list_response, count_response = await asyncio.gather(page_request, count_request)
+                # Content-Range: */1234
+                total = count_response.headers.get("content-range", "").rpartition("/")[2]
+                if total.isdigit():
+                    response.headers["X-Total-Count"] = total
+            else:
+                list_response = await page_request
             
-            recordings = response.json()
+            if list_response.status_code != 200:
+                raise HTTPException(status_code=list_response.status_code, detail=list_response.text)
             
-            # Generate signed URLs for each recording
-            for rec in recordings:
-                if rec.get("audio_url"):
-                    # Assuming audio_url now stores the path like "user_id/rec_id.webm"
-                    # If it's an old public URL, we might need to handle that, but for new ones it's path.
-                    path = rec["audio_url"]
-                    if path.startswith("http"):
-                        # Legacy: It's a full URL, try to extract path or just leave it
-                        # If it's a public URL, it might not work if bucket is private now.
-                        pass
-                    else:
-                        # It's a path, sign it
-                        signed_url = await create_signed_url(path, token)
-                        if signed_url:
-                            rec["audio_url"] = signed_url
+            recordings = list_response.json()
+            has_more = paginated and len(recordings) > limit
+            if paginated:
+                recordings = recordings[:limit]
+
+            if has_more:
+                response.headers["X-Next-Cursor"] = encode_recordings_cursor(recordings[-1])
+
+            # Sign only this page's stored paths, in one bulk Storage call (legacy full URLs are left as-is)
+            paths = [
+                rec["audio_url"] for rec in recordings
+                if rec.get("audio_url") and not rec["audio_url"].startswith("http")
+            ]
+            if paths:
+                signed_urls = await sign_audio_paths(paths, token, str(request.base_url))
+                for rec in recordings:
+                    if rec.get("audio_url") in signed_urls:
+                        rec["audio_url"] = signed_urls[rec["audio_url"]]
 
             return recordings
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/recordings/{recording_id}")
-async def get_recording(recording_id: str, token: str):
+async def get_recording(recording_id: str, token: str, request: Request):
     """Get a specific recording with transcripts"""
     try:
+        current_user_id = (await get_user(token))["id"]
+
         async with await get_supabase_client(token) as supabase_client:
             # Get recording
             rec_response = await supabase_client.get(
@@ -574,43 +542,157 @@ async def get_recording(recording_id: str, token: str):
             
             recording = recordings[0]
             
-            # Verify RBAC: Check if user_id matches
-            # We get user_id from the token verification in get_supabase_client context? 
-            # No, we need to verify it against the user_id we got from auth endpoint.
-            
-            # We need to get the user_id from the token again to be sure, 
-            # OR trust that RLS policies on Supabase handle it.
-            # BUT the user asked us to "make sure only the creator... access".
-            # RLS is the best place, but let's add an explicit check here too since we have the data.
-            
-            # Get user ID from token (we should probably do this once at start of request)
-            async with httpx.AsyncClient() as client:
-                user_res = await client.get(
-                    f"{SUPABASE_URL}/auth/v1/user",
-                    headers={"Authorization": f"Bearer {token}", "apikey": SUPABASE_KEY}
-                )
-                if user_res.status_code == 200:
-                    current_user_id = user_res.json()["id"]
-                    if recording["user_id"] != current_user_id:
-                        print(f"⛔ Access denied: User {current_user_id} tried to access recording {recording_id} owned by {recording['user_id']}")
-                        raise HTTPException(status_code=403, detail="Access denied")
+            # Verify RBAC: only the creator may access it (RLS enforces this too)
+            if recording["user_id"] != current_user_id:
+                logger.warning(f"⛔ Access denied: User {current_user_id} tried to access recording {recording_id} owned by {recording['user_id']}")
+                raise HTTPException(status_code=403, detail="Access denied")
 
             # Generate signed URL
+            cacheable = not await live_broker.is_live(recording_id)
             if recording.get("audio_url"):
                 path = recording["audio_url"]
-                if not path.startswith("http"):
+                if is_manifest_path(path):
+                    # Still stored as live-session segments; served by /api/audio/stream
+                    # (the URL carries its own expiry, so the response changes every time)
+                    recording["audio_url"] = playback_url(str(request.base_url), path)
+                    cacheable = False
+                elif not path.startswith("http"):
                     signed_url = await create_signed_url(path, token)
                     if signed_url:
                         recording["audio_url"] = signed_url
 
+            # Finished recordings: one render per updated_at, revalidated by ETag
+            version = ("recording", recording_id, recording.get("updated_at"), recording.get("audio_url"))
+            if cacheable:
+                unchanged = response_cache.not_modified(request, version)
+                if unchanged is not None:
+                    return unchanged
+                cached = response_cache.lookup(version)
+                if cached is not None:
+                    return response_cache.respond(request, cached)
+
             # Get transcripts
             trans_response = await supabase_client.get(
-                f"/rest/v1/transcripts?recording_id=eq.{recording_id}&order=start_time.asc&select=*"
+                f"/rest/v1/transcripts?recording_id=eq.{recording_id}&order=start_time.asc&select={TRANSCRIPT_COLUMNS}"
             )
             
             recording["transcripts"] = trans_response.json() if trans_response.status_code == 200 else []
-            
+
+            if cacheable and trans_response.status_code == 200:
+                return response_cache.respond(request, await response_cache.store(version, recording))
             return recording
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/recordings/{recording_id}/transcripts")
+async def get_recording_transcripts(
+    recording_id: str,
+    token: str,
+    start: Optional[float] = Query(None, alias="from", ge=0),
+    end: Optional[float] = Query(None, alias="to", ge=0)
+):
+    """Transcript segments overlapping the [from, to) window, in seconds.
+
+    Lets the player fetch only the text around the playhead after a seek.
+    Finished recordings are answered from the in-process time index; live
+    ones from the session's in-memory finals, which are ahead of the database
+    until the session is saved.
+    """
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=422, detail="`to` must be greater than `from`")
+    try:
+        current_user_id = (await get_user(token))["id"]
+
+        supabase_client = await get_supabase_client(token)
+        rec_response = await supabase_client.get(
+            f"/rest/v1/recordings?id=eq.{recording_id}&select=id,user_id,updated_at"
+        )
+        if rec_response.status_code != 200 or not rec_response.json():
+            raise HTTPException(status_code=404, detail="Recording not found")
+        recording = rec_response.json()[0]
+        if recording["user_id"] != current_user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        if await live_broker.is_live(recording_id):
+            finals = await live_broker.live_finals(recording_id)
+            segments = transcript_index.live_index(recording_id, finals).window(start, end)
+        else:
+            index = await transcript_index.get_or_build(
+                (recording_id, recording.get("updated_at")),
+                lambda: fetch_all_transcripts(supabase_client, recording_id)
+            )
+            segments = index.window(start, end)
+        # Rows are plain JSON already; skip jsonable_encoder
+        return JSONResponse(segments)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/recordings/{recording_id}/transcripts/stream")
+async def stream_recording_transcripts(
+    recording_id: str,
+    token: str,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|srt|vtt)$")
+):
+    """Export a recording's transcript incrementally as NDJSON, SRT or WebVTT.
+
+    Segments are read in keyset pages and written as each page arrives, so
+    time-to-first-byte and memory don't depend on the transcript's length.
+    """
+    try:
+        current_user_id = (await get_user(token))["id"]
+
+        supabase_client = await get_supabase_client(token)
+        rec_response = await supabase_client.get(
+            f"/rest/v1/recordings?id=eq.{recording_id}&select=id,user_id"
+        )
+        if rec_response.status_code != 200 or not rec_response.json():
+            raise HTTPException(status_code=404, detail="Recording not found")
+        if rec_response.json()[0]["user_id"] != current_user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        # First page before the headers go out, so errors still get a proper status
+        first_page = await fetch_transcript_page(supabase_client, recording_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {}
+    if fmt != "ndjson":
+        headers["Content-Disposition"] = f'attachment; filename="{recording_id}.{fmt}"'
+    return StreamingResponse(
+        stream_transcript_export(supabase_client, recording_id, fmt, first_page),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers=headers
+    )
+
+@app.get("/api/transcripts/search")
+async def search_recording_transcripts(
+    response: Response,
+    token: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Full-text search across the authenticated user's transcripts, best match first.
+
+    Each hit carries recording_id, recording_title, start_time/end_time, rank
+    and an HTML-safe snippet with matches wrapped in <mark>. Keyset-paginated
+    on (rank, id): pass the X-Next-Cursor response header back as `cursor`.
+    """
+    try:
+        await get_user(token)
+        async with await get_supabase_client(token) as supabase_client:
+            hits, next_cursor = await search_transcripts(supabase_client, q, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return hits
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -619,20 +701,8 @@ async def delete_recording(recording_id: str, token: str):
     """Delete a recording, its transcripts, live shares, and storage object"""
     try:
         # Verify user
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
 
         # Fetch recording to confirm ownership and get audio path
         async with await get_supabase_client(token) as supabase_client:
@@ -659,13 +729,14 @@ async def delete_recording(recording_id: str, token: str):
                 raise HTTPException(status_code=500, detail=f"Failed to delete recording: {delete_response.text}")
 
         # Delete storage object after DB delete (best-effort)
-        if audio_path and not audio_path.startswith("http"):
+        if is_manifest_path(audio_path):
+            await delete_segmented(audio_path, token)
+        elif audio_path and not audio_path.startswith("http"):
             await delete_from_supabase_storage(audio_path, token)
 
-        # Clear in-memory caches
-        live_transcripts.pop(recording_id, None)
-        live_share_viewers.pop(recording_id, None)
-        active_recordings.discard(recording_id)
+        # Clear live state and disconnect viewers (on every worker)
+        await live_broker.close_recording(recording_id)
+        shares.invalidate_recording(recording_id)
 
         return {"status": "deleted"}
 
@@ -675,6 +746,38 @@ async def delete_recording(recording_id: str, token: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/audio/stream")
+async def stream_segmented_audio(request: Request, path: str, expires: int, sig: str):
+    """Play a recording that is still stored as live-session segments (signed URL from the API)"""
+    if not verify_playback(path, expires, sig):
+        raise HTTPException(status_code=403, detail="Invalid or expired audio URL")
+    plan = await load_playback_plan(path)
+    size = playback_size(plan)
+    byte_range = parse_range(request.headers.get("range"), size)
+    start, end = byte_range or (0, size)
+    audio = iter_playback_audio(plan, start, end)
+    # First block up front, so a segment deleted by compaction is a clean 404
+    try:
+        head = await audio.__anext__()
+    except StopAsyncIteration:
+        head = b""
+    except HTTPException as e:
+        if e.status_code == 404:
+            playback_plans.pop(path)
+            raise HTTPException(status_code=404, detail="Audio has moved; reload the recording")
+        raise
+
+    async def body():
+        yield head
+        async for block in audio:
+            yield block
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(body(), status_code=206 if byte_range else 200, media_type="audio/flac", headers=headers)
+
+
 # ============== LIVE SHARE API ==============
 
 @app.post("/api/shares")
@@ -682,21 +785,8 @@ async def create_share(share_data: LiveShareCreate, token: str):
     """Create a live share link"""
     try:
         # Verify user and get ID
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_KEY
-                }
-            )
-            
-            if user_response.status_code != 200:
-                print(f"Auth failed in create_share: {user_response.text}")
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            user_data = user_response.json()
-            user_id = user_data["id"]
+        user = await get_user(token)
+        user_id = user["id"]
 
         # Generate unique share token
         share_token = secrets.token_urlsafe(16)
@@ -715,7 +805,7 @@ async def create_share(share_data: LiveShareCreate, token: str):
                 "expires_at": expires_at.isoformat() if expires_at else None
             }
             
-            print(f"Creating share for user {user_id} recording {share_data.recording_id}")
+            logger.info("Creating share for user %s recording %s", user_id, share_data.recording_id)
 
             response = await supabase_client.post(
                 "/rest/v1/live_shares",
@@ -723,7 +813,7 @@ async def create_share(share_data: LiveShareCreate, token: str):
             )
             
             if response.status_code not in [200, 201]:
-                print(f"Supabase insert failed: {response.text}")
+                logger.error(f"Supabase insert failed: {response.text}")
                 raise HTTPException(status_code=500, detail=f"Failed to create share: {response.text}")
         
         # Initialize empty connections list for this share
@@ -740,123 +830,94 @@ async def create_share(share_data: LiveShareCreate, token: str):
         }
     
     except Exception as e:
-        print(f"Error in create_share: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in create_share: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/shares/{share_token}")
-async def get_share(share_token: str):
+async def get_share(share_token: str, request: Request):
     """Get shared recording for public viewing"""
     try:
-        async with httpx.AsyncClient() as client:
-            # Get share info
-            share_response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/live_shares?share_token=eq.{share_token}&select=*",
-                headers={"apikey": SUPABASE_KEY}
-            )
-            
-            if share_response.status_code != 200:
-                raise HTTPException(status_code=404, detail="Share not found")
-            
-            shares = share_response.json()
-            if not shares:
-                raise HTTPException(status_code=404, detail="Share not found")
-            
-            share = shares[0]
-            
-            # Check if expired
-            if not share["is_active"]:
-                raise HTTPException(status_code=410, detail="Share link has expired")
-            
-            if share["expires_at"]:
-                expires_at = datetime.fromisoformat(share["expires_at"].replace('Z', '+00:00'))
-                if datetime.now(expires_at.tzinfo) > expires_at:
-                    raise HTTPException(status_code=410, detail="Share link has expired")
-            
-            recording_id = share["recording_id"]
-            
-            # Get recording
-            rec_response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/recordings?id=eq.{recording_id}&select=*",
-                headers={"apikey": SUPABASE_KEY}
-            )
-            
-            recording = rec_response.json()[0] if rec_response.status_code == 200 else {}
-            
-            # Get transcripts
-            trans_response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/transcripts?recording_id=eq.{recording_id}&order=start_time.asc&select=*",
-                headers={"apikey": SUPABASE_KEY}
-            )
-            
-            transcripts = trans_response.json() if trans_response.status_code == 200 else []
-            
-            return {
-                "title": recording.get("title", "Shared Recording"),
-                "created_at": recording.get("created_at"),
-                "transcripts": transcripts,
-                "is_live": recording.get("id") in active_recordings,
-                "audio_url": recording.get("audio_url")
-            }
+        # Share, recording and transcripts in one embedded select, cached per token
+        share = await shares.resolve_share(share_token)
+        if share is None:
+            raise HTTPException(status_code=404, detail="Share not found")
+
+        # Check if expired
+        if not share["is_active"] or shares.is_expired(share):
+            raise HTTPException(status_code=410, detail="Share link has expired")
+
+        recording = share.get("recordings") or {}
+        is_live = bool(recording.get("id")) and await live_broker.is_live(recording["id"])
+        payload = {
+            "title": recording.get("title", "Shared Recording"),
+            "created_at": recording.get("created_at"),
+            "transcripts": recording.get("transcripts", []),
+            "is_live": is_live,
+            "audio_url": recording.get("audio_url")
+        }
+        if is_live or not recording.get("id"):
+            # Already plain JSON from PostgREST: skip jsonable_encoder, which dominates for long transcripts
+            return JSONResponse(payload)
+
+        version = ("share", recording["id"], recording.get("updated_at"), recording.get("audio_url"))
+        unchanged = response_cache.not_modified(request, version)
+        if unchanged is not None:
+            return unchanged
+        cached = response_cache.lookup(version) or await response_cache.store(version, payload)
+        return response_cache.respond(request, cached)
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_share: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in get_share: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Active live share viewers (keyed by recording_id)
-live_share_viewers: Dict[str, List[WebSocket]] = {}
-# Active recording sessions (set of recording_ids)
-active_recordings: Set[str] = set()
-# In-memory storage for live transcripts (keyed by recording_id)
-live_transcripts: Dict[str, List[Dict]] = {}
+# Live share viewers connected to this worker (keyed by recording_id)
+broadcast_hub = BroadcastHub()
+# Live transcripts and presence, shared across workers when LIVE_PUBSUB_URL is set
+live_broker = create_broker(broadcast_hub)
+if live_broker.backend == "local" and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    logger.warning("⚠️ WEB_CONCURRENCY > 1 without LIVE_PUBSUB_URL: live share viewers only see sessions on their own worker")
+
+metrics.Gauge("verbact_active_sessions", "Recording WebSocket sessions on this worker", fn=lambda: len(active_buffers))
+metrics.Gauge(
+    "verbact_buffered_audio_bytes", "Audio held in memory by active sessions",
+    fn=lambda: sum(buffer.get_byte_count() for buffer in list(active_buffers.values()))
+)
+metrics.Gauge("verbact_live_viewers", "Live share viewers connected to this worker", fn=lambda: broadcast_hub.stats()["viewers"])
 
 @app.websocket("/ws/watch/{share_token}")
 async def watch_endpoint(websocket: WebSocket, share_token: str):
     await websocket.accept()
     
     try:
-        # Verify share token and get recording_id
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/live_shares?share_token=eq.{share_token}&select=recording_id,is_active,expires_at",
-                headers={"apikey": SUPABASE_KEY}
-            )
-            
-            if response.status_code != 200 or not response.json():
-                await websocket.close(code=4004, reason="Share not found")
-                return
+        # Verify share token and get recording_id (cached; no recording or transcripts needed)
+        share_data = await shares.resolve_share_access(share_token)
+        if share_data is None:
+            await websocket.close(code=4004, reason="Share not found")
+            return
                 
-            share_data = response.json()[0]
-            
-            if not share_data["is_active"]:
-                await websocket.close(code=4003, reason="Share is not active")
-                return
+        if not share_data["is_active"]:
+            await websocket.close(code=4003, reason="Share is not active")
+            return
                 
-            if share_data["expires_at"] and datetime.fromisoformat(share_data["expires_at"].replace('Z', '+00:00')) < datetime.now(timezone.utc):
-                await websocket.close(code=4003, reason="Share expired")
-                return
+        if shares.is_expired(share_data):
+            await websocket.close(code=4003, reason="Share expired")
+            return
                 
-            recording_id = share_data["recording_id"]
+        recording_id = share_data["recording_id"]
             
-        # Add to viewers list
-        if recording_id not in live_share_viewers:
-            live_share_viewers[recording_id] = []
-        live_share_viewers[recording_id].append(websocket)
-        
-        print(f"👀 Viewer connected to recording {recording_id}")
-        
-        # Send existing transcripts to new viewer
-        if recording_id in live_transcripts:
-            print(f"📜 Sending {len(live_transcripts[recording_id])} existing transcripts to new viewer")
-            for transcript_msg in live_transcripts[recording_id]:
-                await websocket.send_text(json.dumps(transcript_msg))
+        # Existing transcripts go out first as one snapshot frame, from the viewer's own writer task
+        history = await live_broker.watch(recording_id)
+        backlog = []
+        if history:
+            logger.info("📜 Sending snapshot of %s transcripts to new viewer", len(history))
+            backlog.append(history.snapshot())
+        channel = broadcast_hub.subscribe(recording_id, websocket, backlog)
+
+        logger.info("👀 Viewer connected to recording %s", recording_id)
         
         try:
             while True:
@@ -865,14 +926,12 @@ async def watch_endpoint(websocket: WebSocket, share_token: str):
         except:
             pass
         finally:
-            if recording_id in live_share_viewers:
-                live_share_viewers[recording_id].remove(websocket)
-                if not live_share_viewers[recording_id]:
-                    del live_share_viewers[recording_id]
-            print(f"👋 Viewer disconnected from recording {recording_id}")
+            broadcast_hub.unsubscribe(channel)
+            await live_broker.unwatch(recording_id)
+            logger.info("👋 Viewer disconnected from recording %s", recording_id)
 
     except Exception as e:
-        print(f"Watch error: {e}")
+        logger.error(f"Watch error: {e}")
         await websocket.close()
 
 
@@ -882,96 +941,94 @@ async def transcribe_endpoint(websocket: WebSocket):
     client_id = str(uuid.uuid4())
 
     current_recording_title = "Live Recording"
-    
-    def get_timestamp():
-        return datetime.now().strftime('%H:%M:%S.%f')[:-3]
-    
-    print(f"[{get_timestamp()}] 🔌 Client connected [{client_id}]")
+    # Every line from this connection carries its client_id (and recording_id once configured)
+    log = logging.LoggerAdapter(logger, {"client_id": client_id})
+
+    log.info("🔌 Client connected")
     
     api_key = os.getenv("DEEPGRAM_API_KEY")
     if not api_key:
-        print(f"[{get_timestamp()}] ❌ Error: DEEPGRAM_API_KEY not found")
+        log.error("❌ Error: DEEPGRAM_API_KEY not found")
         await websocket.close(code=1008, reason="Missing API Key")
         return
 
     # Verify authentication
+    upstream: Optional[deepgram.UpstreamConnection] = None
     try:
         token = websocket.query_params.get("token")
         if not token:
-            print(f"[{client_id}] ❌ Missing authentication token")
+            log.error("❌ Missing authentication token")
             await websocket.close(code=4001)
             return
 
-        # Verify token with Supabase
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{os.environ.get('SUPABASE_URL')}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": os.environ.get("SUPABASE_ANON_KEY")
-                }
-            )
+        # Start connecting to Deepgram now; DNS + TLS + upgrade overlap the auth round trips
+        upstream = deepgram.UpstreamConnection(api_key)
+
+        # Verify token (cached / locally verified when configured)
+        try:
+            user = await get_user(token)
+        except HTTPException as e:
+            log.error(f"❌ Invalid token: {e.detail}")
+            await upstream.discard()
+            await websocket.close(code=4001)
+            return
+
+        user_id = user.get("id")
+        email = user.get("email")
+        log.info("👤 Authenticated as: %s (%s)", email, user_id)
+
+        # Check subscription tier for time limits
+        tier_limits = {
+            "free": 600,  # 10 minutes per session
+            "pro": 1200 * 60,  # 1,200 minutes per session
+            "unlimited": None  # No cap
+        }
+        session_limit_seconds = tier_limits["free"]
             
-            if response.status_code != 200:
-                print(f"[{client_id}] ❌ Invalid token: {response.text}")
-                await websocket.close(code=4001)
-                return
-                
-            user = response.json()
-            user_id = user.get("id")
-            email = user.get("email")
-            print(f"[{client_id}] 👤 Authenticated as: {email} ({user_id})")
-
-            # Check subscription tier for time limits
-            tier_limits = {
-                "free": 600,  # 10 minutes per session
-                "pro": 1200 * 60,  # 1,200 minutes per session
-                "unlimited": None  # No cap
+        profile_res = await get_http_client().get(
+            f"{SUPABASE_URL}/rest/v1/profiles?id=eq.{user_id}&select=subscription_tier,usage_seconds",
+            headers={
+                "apikey": SUPABASE_KEY,
+                "Authorization": f"Bearer {token}"
             }
-            session_limit_seconds = tier_limits["free"]
-            
-            profile_res = await client.get(
-                f"{SUPABASE_URL}/rest/v1/profiles?id=eq.{user_id}&select=subscription_tier,usage_seconds",
-                headers={
-                    "apikey": SUPABASE_KEY,
-                    "Authorization": f"Bearer {token}"
-                }
-            )
-            if profile_res.status_code == 200 and profile_res.json():
-                profile = profile_res.json()[0]
-                tier = profile.get("subscription_tier", "free")
-                session_limit_seconds = tier_limits.get(tier, tier_limits["free"])
-            else:
-                tier = "free"
+        )
+        if profile_res.status_code == 200 and profile_res.json():
+            profile = profile_res.json()[0]
+            tier = profile.get("subscription_tier", "free")
+            session_limit_seconds = tier_limits.get(tier, tier_limits["free"])
+        else:
+            tier = "free"
             
-            print(f"[{client_id}] Using tier '{tier}' with session cap: {session_limit_seconds if session_limit_seconds is not None else 'unlimited'}s")
+        log.info("Using tier '%s' with session cap: %ss", tier, session_limit_seconds if session_limit_seconds is not None else "unlimited")
             
     except Exception as e:
-        print(f"[{client_id}] ❌ Auth error: {e}")
+        log.error(f"❌ Auth error: {e}")
+        if upstream is not None:
+            await upstream.discard()
         await websocket.close(code=4001)
         return
 
+    # Initialize audio buffer for this client
+    audio_buffer = AudioBuffer()
+    active_buffers[client_id] = audio_buffer
+
     # Initialize performance metrics
-    metrics = PerformanceMetrics()
+    session_metrics = PerformanceMetrics(audio_buffer.sample_rate, audio_buffer.channels)
     session_start_time: Optional[float] = None
     limit_task: Optional[asyncio.Task] = None
     total_recorded_seconds = 0.0
     
-    # Initialize audio buffer for this client
-    audio_buffer = AudioBuffer()
-    active_buffers[client_id] = audio_buffer
+    current_recording_id: Optional[str] = None
+    # Uploads FLAC segments while recording (None when segmenting is off)
+    segment_uploader: Optional[SegmentUploader] = None
+    saved_audio_bytes = 0
     
-    # Deepgram WebSocket URL with INTERIM RESULTS enabled for real-time transcription
-    dg_url = "wss://api.deepgram.com/v1/listen?model=nova-2&smart_format=true&interim_results=true&filler_words=false&punctuate=true&encoding=linear16&sample_rate=16000&channels=1&endpointing=200"
-    
-    extra_headers = {
-        "Authorization": f"Token {api_key}"
-    }
-
     try:
-        # Connect to Deepgram
-        async with websockets.connect(dg_url, additional_headers=extra_headers) as dg_socket:
-            print(f"[{get_timestamp()}] ✅ Connected to Deepgram")
+        # Connect to Deepgram (usually already open by now)
+        with metrics.DEEPGRAM_CONNECT_WAIT.time():
+            dg_socket = await upstream.get()
+        async with dg_socket:
+            log.info("✅ Connected to Deepgram")
 
             # Keepalive task to prevent timeout
             keepalive_count = 0
@@ -982,16 +1039,15 @@ async def transcribe_endpoint(websocket: WebSocket):
                         await asyncio.sleep(5)
                         keepalive_count += 1
                         await dg_socket.send(json.dumps({"type": "KeepAlive"}))
-                        print(f"[{get_timestamp()}] 💓 Keepalive #{keepalive_count} sent")
+                        log.debug("💓 Keepalive #%d sent", keepalive_count)
                 except Exception as e:
-                    print(f"[{get_timestamp()}] ⚠️ Keepalive error: {e}")
+                    log.warning(f"⚠️ Keepalive error: {e}")
 
             # Task to receive from Deepgram and send to Client
             async def receive_from_deepgram():
                 try:
                     async for msg in dg_socket:
-                        receive_time = get_timestamp()
-                        
+                        received_at = time.perf_counter()
                         try:
                             data = json.loads(msg)
                             
@@ -1009,7 +1065,11 @@ async def transcribe_endpoint(websocket: WebSocket):
                                         speech_final = data.get("speech_final", False)
                                         
                                         if transcript and len(transcript.strip()) > 0:
-                                            metrics.log_transcript_received()
+                                            session_metrics.log_transcript_received(
+                                                is_final or speech_final,
+                                                data.get("start", 0), data.get("duration", 0),
+                                                received_at
+                                            )
                                             
                                             # Send to client with type indicator
                                             message = json.dumps({
@@ -1032,30 +1092,18 @@ async def transcribe_endpoint(websocket: WebSocket):
                                                     "end": alternatives[0].get("words", [{}])[-1].get("end", 0)
                                                 }
                                                 
-                                                # Store in memory for late joiners AND final save
-                                                if current_recording_id not in live_transcripts:
-                                                    live_transcripts[current_recording_id] = []
-                                                live_transcripts[current_recording_id].append(broadcast_msg)
-                                                
-                                                # Broadcast to live viewers (if any)
-                                                if current_recording_id in live_share_viewers:
-                                                    viewers = live_share_viewers[current_recording_id]
-                                                    if viewers:
-                                                        json_msg = json.dumps(broadcast_msg)
-                                                        for viewer in viewers:
-                                                            try:
-                                                                await viewer.send_text(json_msg)
-                                                            except:
-                                                                pass 
+                                                # Store for late joiners AND final save, and broadcast to live viewers
+                                                # on every worker; queued, never awaited here
+                                                live_broker.publish(current_recording_id, broadcast_msg)
 
                             elif msg_type == "UtteranceEnd":
-                                print(f"[{receive_time}] 🔚 Utterance end detected")
+                                log.info("🔚 Utterance end detected")
                             
                         except json.JSONDecodeError as e:
-                            print(f"[{receive_time}] ⚠️ Failed to parse Deepgram message: {e}")
+                            log.warning(f"⚠️ Failed to parse Deepgram message: {e}")
                             
                 except Exception as e:
-                    print(f"[{get_timestamp()}] ❌ Error receiving from Deepgram: {e}")
+                    log.error(f"❌ Error receiving from Deepgram: {e}")
 
             # Statistics reporting task (DEBUG mode only)
             async def report_statistics():
@@ -1064,8 +1112,7 @@ async def transcribe_endpoint(websocket: WebSocket):
                 try:
                     while True:
                         await asyncio.sleep(10)  # Report every 10 seconds
-                        stats = metrics.get_stats_summary()
-                        print(f"\n[{get_timestamp()}] 📊 PERFORMANCE STATS: Runtime {stats['runtime_seconds']}s")
+                        log.debug("📊 PERFORMANCE STATS: %s", session_metrics.get_stats_summary())
                 except:
                     pass
 
@@ -1082,7 +1129,7 @@ async def transcribe_endpoint(websocket: WebSocket):
                         
                         elapsed = time.monotonic() - session_start_time
                         if elapsed >= session_limit_seconds:
-                            print(f"[{client_id}] ⛔ Session time limit reached")
+                            log.warning("⛔ Session time limit reached")
                             if session_start_time is not None:
                                 total_recorded_seconds += session_limit_seconds
                                 session_start_time = None
@@ -1114,35 +1161,89 @@ async def transcribe_endpoint(websocket: WebSocket):
                 if not limit_task or limit_task.done():
                     limit_task = asyncio.create_task(enforce_time_limit())
 
+            async def link_segmented_audio(manifest_path: str):
+                """Point the recording at its manifest once the first segment is safe in Storage"""
+                async with await get_supabase_client(token) as supabase_client:
+                    await supabase_client.post(
+                        "/rest/v1/recordings",
+                        json={
+                            "id": current_recording_id,
+                            "user_id": user_id,
+                            "title": current_recording_title,
+                            "audio_url": manifest_path
+                        },
+                        headers={"Prefer": "resolution=merge-duplicates"}
+                    )
+                shares.invalidate_recording(current_recording_id)
+
+            def on_compacted(recording_id: str, manifest_path: str):
+                async def swap_audio_url(path: str):
+                    async with await get_supabase_client(token) as supabase_client:
+                        res = await supabase_client.patch(
+                            f"/rest/v1/recordings?id=eq.{recording_id}&audio_url=eq.{manifest_path}",
+                            json={"audio_url": path}
+                        )
+                        if res.status_code not in [200, 204]:
+                            raise HTTPException(status_code=500, detail=f"audio_url update failed: {res.text}")
+                    shares.invalidate_recording(recording_id)
+                return swap_audio_url
+
             # SERVER-SIDE SAVE FUNCTION
             async def save_session_data():
+                nonlocal saved_audio_bytes
                 try:
                     if not current_recording_id or not user_id:
                         return
+                    saved_audio_bytes = audio_buffer.get_byte_count()
 
                     # 1. Finalize Duration
                     session_duration = int(total_recorded_seconds)
                     if session_start_time:
                          session_duration += max(0, int(time.monotonic() - session_start_time))
                     
-                    if session_duration <= 0 and audio_buffer.chunks:
+                    if session_duration <= 0 and audio_buffer.get_byte_count():
                         # Fallback to pure audio duration if timer failed
                         session_duration = int(audio_buffer.get_duration_seconds())
 
-                    print(f"💾 SAVING SESSION: {current_recording_id} ({session_duration}s)")
+                    log.info("💾 SAVING SESSION: %s (%ss)", current_recording_id, session_duration)
 
-                    # 2. Upload Audio
-                    wav_bytes = audio_buffer.get_wav_bytes()
+                    # 2. Upload Audio (FLAC encoded in a worker process; streamed WAV as fallback)
                     audio_path = None
-                    if wav_bytes:
+                    wav_size = audio_buffer.get_wav_size()
+                    if segment_uploader:
+                        # Segments went up while recording; only the tail and manifest are left
+                        try:
+                            audio_path = await segment_uploader.finalize()
+                            log.info("Audio finalized: %s (%s segments + tail)", audio_path, len(segment_uploader.segments))
+                        except Exception as e:
+                            log.error(f"❌ Segment finalize failed: {e}")
+                    elif wav_size:
+                        encoded = None
+                        if AUDIO_UPLOAD_FORMAT == "flac":
+                            try:
+                                encoded = await encode_flac(audio_buffer)
+                                log.info("Encoded FLAC: %s bytes (%s as WAV)", encoded.size, wav_size)
+                            except Exception as e:
+                                log.warning(f"⚠️ FLAC encoding failed, uploading WAV: {e}")
                         try:
-                            print(f"   Uploading {len(wav_bytes)} bytes...")
-                            audio_path = await upload_to_supabase_storage(
-                                user_id, current_recording_id, wav_bytes, token, "audio/wav"
-                            )
-                            print(f"   Audio uploaded: {audio_path}")
+                            if encoded:
+                                log.info("Uploading %s bytes...", encoded.size)
+                                audio_path = await upload_to_supabase_storage(
+                                    user_id, current_recording_id, encoded.iter_blocks(), token, encoded.content_type,
+                                    content_length=encoded.size
+                                )
+                            else:
+                                log.info("Uploading %s bytes...", wav_size)
+                                audio_path = await upload_to_supabase_storage(
+                                    user_id, current_recording_id, audio_buffer.iter_wav(), token, "audio/wav",
+                                    content_length=wav_size
+                                )
+                            log.info("Audio uploaded: %s", audio_path)
                         except Exception as e:
-                            print(f"   ❌ Upload failed: {e}")
+                            log.error(f"❌ Upload failed: {e}")
+                        finally:
+                            if encoded:
+                                encoded.close()
 
                     async with await get_supabase_client(token) as supabase_client:
                         # 3. Update/Insert Recording Record
@@ -1162,54 +1263,46 @@ async def transcribe_endpoint(websocket: WebSocket):
                             headers={"Prefer": "resolution=merge-duplicates"}
                         )
                         if rec_res.status_code not in [200, 201, 204]:
-                             print(f"   ❌ Recording DB save failed: {rec_res.text}")
+                             log.error(f"❌ Recording DB save failed: {rec_res.text}")
                         else:
-                             print("   ✅ Recording metadata saved.")
-
-                        # 4. Save Transcripts (Bulk)
-                        if current_recording_id in live_transcripts:
-                            transcripts_to_save = []
-                            for t in live_transcripts[current_recording_id]:
-                                if t.get("is_final"):
-                                    transcripts_to_save.append({
-                                        "recording_id": current_recording_id,
-                                        "text": t["transcript"],
-                                        "start_time": t.get("start", 0),
-                                        "end_time": t.get("end", 0),
-                                        "confidence": t.get("confidence"),
-                                        "is_final": True
-                                    })
+                             log.info("✅ Recording metadata saved.")
+                             if segment_uploader and is_manifest_path(audio_path):
+                                 segment_uploader.compact_in_background(on_compacted(current_recording_id, audio_path))
+
+                        # 4. Save Transcripts (atomic bulk replace)
+                        live_history = live_broker.history(current_recording_id)
+                        if live_history:
+                            transcripts_to_save = [
+                                TranscriptSegment(
+                                    text=t["transcript"],
+                                    start_time=t.get("start", 0),
+                                    end_time=t.get("end", 0),
+                                    confidence=t.get("confidence"),
+                                    is_final=True
+                                )
+                                for t in live_history.finals
+                            ]
                             
                             if transcripts_to_save:
-                                # Delete old just in case (optional, safe for new recs)
-                                await supabase_client.delete(f"/rest/v1/transcripts?recording_id=eq.{current_recording_id}")
-                                
-                                # Insert new
-                                trans_res = await supabase_client.post(
-                                    "/rest/v1/transcripts",
-                                    json=transcripts_to_save
-                                )
-                                if trans_res.status_code in [200, 201, 204]:
-                                    print(f"   ✅ Saved {len(transcripts_to_save)} transcript segments.")
-                                else:
-                                    print(f"   ❌ Transcript save failed: {trans_res.text}")
-
-                        # 5. Update User Usage (Bypassing RLS via Service Role)
-                        if session_duration > 0:
-                            # Use Service Role Client (defined globally as supabase_admin if key exists)
-                            # Fetch current usage using Admin to be safe (though user read is allowed)
-                            p_res = supabase_admin.table("profiles").select("usage_seconds").eq("id", user_id).execute()
-                            if p_res.data:
-                                current_usage = p_res.data[0].get("usage_seconds", 0) or 0
-                                new_usage = current_usage + session_duration
-                                
-                                supabase_admin.table("profiles").update({"usage_seconds": new_usage}).eq("id", user_id).execute()
-                                print(f"   📈 User usage updated (Admin): +{session_duration}s")
+                                try:
+                                    saved = await replace_transcripts(supabase_client, current_recording_id, transcripts_to_save)
+                                    log.info("✅ Saved %s transcript segments.", saved)
+                                except HTTPException as e:
+                                    log.error(f"❌ Transcript save failed: {e.detail}")
+
+                        # Cached share pages of this recording now have a stale transcript/audio_url
+                        shares.invalidate_recording(current_recording_id)
+
+                    # 5. Update User Usage (service role, one atomic RPC; idempotent per socket session)
+                    if session_duration > 0 and admin.is_configured():
+                        try:
+                            total_usage = await admin.increment_usage(user_id, session_duration, client_id)
+                            log.info("📈 User usage updated: session %ss, total %ss", session_duration, total_usage)
+                        except Exception as e:
+                            log.error(f"❌ Usage update failed: {e}")
 
                 except Exception as e:
-                    print(f"❌ CRITICAL SAVE ERROR: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception(f"❌ CRITICAL SAVE ERROR: {e}")
 
 
             # Start tasks
@@ -1230,11 +1323,17 @@ async def transcribe_endpoint(websocket: WebSocket):
                             if data.get("type") == "configure" and "recording_id" in data:
                                 current_recording_id = data["recording_id"]
                                 current_recording_title = data.get("title", current_recording_title)
-                                active_recordings.add(current_recording_id)
+                                log.extra["recording_id"] = current_recording_id
+                                await live_broker.set_live(current_recording_id)
+                                if AUDIO_UPLOAD_FORMAT == "flac" and AUDIO_SEGMENT_SECONDS > 0:
+                                    segment_uploader = SegmentUploader(
+                                        audio_buffer, user_id, current_recording_id, token,
+                                        on_first_segment=link_segmented_audio
+                                    )
                                 start_limit_timer(True)
-                                print(f"[{client_id}] 🎥 Configured: {current_recording_id} '{current_recording_title}'")
+                                log.info("🎥 Configured: %s '%s'", current_recording_id, current_recording_title)
                             elif data.get("type") == "stop_recording":
-                                print(f"[{client_id}] 🛑 Stop received. Saving...")
+                                log.info("🛑 Stop received. Saving...")
                                 # Explicit save trigger
                                 await save_session_data()
                             else:
@@ -1247,10 +1346,12 @@ async def transcribe_endpoint(websocket: WebSocket):
                         start_limit_timer()
                         await dg_socket.send(data)
                         audio_buffer.add_chunk(data)
-                        metrics.log_chunk_sent(len(data))
+                        if segment_uploader:
+                            segment_uploader.maybe_flush()
+                        session_metrics.log_chunk_sent(len(data))
                     
             except Exception as e:
-                print(f"[{get_timestamp()}] ⚠️ Client loop error: {e}")
+                log.warning(f"⚠️ Client loop error: {e}")
             finally:
                 # Cleanup
                 if receive_task: receive_task.cancel()
@@ -1264,19 +1365,21 @@ async def transcribe_endpoint(websocket: WebSocket):
                 # Better: call save_session_data here if audio_buffer has data and we haven't saved?
                 # For simplicity in this logic block, let's just assume explicit stop is main path.
                 # BUT if connection drops, we WANT to save.
-                if audio_buffer.chunks: 
-                     print(f"[{client_id}] Connection closed with unsaved data. Auto-saving...")
+                if audio_buffer.get_byte_count() > saved_audio_bytes:
+                     log.info("Connection closed with unsaved data. Auto-saving...")
                      await save_session_data()
 
-                print(f"\n[{get_timestamp()}] 🔌 Closing {client_id}")
+                log.info("⏱️ Transcript latency: %s", session_metrics.latency.summary())
+                log.info("🔌 Closing")
+                # Release the buffer (and its spill file) whether or not a recording started
+                active_buffers.pop(client_id, None)
+                audio_buffer.close()
                 if current_recording_id:
-                    active_recordings.discard(current_recording_id)
-                    # Clean up memory buffers 
-                    active_buffers.pop(client_id, None)
-                    # Remove live transcripts after a delay or immediately?
-                    # Keep for a bit for any lagging viewers? No, simple cleanup.
-                    live_transcripts.pop(current_recording_id, None)
+                    # Drop the live transcript and presence (here and, via the broker, on other workers)
+                    await live_broker.end(current_recording_id)
 
     except Exception as e:
-        print(f"[{get_timestamp()}] ❌ Deepgram connection failed: {e}")
+        log.error(f"❌ Deepgram connection failed: {e}")
+        if active_buffers.pop(client_id, None) is not None:
+            audio_buffer.close()
         await websocket.close()
@@ -0,0 +1,269 @@
+"""
+Process-wide metrics in the Prometheus text exposition format (GET /metrics).
+
+Histograms are fixed buckets plus a running sum and count, so recording an
+observation is a bisect and two additions, and memory does not grow with
+traffic. Everything is updated from the event loop thread only, which is
+why none of this needs a lock. Gauges that describe current state (active
+sessions, buffered audio) are callbacks evaluated at scrape time.
+
+Each uvicorn worker keeps its own numbers; scrape every worker (or run one)
+and aggregate in Prometheus.
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond fan-out up to multi-second uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Bucketed distribution with sum, count, min and max (no raw samples)"""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        # Buckets are upper-inclusive (Prometheus `le`)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else min(self.min, self.bounds[0])
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self) -> Iterable[Tuple[float, int]]:
+        total = 0
+        for bound, bucket_count in zip(self.bounds + (math.inf,), self.counts):
+            total += bucket_count
+            yield bound, total
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported (as zero) before the first observation
+            self.labels()
+        _registry.append(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            yield f"{self.name}_total{_labels(self.labelnames, values)} {_number(child.value)}"
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time from `fn`"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        self.fn = fn
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception:
+                value = math.nan
+            yield f"{self.name} {_number(float(value))}"
+            return
+        for values, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self, *values: str) -> "_Timer":
+        return _Timer(self.labels(*values))
+
+    def _samples(self):
+        for values, child in self._children.items():
+            for bound, total in child.cumulative():
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {total}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_number(child.sum)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {child.count}"
+
+
+class _Timer:
+    """`with HISTOGRAM.time(labels...):` observes the block's wall time in seconds"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+def render() -> str:
+    """Every registered metric in text exposition format 0.0.4"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+def supabase_endpoint(path: str) -> str:
+    """Bounded-cardinality label for a Supabase URL path (no ids or object names)"""
+    parts = path.strip("/").split("/")
+    if parts[:2] == ["rest", "v1"]:
+        return "/" + "/".join(parts[:4] if parts[2:3] == ["rpc"] else parts[:3])
+    if parts[:3] == ["storage", "v1", "object"]:
+        # sign / public / list are operations; anything else is a bucket name
+        return "/storage/v1/object/" + parts[3] if parts[3:4] in (["sign"], ["list"]) else "/storage/v1/object"
+    return "/" + "/".join(parts[:3])
+
+
+# Seconds; audio-to-transcript latency is interesting between ~100ms and a few seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+# ---------- Metrics recorded by the API ----------
+
+TRANSCRIPT_LATENCY = HistogramMetric(
+    "verbact_transcript_latency_seconds",
+    "Time from sending the last audio sample a Deepgram result covers until that result arrives",
+    ("result",),
+    buckets=LATENCY_BUCKETS
+)
+TRANSCRIPTS_RECEIVED = Counter(
+    "verbact_transcripts_received", "Non-empty transcript results from Deepgram", ("final",)
+)
+DEEPGRAM_CONNECT_WAIT = HistogramMetric(
+    "verbact_deepgram_connect_wait_seconds",
+    "Time a new session waited for its Deepgram connection after authenticating"
+)
+AUDIO_CHUNKS = Counter("verbact_audio_chunks", "Audio chunks forwarded to Deepgram")
+AUDIO_BYTES = Counter("verbact_audio_bytes", "Audio bytes forwarded to Deepgram")
+FANOUT_SECONDS = HistogramMetric(
+    "verbact_broadcast_fanout_seconds",
+    "Time to serialize a live message and queue it for every viewer on this worker",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+UPLOAD_SECONDS = HistogramMetric("verbact_upload_duration_seconds", "Storage object upload time")
+UPLOAD_BYTES = Counter("verbact_upload_bytes", "Bytes uploaded to Storage (when the length is known)")
+SUPABASE_SECONDS = HistogramMetric(
+    "verbact_supabase_request_seconds",
+    "Supabase request latency until response headers, by method, endpoint and status class",
+    ("method", "endpoint", "status")
+)
+LOOP_LAG_SECONDS = HistogramMetric(
+    "verbact_event_loop_lag_seconds",
+    "How late the event loop woke up a periodic timer"
+)
@@ -0,0 +1,376 @@
+"""
+Live share state shared between uvicorn workers.
+
+A live recording's transcript is produced by the worker holding the
+speaker's /ws/transcribe socket, but its viewers may be connected to any
+worker (or node). The broker sits between the two:
+
+- LocalBroker (default) keeps transcript histories, presence and fan-out
+  in this process, which is only correct with a single worker
+- RedisBroker (LIVE_PUBSUB_URL=redis://...) also forwards everything to
+  Redis: finals are appended to a list, the latest interim is stored next to
+  it, and each message is published on a per-recording channel. A worker
+  with viewers of a recording it isn't transcribing subscribes to that
+  channel and keeps a mirror TranscriptHistory, seeded from the list, to
+  snapshot for late joiners. Presence is a key per live recording with a
+  short TTL refreshed by a heartbeat, so a crashed worker's sessions stop
+  showing as live.
+
+Audio buffers belong to the speaker's socket and never leave its worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from broadcast import BroadcastHub, TranscriptHistory
+
+logger = logging.getLogger(__name__)
+
+LIVE_PUBSUB_URL = os.getenv("LIVE_PUBSUB_URL", "")
+LIVE_KEY_PREFIX = os.getenv("LIVE_KEY_PREFIX", "verbact:live")
+PRESENCE_TTL_SECONDS = 30
+# Histories of sessions whose speaker vanished without an "end" expire on their own
+HISTORY_TTL_SECONDS = 6 * 3600
+# Messages waiting to be forwarded to Redis; beyond this they are dropped, not awaited
+PUBLISH_QUEUE_SIZE = 10000
+FOLLOW_TIMEOUT_SECONDS = 5
+
+
+class LocalBroker:
+    """Single-process live state (the default)"""
+
+    backend = "local"
+
+    def __init__(self, hub: BroadcastHub):
+        self.hub = hub
+        # Histories of sessions transcribed by this worker (keyed by recording_id)
+        self.histories: Dict[str, TranscriptHistory] = {}
+        self.live: Set[str] = set()
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def publish(self, recording_id: str, message: dict):
+        """Record a speaker's message and fan it out; never awaits"""
+        history = self.histories.get(recording_id)
+        if history is None:
+            history = self.histories[recording_id] = TranscriptHistory()
+        history.add(message)
+        self.hub.publish(recording_id, message)
+
+    def history(self, recording_id: str) -> Optional[TranscriptHistory]:
+        return self.histories.get(recording_id)
+
+    async def set_live(self, recording_id: str):
+        self.live.add(recording_id)
+
+    async def is_live(self, recording_id: str) -> bool:
+        return recording_id in self.live
+
+    async def end(self, recording_id: str):
+        """The speaker's session is over: drop its history and presence"""
+        self.live.discard(recording_id)
+        self.histories.pop(recording_id, None)
+
+    async def close_recording(self, recording_id: str):
+        """The recording was deleted: also disconnect its viewers"""
+        await self.end(recording_id)
+        self.hub.close_recording(recording_id)
+
+    async def watch(self, recording_id: str) -> Optional[TranscriptHistory]:
+        """A viewer connected; returns the history to snapshot for it"""
+        return self.histories.get(recording_id)
+
+    async def unwatch(self, recording_id: str):
+        pass
+
+    async def live_finals(self, recording_id: str) -> List[dict]:
+        """Finals of a live session so far (what the speaker's worker will save); read-only"""
+        history = self.histories.get(recording_id)
+        return history.finals if history is not None else []
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "live": len(self.live), "histories": len(self.histories)}
+
+
+class RedisBroker(LocalBroker):
+    """Live state shared through Redis lists, keys and pub/sub channels"""
+
+    backend = "redis"
+
+    def __init__(self, hub: BroadcastHub, url: str):
+        super().__init__(hub)
+        # Optional dependency: only needed when running more than one worker
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.pubsub = self.redis.pubsub()
+        self.worker_id = uuid.uuid4().hex[:12]
+        # Histories of sessions transcribed elsewhere that have viewers here
+        self.mirrors: Dict[str, TranscriptHistory] = {}
+        self._watchers: Dict[str, int] = {}
+        self._follows: Dict[str, asyncio.Task] = {}
+        self._subscribed: Dict[str, asyncio.Event] = {}
+        # Relayed messages held back while a mirror is being seeded
+        self._pending: Dict[str, List[Tuple[int, dict]]] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._relay_task: Optional[asyncio.Task] = None
+        self.forwarded = 0
+        self.relayed = 0
+        self.dropped = 0
+
+    def _key(self, recording_id: str, name: str) -> str:
+        return f"{LIVE_KEY_PREFIX}:{recording_id}:{name}"
+
+    async def start(self):
+        self._outbox = asyncio.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._tasks = [asyncio.create_task(self._forwarder()), asyncio.create_task(self._heartbeat())]
+        logger.info(f"📡 Live pub/sub via Redis (worker {self.worker_id})")
+
+    async def close(self):
+        if self._outbox is not None:
+            try:
+                await asyncio.wait_for(self._outbox.join(), 2)
+            except asyncio.TimeoutError:
+                pass
+        for task in self._tasks + [self._relay_task] + list(self._follows.values()):
+            if task is not None:
+                task.cancel()
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+    # Speaker side
+
+    def publish(self, recording_id: str, message: dict):
+        super().publish(recording_id, message)
+        history = self.histories[recording_id]
+        entry = history.finals[-1] if message.get("is_final") else history.interim
+        self._enqueue((recording_id, "message", len(history.finals), message, entry))
+
+    def _enqueue(self, item: tuple):
+        try:
+            self._outbox.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _forwarder(self):
+        """Sends queued messages to Redis in order, batching whatever has piled up"""
+        while True:
+            batch = [await self._outbox.get()]
+            while not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for recording_id, kind, seq, message, entry in batch:
+                    finals_key, interim_key = self._key(recording_id, "finals"), self._key(recording_id, "interim")
+                    if kind == "message":
+                        if message.get("is_final"):
+                            pipe.rpush(finals_key, json.dumps(entry))
+                            pipe.expire(finals_key, HISTORY_TTL_SECONDS)
+                            pipe.delete(interim_key)
+                        else:
+                            pipe.set(interim_key, json.dumps({"seq": seq, "interim": entry}), ex=HISTORY_TTL_SECONDS)
+                        event = {"seq": seq, "message": message}
+                    else:
+                        pipe.delete(finals_key, interim_key, self._key(recording_id, "presence"))
+                        event = {"event": kind}
+                    event.update(recording_id=recording_id, origin=self.worker_id)
+                    pipe.publish(self._key(recording_id, "events"), json.dumps(event))
+                await pipe.execute()
+                self.forwarded += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"⚠️ Live pub/sub forward failed ({len(batch)} messages): {e}")
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    async def set_live(self, recording_id: str):
+        await super().set_live(recording_id)
+        try:
+            await self.redis.set(self._key(recording_id, "presence"), self.worker_id, ex=PRESENCE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"⚠️ Live presence update failed: {e}")
+
+    async def is_live(self, recording_id: str) -> bool:
+        if recording_id in self.live:
+            return True
+        try:
+            return bool(await self.redis.exists(self._key(recording_id, "presence")))
+        except Exception as e:
+            logger.warning(f"⚠️ Live presence lookup failed: {e}")
+            return False
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(PRESENCE_TTL_SECONDS / 3)
+            if not self.live:
+                continue
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for recording_id in self.live:
+                    pipe.set(self._key(recording_id, "presence"), self.worker_id, ex=PRESENCE_TTL_SECONDS)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"⚠️ Live presence heartbeat failed: {e}")
+
+    async def end(self, recording_id: str):
+        # Queued behind the session's last messages, so the delete can't be overtaken
+        await super().end(recording_id)
+        self._enqueue((recording_id, "end", 0, None, None))
+
+    async def close_recording(self, recording_id: str):
+        await LocalBroker.end(self, recording_id)
+        self.hub.close_recording(recording_id)
+        self._enqueue((recording_id, "close", 0, None, None))
+
+    # Viewer side
+
+    async def watch(self, recording_id: str) -> Optional[TranscriptHistory]:
+        self._watchers[recording_id] = self._watchers.get(recording_id, 0) + 1
+        follow = self._follows.get(recording_id)
+        if follow is None:
+            follow = self._follows[recording_id] = asyncio.create_task(self._follow(recording_id))
+        try:
+            await asyncio.shield(follow)
+        except Exception as e:
+            # Degrade to this worker's own state; the next viewer retries
+            logger.warning(f"⚠️ Could not follow live recording {recording_id}: {e}")
+            if self._follows.get(recording_id) is follow:
+                del self._follows[recording_id]
+        return self.histories.get(recording_id) or self.mirrors.get(recording_id)
+
+    async def live_finals(self, recording_id: str) -> List[dict]:
+        history = self.histories.get(recording_id) or self.mirrors.get(recording_id)
+        if history is not None:
+            return history.finals
+        finals = await self.redis.lrange(self._key(recording_id, "finals"), 0, -1)
+        return [json.loads(final) for final in finals]
+
+    async def unwatch(self, recording_id: str):
+        remaining = self._watchers.get(recording_id, 0) - 1
+        if remaining > 0:
+            self._watchers[recording_id] = remaining
+            return
+        self._watchers.pop(recording_id, None)
+        self.mirrors.pop(recording_id, None)
+        self._pending.pop(recording_id, None)
+        self._subscribed.pop(recording_id, None)
+        follow = self._follows.pop(recording_id, None)
+        if follow is not None:
+            follow.cancel()
+            try:
+                await self.pubsub.unsubscribe(self._key(recording_id, "events"))
+            except Exception as e:
+                logger.warning(f"⚠️ Live pub/sub unsubscribe failed: {e}")
+
+    async def _follow(self, recording_id: str):
+        """Subscribe to a recording's channel, then seed its mirror from the stored history.
+
+        Subscribing first means nothing published after the seed is missed;
+        messages that were already in the seed are recognised by their
+        sequence number (the final count) and skipped.
+        """
+        subscribed = self._subscribed[recording_id] = asyncio.Event()
+        self._pending[recording_id] = []
+        try:
+            await self.pubsub.subscribe(self._key(recording_id, "events"))
+            if self._relay_task is None or self._relay_task.done():
+                self._relay_task = asyncio.create_task(self._relay())
+            await asyncio.wait_for(subscribed.wait(), FOLLOW_TIMEOUT_SECONDS)
+
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.lrange(self._key(recording_id, "finals"), 0, -1)
+            pipe.get(self._key(recording_id, "interim"))
+            finals, interim = await pipe.execute()
+        except BaseException:
+            # No mirror to replay into: stop buffering this recording's messages
+            self._pending.pop(recording_id, None)
+            raise
+
+        mirror = TranscriptHistory()
+        for final in finals:
+            mirror.add({**json.loads(final), "is_final": True})
+        if interim:
+            stored = json.loads(interim)
+            if stored["seq"] == len(mirror.finals):
+                mirror.add({**stored["interim"], "is_final": False})
+        self.mirrors[recording_id] = mirror
+        for seq, message in self._pending.pop(recording_id, []):
+            self._apply(recording_id, mirror, seq, message)
+
+    async def _relay(self):
+        """Delivers messages published by other workers to this worker's viewers"""
+        while True:
+            try:
+                item = await self.pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Live pub/sub receive failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if item is None:
+                continue
+            if item["type"] == "subscribe":
+                recording_id = item["channel"][len(LIVE_KEY_PREFIX) + 1:-len(":events")]
+                if recording_id in self._subscribed:
+                    self._subscribed[recording_id].set()
+                continue
+            if item["type"] != "message":
+                continue
+            try:
+                self._on_event(json.loads(item["data"]))
+            except Exception as e:
+                logger.warning(f"⚠️ Bad live pub/sub message: {e}")
+
+    def _on_event(self, event: dict):
+        if event["origin"] == self.worker_id:
+            return
+        recording_id = event["recording_id"]
+        if "event" in event:
+            # Session over (or recording deleted): a resumed session starts counting from zero
+            if recording_id in self.mirrors:
+                self.mirrors[recording_id] = TranscriptHistory()
+            if event["event"] == "close":
+                self.hub.close_recording(recording_id)
+            return
+        if recording_id in self._pending:
+            self._pending[recording_id].append((event["seq"], event["message"]))
+        elif recording_id in self.mirrors:
+            self._apply(recording_id, self.mirrors[recording_id], event["seq"], event["message"])
+
+    def _apply(self, recording_id: str, mirror: TranscriptHistory, seq: int, message: dict):
+        if message.get("is_final"):
+            if seq <= len(mirror.finals):
+                return  # already part of the seed
+        elif seq < len(mirror.finals):
+            return  # interim of a sentence whose final we already have
+        mirror.add(message)
+        self.relayed += 1
+        self.hub.publish(recording_id, message)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "worker": self.worker_id,
+            "mirrors": len(self.mirrors),
+            "forwarded": self.forwarded,
+            "relayed": self.relayed,
+            "dropped": self.dropped,
+        }
+
+
+def create_broker(hub: BroadcastHub, url: str = LIVE_PUBSUB_URL) -> LocalBroker:
+    if not url:
+        return LocalBroker(hub)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(hub, url)
+    raise ValueError(f"Unsupported LIVE_PUBSUB_URL: {url.split('://')[0]}://")
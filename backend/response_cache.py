@@ -0,0 +1,144 @@
+"""
+Versioned JSON responses with strong ETags and pre-compressed bodies.
+
+A finished recording only changes together with its row's updated_at (a
+trigger also bumps it on every transcript write, see
+010_transcripts_touch_recording.sql). Its transcript page is therefore
+rendered once per version: the JSON body and its gzip (and brotli, when
+installed) encodings are cached together under a key that includes
+updated_at. Rendering runs in the thread pool, so compressing a long
+transcript doesn't stall the event loop; brotli is skipped for bodies over
+RESPONSE_CACHE_BROTLI_MAX_BYTES, where gzip is several times cheaper.
+
+The ETag is derived from that key alone. A matching If-None-Match gets a
+304 before anything is fetched or rendered, even on a worker that never
+cached the body.
+"""
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+# Larger bodies are served as gzip only
+BROTLI_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_BROTLI_MAX_BYTES", str(1024 * 1024)))
+
+response_cache = TTLCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+    ttl=RESPONSE_CACHE_TTL_SECONDS,
+)
+not_modified_count = 0
+rendered_count = 0
+
+
+class CachedBody:
+    """One rendered response in every encoding we serve"""
+
+    __slots__ = ("etag", "identity", "gzip", "br")
+
+    def __init__(self, etag: str, identity: bytes):
+        self.etag = etag
+        self.identity = identity
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+        if len(identity) >= COMPRESS_MIN_BYTES:
+            self.gzip = gzip.compress(identity, compresslevel=6, mtime=0)
+            if brotli is not None and len(identity) <= BROTLI_MAX_BYTES:
+                self.br = brotli.compress(identity, quality=5)
+
+
+def _render(etag: str, payload: Any) -> CachedBody:
+    return CachedBody(etag, json.dumps(payload, separators=(",", ":")).encode())
+
+
+def version_etag(key: Tuple[Hashable, ...]) -> str:
+    return hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()[:32]
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        params = params.strip()
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _headers(etag: str) -> dict:
+    return {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+
+
+def not_modified(request: Request, key: Tuple[Hashable, ...]) -> Optional[Response]:
+    """A 304 if the client already holds this version (in any encoding), else None"""
+    global not_modified_count
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    etag = version_etag(key)
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == "*" or tag == etag or tag.startswith(etag + "-"):
+            not_modified_count += 1
+            return Response(status_code=304, headers=_headers(tag if tag != "*" else etag))
+    return None
+
+
+def lookup(key: Tuple[Hashable, ...]) -> Optional[CachedBody]:
+    return response_cache.get(key)
+
+
+async def store(key: Tuple[Hashable, ...], payload: Any) -> CachedBody:
+    """Render a JSON payload once, off the event loop, and cache it with its compressed encodings"""
+    global rendered_count
+    rendered_count += 1
+    body = await run_in_threadpool(_render, version_etag(key), payload)
+    response_cache.set(key, body)
+    return body
+
+
+def respond(request: Request, body: CachedBody) -> Response:
+    accepted = _accepted_encodings(request)
+    if body.br is not None and "br" in accepted:
+        encoding, content = "br", body.br
+    elif body.gzip is not None and ("gzip" in accepted or "*" in accepted):
+        encoding, content = "gzip", body.gzip
+    else:
+        encoding, content = None, body.identity
+
+    if encoding is None:
+        headers = _headers(body.etag)
+    else:
+        # Each encoding is its own representation, so it gets its own strong ETag
+        headers = _headers(f"{body.etag}-{encoding}")
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def cache_stats() -> dict:
+    return {
+        **response_cache.stats(),
+        "rendered": rendered_count,
+        "not_modified": not_modified_count,
+        "brotli": brotli is not None,
+    }
@@ -1,32 +1,25 @@
 from fastapi import APIRouter, HTTPException, Request, Header
+from starlette.concurrency import run_in_threadpool
+import logging
 import stripe
 import os
-from supabase import create_client, Client
 from pydantic import BaseModel
 from typing import Optional
 import json
 
+import admin
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Initialize Stripe
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
 
-# Initialize Supabase
-# Initialize Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-# Client for public interactions (if needed)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-
-# Admin client for webhooks (bypasses RLS)
-if SUPABASE_SERVICE_ROLE_KEY:
-    supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-else:
-    print("⚠️ SUPABASE_SERVICE_ROLE_KEY not found. Webhook updates may fail due to RLS.")
-    supabase_admin = supabase
+# Webhook profile updates bypass RLS through the async admin module
+if not admin.is_configured():
+    logger.warning("⚠️ SUPABASE_SERVICE_ROLE_KEY not found. Webhook updates will fail.")
 
 class CheckoutSessionRequest(BaseModel):
     price_id: str
@@ -77,7 +70,9 @@ async def create_checkout_session(request: CheckoutSessionRequest):
                 'quantity': 1,
             }
 
-        checkout_session = stripe.checkout.Session.create(
+        # The Stripe SDK is synchronous: run it on the worker thread pool, not the event loop
+        checkout_session = await run_in_threadpool(
+            stripe.checkout.Session.create,
             payment_method_types=['card'],
             line_items=[line_item],
             mode='subscription',
@@ -133,18 +128,17 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None))
         if user_id and tier:
             # Update user profile
             # Note: This requires Service Role Key to bypass RLS if the user isn't the one making the request (which is true for webhooks)
-            # OR we can use a Postgres Function `security definer` and call it via RPC.
-            # Let's try updating directly. If it fails, we'll need to add a function.
-            
             try:
-                supabase_admin.table("profiles").update({
+                updated = await admin.update_profile(user_id, {
                     "subscription_tier": tier,
                     "stripe_customer_id": session['customer'],
                     "subscription_status": "active"
-                }).eq("id", user_id).execute()
-                print(f"Updated user {user_id} to tier {tier}")
+                })
+                if updated:
+                    logger.info(f"Updated user {user_id} to tier {tier}")
+                else:
+                    logger.warning(f"⚠️ No profile for user {user_id}; tier {tier} not applied")
             except Exception as e:
-                print(f"Error updating Supabase: {e}")
-                # If RLS fails, we might need a stored procedure
+                logger.error(f"Error updating Supabase: {e}")
                 
     return {"status": "success"}
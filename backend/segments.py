@@ -0,0 +1,342 @@
+"""
+Incremental upload of live-session audio as FLAC segment objects.
+
+While a session records, every AUDIO_SEGMENT_SECONDS of PCM is encoded to
+bare FLAC frames in the encoder pool and uploaded as
+`{user_id}/{recording_id}/segments/{n}.flac`, and a small manifest listing
+the segments is rewritten next to them. Stopping only has to upload the
+short tail and the final manifest, so stop-to-saved time no longer grows
+with recording length, and a crash loses at most one segment.
+
+A finished recording is compacted in the background into the usual single
+`{user_id}/{recording_id}.flac` object (STREAMINFO header + segment bytes).
+Until that is done, the manifest path is the recording's audio_url. It is
+played through the backend, which prepends the STREAMINFO header and
+answers Range requests so the player can seek. The playback URL only
+carries the manifest path, an expiry and an HMAC (AUDIO_URL_SECRET), so its
+length doesn't grow with the recording. /api/audio/stream signs the
+segments itself with the service role, but only the ones listed in that
+manifest and stored under its recording's prefix, and then fetches them
+through their signed URLs.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import math
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import HTTPException
+
+import admin
+import flac
+import storage
+from audio import AudioBuffer, encode_flac
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+AUDIO_SEGMENT_SECONDS = int(os.getenv("AUDIO_SEGMENT_SECONDS", "60"))
+# Key for playback URLs of not-yet-compacted recordings (server-only secret, required for them to play)
+AUDIO_URL_SECRET = os.getenv("AUDIO_URL_SECRET", "")
+# Public base URL of this API, used when building playback URLs (defaults to the request's)
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL")
+MANIFEST_NAME = "manifest.json"
+# Pause before retrying after a failed segment upload
+SEGMENT_RETRY_SECONDS = 10
+
+# Signed segment lists per manifest, so the player's Range requests don't re-read and re-sign it
+playback_plans = TTLCache(maxsize=256, ttl=60)
+
+# Strong refs so background flushes/compactions aren't garbage collected mid-flight
+_background_tasks = set()
+
+
+def is_manifest_path(path: Optional[str]) -> bool:
+    return bool(path) and path.endswith("/" + MANIFEST_NAME)
+
+
+def _playback_signature(path: str, expires: int) -> str:
+    return hmac.new(AUDIO_URL_SECRET.encode(), f"{path}\n{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def _signed_path(signed_url: str) -> str:
+    """`/object/sign/...?token=...`: the part of a signed URL after the Storage base"""
+    return signed_url.split("/storage/v1", 1)[1]
+
+
+def playback_url(base_url: str, path: str, expires_in: int = storage.SIGNED_URL_EXPIRES_IN) -> str:
+    """Signed backend URL that streams a segmented recording as one FLAC file.
+
+    Only hand it out after the caller's access to the recording was checked:
+    the HMAC lets /api/audio/stream read this one manifest's segments.
+    """
+    expires = int(time.time()) + expires_in
+    query = urlencode({"path": path, "expires": expires, "sig": _playback_signature(path, expires)})
+    return f"{(PUBLIC_API_URL or base_url).rstrip('/')}/api/audio/stream?{query}"
+
+
+def verify_playback(path: str, expires: int, sig: str) -> bool:
+    """Whether a playback URL is authentic and unexpired"""
+    if not AUDIO_URL_SECRET or not is_manifest_path(path):
+        return False
+    return hmac.compare_digest(_playback_signature(path, expires), sig) and expires >= time.time()
+
+
+async def sign_audio_paths(paths: List[str], token: str, base_url: str) -> Dict[str, str]:
+    """create_signed_urls() that also understands segment manifests"""
+    signed = await storage.create_signed_urls([p for p in paths if not is_manifest_path(p)], token)
+    signed.update((path, playback_url(base_url, path)) for path in paths if is_manifest_path(path))
+    return signed
+
+
+async def _load_playback_plan(path: str) -> dict:
+    if not admin.is_configured():
+        raise HTTPException(status_code=503, detail="Segmented playback is not configured")
+    key = admin.SUPABASE_SERVICE_ROLE_KEY
+    manifest = await load_manifest(path, key)
+    prefix = path[:-len(MANIFEST_NAME)] + "segments/"
+    segment_paths = [segment["path"] for segment in manifest["segments"]]
+    if not all(p.startswith(prefix) and ".." not in p for p in segment_paths):
+        raise HTTPException(status_code=403, detail="Manifest lists foreign objects")
+    signed = await storage.create_signed_urls(segment_paths, key)
+    if len(signed) != len(segment_paths):
+        raise HTTPException(status_code=502, detail="Could not sign audio segments")
+    plan = {
+        "header": flac.stream_info(manifest["sample_rate"], manifest["channels"], manifest["total_samples"]),
+        "segments": [(_signed_path(signed[segment["path"]]), segment["size"]) for segment in manifest["segments"]],
+    }
+    playback_plans.set(path, plan)
+    return plan
+
+
+async def load_playback_plan(path: str) -> dict:
+    """STREAMINFO header plus (signed path, size) per segment of a verified manifest path"""
+    try:
+        return await playback_plans.get_or_load(path, lambda: _load_playback_plan(path))
+    except HTTPException as e:
+        if e.status_code == 404:
+            # Compacted (segments deleted) since the URL was issued; a fresh fetch of the recording has the new URL
+            raise HTTPException(status_code=404, detail="Audio has moved; reload the recording")
+        raise
+
+
+async def load_manifest(path: str, token: str) -> dict:
+    return json.loads(await storage.download_object(path, token))
+
+
+async def iter_manifest_audio(manifest: dict, token: str) -> AsyncIterator[bytes]:
+    """The segments of a manifest as one FLAC stream"""
+    yield flac.stream_info(manifest["sample_rate"], manifest["channels"], manifest["total_samples"])
+    for segment in manifest["segments"]:
+        async for block in storage.iter_download(segment["path"], token):
+            yield block
+
+
+def playback_size(plan: dict) -> int:
+    return len(plan["header"]) + sum(size for _, size in plan["segments"])
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Half-open [start, end) for a single-range `Range: bytes=...` header; None serves the whole file"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) + 1 if last else size
+        else:
+            start, end = max(size - int(last), 0), size
+    except ValueError:
+        return None
+    if start >= size or start >= end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size)
+
+
+async def iter_playback_audio(plan: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Bytes [start, end) of the recording as one FLAC stream, read through the segments' signed URLs"""
+    end = playback_size(plan) if end is None else end
+    header = plan["header"]
+    if start < len(header):
+        yield header[start:min(end, len(header))]
+    offset = len(header)
+    for signed_path, size in plan["segments"]:
+        lo, hi = max(start, offset), min(end, offset + size)
+        if lo < hi:
+            byte_range: Optional[Tuple[int, int]] = None if (lo, hi) == (offset, offset + size) else (lo - offset, hi - offset)
+            async for block in storage.iter_signed_download(signed_path, byte_range):
+                yield block
+        offset += size
+        if offset >= end:
+            break
+
+
+def manifest_size(manifest: dict) -> int:
+    header = flac.stream_info(manifest["sample_rate"], manifest["channels"], manifest["total_samples"])
+    return len(header) + sum(segment["size"] for segment in manifest["segments"])
+
+
+async def delete_segmented(manifest_path: str, token: str) -> None:
+    """Delete a manifest and the segments it lists (best-effort)"""
+    try:
+        manifest = await load_manifest(manifest_path, token)
+        paths = [segment["path"] for segment in manifest["segments"]]
+    except Exception as e:
+        logger.error(f"Could not read manifest {manifest_path}: {e}")
+        paths = []
+    await storage.delete_objects(paths + [manifest_path], token)
+
+
+class SegmentUploader:
+    """Uploads one session's AudioBuffer to Storage segment by segment"""
+
+    def __init__(
+        self,
+        buffer: AudioBuffer,
+        user_id: str,
+        recording_id: str,
+        token: str,
+        segment_seconds: int = AUDIO_SEGMENT_SECONDS,
+        on_first_segment: Optional[Callable[[str], Awaitable[None]]] = None
+    ):
+        self.buffer = buffer
+        self.user_id = user_id
+        self.recording_id = recording_id
+        self.token = token
+        self.prefix = f"{user_id}/{recording_id}"
+        self.manifest_path = f"{self.prefix}/{MANIFEST_NAME}"
+        # Whole FLAC blocks per segment, so only the final frame of the stream is ever short
+        frame_bytes = flac.BLOCK_SIZE * buffer.channels * 2
+        blocks = max(1, math.ceil(segment_seconds * buffer.sample_rate / flac.BLOCK_SIZE))
+        self.segment_bytes = blocks * frame_bytes
+        self.segments: List[dict] = []
+        self.flushed_bytes = 0
+        self.frames = 0
+        self.audio_path: Optional[str] = None
+        self.manifest: Optional[dict] = None
+        self._finalized_bytes = 0
+        self.on_first_segment = on_first_segment
+        self._flush_task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._compact_task: Optional[asyncio.Task] = None
+
+    def maybe_flush(self):
+        """Start a background upload if a full segment is buffered (cheap; call per chunk)"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        if self._compact_task and not self._compact_task.done():
+            # It may rebase onto the compacted object and delete the segments being written
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        if self.buffer.get_byte_count() - self.flushed_bytes >= self.segment_bytes:
+            self._flush_task = asyncio.create_task(self._flush_segments())
+
+    async def _flush_segments(self):
+        try:
+            while self.buffer.get_byte_count() - self.flushed_bytes >= self.segment_bytes:
+                segment = await self._upload_segment(self.flushed_bytes, self.segment_bytes, len(self.segments))
+                self.segments.append(segment)
+                self.flushed_bytes += self.segment_bytes
+                self.frames += self.segment_bytes // (flac.BLOCK_SIZE * self.buffer.channels * 2)
+                await self._write_manifest(self.segments, complete=False)
+                if len(self.segments) == 1 and self.audio_path is None and self.on_first_segment:
+                    await self.on_first_segment(self.manifest_path)
+                logger.info("☁️ Segment %d uploaded (%d bytes)", len(self.segments), segment["size"])
+        except Exception as e:
+            # Retried after a pause; finalize() uploads whatever is left
+            self._retry_at = time.monotonic() + SEGMENT_RETRY_SECONDS
+            logger.warning(f"⚠️ Segment upload failed: {e}")
+
+    async def _upload_segment(self, start: int, nbytes: int, index: int) -> dict:
+        encoded = await encode_flac(self.buffer, start, start + nbytes, first_frame=self.frames, header=False)
+        try:
+            path = await storage.upload_object(
+                f"{self.prefix}/segments/{index:05d}.flac", encoded.iter_blocks(), self.token,
+                "audio/flac", content_length=encoded.size
+            )
+        finally:
+            encoded.close()
+        return {"path": path, "samples": nbytes // (self.buffer.channels * 2), "size": encoded.size}
+
+    async def _write_manifest(self, segments: List[dict], complete: bool):
+        manifest = {
+            "version": 1,
+            "format": "flac",
+            "sample_rate": self.buffer.sample_rate,
+            "channels": self.buffer.channels,
+            "total_samples": sum(segment["samples"] for segment in segments),
+            "complete": complete,
+            "segments": segments,
+        }
+        await storage.upload_object(self.manifest_path, json.dumps(manifest).encode(), self.token, "application/json")
+        return manifest
+
+    async def finalize(self) -> Optional[str]:
+        """Upload the tail and the final manifest; returns the recording's audio path.
+
+        Only the audio since the last segment is encoded here, so this takes
+        about the same time however long the session was.
+        """
+        if self.buffer.get_byte_count() == self._finalized_bytes:
+            return self.audio_path
+        if self._compact_task and not self._compact_task.done():
+            await asyncio.gather(self._compact_task, return_exceptions=True)
+        if self._flush_task and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self._flush_segments()
+
+        total = self.buffer.get_byte_count()
+        remaining = total - self.flushed_bytes
+        segments = list(self.segments)
+        if remaining:
+            # Not committed: if recording resumes, the next full segment overwrites this object
+            segments.append(await self._upload_segment(self.flushed_bytes, remaining, len(self.segments)))
+        if not segments:
+            return None
+
+        self.manifest = await self._write_manifest(segments, complete=True)
+        self.audio_path = self.manifest_path
+        self._finalized_bytes = total
+        return self.audio_path
+
+    def compact_in_background(self, on_compacted: Callable[[str], Awaitable[None]]):
+        """Merge the finalized segments into one object without holding up the save"""
+        if self.audio_path != self.manifest_path:
+            return
+        task = asyncio.create_task(self._compact(self.manifest, on_compacted))
+        self._compact_task = task
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _compact(self, manifest: dict, on_compacted: Callable[[str], Awaitable[None]]):
+        try:
+            started = time.monotonic()
+            path = await storage.upload_to_supabase_storage(
+                self.user_id, self.recording_id, iter_manifest_audio(manifest, self.token), self.token,
+                "audio/flac", content_length=manifest_size(manifest)
+            )
+            if self.buffer.get_byte_count() > self._finalized_bytes:
+                # Recording resumed meanwhile; the next finalize() writes a newer manifest
+                return
+            await on_compacted(path)
+            self.audio_path = path
+            if self.buffer.get_byte_count() > self._finalized_bytes:
+                # Resumed during the swap: the next manifest still lists these segments, so keep them
+                return
+            # Rebase before deleting (no await in between): audio that arrives later is segmented
+            # again from the start of the buffer, so no manifest ever lists a deleted segment
+            self.segments, self.flushed_bytes, self.frames = [], 0, 0
+            await storage.delete_objects(
+                [segment["path"] for segment in manifest["segments"]] + [self.manifest_path], self.token
+            )
+            logger.info("🗜️ Compacted %d segments into %s in %.1fs",
+                        len(manifest["segments"]), path, time.monotonic() - started)
+        except Exception as e:
+            # The manifest stays valid, so the recording remains playable through the backend
+            logger.warning(f"⚠️ Segment compaction failed: {e}")
@@ -0,0 +1,130 @@
+"""
+Share-token resolution for the public share page and live viewers.
+
+GET /api/shares/{token} and every /ws/watch connection start by resolving a
+share token. One PostgREST select with embedded resources fetches the
+share, its recording and the recording's transcripts, and the result is
+cached per token:
+
+- for at most SHARE_CACHE_TTL_SECONDS, and never past the share's expires_at
+- unknown tokens are remembered briefly too, so a dead link can't hammer
+  the database
+- concurrent misses for the same token share one request
+- /ws/watch only checks the share, so on a miss it selects just the share
+  columns (resolve_share_access) instead of the recording and its
+  transcripts
+- deleting a recording or saving a session drops the recording's entries
+  on this worker; other workers catch up within the TTL (shares are
+  deactivated in the database directly, which the TTL also covers)
+"""
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+
+from cache import TTLCache
+from supabase_http import get_http_client
+from transcripts import TRANSCRIPT_COLUMNS
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+SHARE_CACHE_TTL_SECONDS = float(os.getenv("SHARE_CACHE_TTL_SECONDS", "30"))
+SHARE_NEGATIVE_TTL_SECONDS = 5
+
+SHARE_SELECT = (
+    "recording_id,is_active,expires_at,"
+    f"recordings(id,title,created_at,updated_at,audio_url,duration_seconds,transcripts({TRANSCRIPT_COLUMNS}))"
+)
+
+# What a live viewer's socket checks before subscribing
+SHARE_ACCESS_SELECT = "recording_id,is_active,expires_at"
+
+share_cache = TTLCache(
+    maxsize=int(os.getenv("SHARE_CACHE_MAX_ENTRIES", "512")),
+    ttl=SHARE_CACHE_TTL_SECONDS,
+)
+access_cache = TTLCache(
+    maxsize=int(os.getenv("SHARE_CACHE_MAX_ENTRIES", "512")),
+    ttl=SHARE_CACHE_TTL_SECONDS,
+)
+# Cached "no such share" marker (TTLCache.get returns None for a miss)
+_MISSING: dict = {}
+upstream_lookups = 0
+
+
+def _expires_at(share: dict) -> Optional[datetime]:
+    if not share.get("expires_at"):
+        return None
+    return datetime.fromisoformat(share["expires_at"].replace("Z", "+00:00"))
+
+
+def is_expired(share: dict) -> bool:
+    expires_at = _expires_at(share)
+    return expires_at is not None and expires_at <= datetime.now(timezone.utc)
+
+
+async def _fetch(share_token: str, select: str = SHARE_SELECT) -> Optional[dict]:
+    """The share with its recording and ordered transcripts embedded, or None"""
+    global upstream_lookups
+    upstream_lookups += 1
+    client = get_http_client()
+    params = {"share_token": f"eq.{share_token}", "select": select}
+    if select == SHARE_SELECT:
+        params["recordings.transcripts.order"] = "start_time.asc"
+    response = await client.get(
+        f"{SUPABASE_URL}/rest/v1/live_shares",
+        params=params,
+        headers={"apikey": SUPABASE_KEY}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Share lookup failed: {response.text}")
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+async def _resolve(share_token: str, access_only: bool = False) -> Optional[dict]:
+    if access_only:
+        share, cache = await _fetch(share_token, SHARE_ACCESS_SELECT), access_cache
+    else:
+        share, cache = await _fetch(share_token), share_cache
+    if share is None:
+        cache.set(share_token, _MISSING, SHARE_NEGATIVE_TTL_SECONDS)
+        return None
+    ttl = None
+    expires_at = _expires_at(share)
+    if expires_at is not None:
+        ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    cache.set(share_token, share, ttl)
+    return share
+
+
+async def resolve_share(share_token: str) -> Optional[dict]:
+    """Share row with `recordings` (and its `transcripts`) embedded; None if unknown.
+
+    Callers still check is_active and is_expired(): an entry can be served
+    up to the TTL after the share changes on another worker.
+    """
+    share = await share_cache.get_or_load(share_token, lambda: _resolve(share_token))
+    return share or None
+
+
+async def resolve_share_access(share_token: str) -> Optional[dict]:
+    """recording_id, is_active and expires_at of a share; None if unknown.
+
+    Answered from the full entry when the share page already cached it.
+    """
+    share = share_cache.get(share_token)
+    if share is not None:
+        return share or None
+    share = await access_cache.get_or_load(share_token, lambda: _resolve(share_token, access_only=True))
+    return share or None
+
+
+def invalidate_recording(recording_id: str) -> None:
+    for cache in (share_cache, access_cache):
+        cache.discard_where(lambda share: share.get("recording_id") == recording_id)
+
+
+def cache_stats() -> dict:
+    return {**share_cache.stats(), "access": access_cache.stats(), "upstream_lookups": upstream_lookups}
@@ -0,0 +1,289 @@
+"""
+Supabase Storage helpers for the recordings bucket
+"""
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+
+from cache import TTLCache
+from metrics import UPLOAD_BYTES, UPLOAD_SECONDS
+from supabase_http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+BUCKET = "recordings"
+
+SIGNED_URL_EXPIRES_IN = int(os.getenv("SIGNED_URL_EXPIRES_IN", "3600"))
+# Stop handing out a cached URL this long before it expires, so clients have time to use it
+SIGNED_URL_REFRESH_MARGIN = int(os.getenv("SIGNED_URL_REFRESH_MARGIN", "300"))
+SIGN_CONCURRENCY = int(os.getenv("SIGNED_URL_CONCURRENCY", "8"))
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+AUDIO_EXTENSIONS = {"webm": "webm", "flac": "flac", "ogg": "ogg", "mpeg": "mp3"}
+
+# Raw bytes, or blocks streamed to Storage without buffering the whole file
+AudioPayload = Union[bytes, Iterable[bytes], AsyncIterator[bytes]]
+
+# Signed URLs keyed by storage path
+signed_url_cache = TTLCache(
+    maxsize=int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", "20000")),
+    ttl=max(0, SIGNED_URL_EXPIRES_IN - SIGNED_URL_REFRESH_MARGIN),
+)
+
+
+def _cache_ttl(expires_in: int) -> int:
+    return expires_in - SIGNED_URL_REFRESH_MARGIN
+
+
+async def iter_upload_file(upload: UploadFile, block_size: int = UPLOAD_BLOCK_SIZE) -> AsyncIterator[bytes]:
+    """Read an UploadFile (spooled to disk by Starlette) in fixed-size blocks"""
+    while True:
+        block = await upload.read(block_size)
+        if not block:
+            break
+        yield block
+
+
+async def _as_async_blocks(blocks: Iterable[bytes]) -> AsyncIterator[bytes]:
+    for block in blocks:
+        yield block
+
+
+async def upload_object(
+    path: str,
+    content: AudioPayload,
+    token: str,
+    content_type: str,
+    content_length: Optional[int] = None
+) -> str:
+    """Upload (upsert) one object to the recordings bucket and return its path.
+
+    `content` may be bytes or an (async) iterator of blocks; iterators are
+    sent as a streaming request body so peak memory stays at one block.
+    """
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "apikey": SUPABASE_KEY,
+        "Content-Type": content_type,
+        "x-upsert": "true" # Allow overwriting existing files
+    }
+    if not isinstance(content, (bytes, bytearray, memoryview)):
+        content = content if hasattr(content, "__aiter__") else _as_async_blocks(content)
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+
+    client = get_http_client()
+    with UPLOAD_SECONDS.time():
+        response = await client.post(
+            f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}",
+            headers=headers,
+            content=content
+        )
+
+    if response.status_code not in [200, 201]:
+        raise HTTPException(status_code=500, detail=f"Storage upload failed: {response.text}")
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        UPLOAD_BYTES.inc(len(content))
+    elif content_length is not None:
+        UPLOAD_BYTES.inc(content_length)
+
+    signed_url_cache.pop(path)
+    return path
+
+
+async def upload_to_supabase_storage(
+    user_id: str,
+    recording_id: str,
+    audio: AudioPayload,
+    token: str,
+    content_type: str = "audio/wav",
+    content_length: Optional[int] = None
+) -> str:
+    """Upload audio file to Supabase Storage and return the storage path"""
+    # Determine extension based on content_type
+    ext = next((ext for mime, ext in AUDIO_EXTENSIONS.items() if mime in content_type), "wav")
+    filename = f"{user_id}/{recording_id}.{ext}"
+    # Return internal storage path, NOT public URL
+    return await upload_object(filename, audio, token, content_type, content_length)
+
+
+async def iter_download(path: str, token: str) -> AsyncIterator[bytes]:
+    """Stream an object from the recordings bucket"""
+    client = get_http_client()
+    async with client.stream(
+        "GET",
+        f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}",
+        headers={"Authorization": f"Bearer {token}", "apikey": SUPABASE_KEY}
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise HTTPException(status_code=502, detail=f"Storage download failed for {path}: {response.text}")
+        async for block in response.aiter_bytes():
+            yield block
+
+
+async def iter_signed_download(signed_path: str, byte_range: Optional[Tuple[int, int]] = None) -> AsyncIterator[bytes]:
+    """Stream an object through a signed URL path (`/object/sign/...?token=...`); no credentials.
+
+    `byte_range` is a half-open [start, end) slice of the object.
+    """
+    client = get_http_client()
+    headers = {"Range": f"bytes={byte_range[0]}-{byte_range[1] - 1}"} if byte_range else {}
+    async with client.stream("GET", f"{SUPABASE_URL}/storage/v1{signed_path}", headers=headers) as response:
+        if response.status_code not in (200, 206):
+            await response.aread()
+            status = 404 if response.status_code in (400, 404) else 502
+            raise HTTPException(status_code=status, detail=f"Storage download failed: {response.text}")
+        if not byte_range or response.status_code == 206:
+            async for block in response.aiter_bytes():
+                yield block
+            return
+        # Range ignored: cut the slice out of the whole object
+        offset = 0
+        start, end = byte_range
+        async for block in response.aiter_bytes():
+            lo, hi = max(start - offset, 0), min(end - offset, len(block))
+            if lo < hi:
+                yield block[lo:hi]
+            offset += len(block)
+            if offset >= end:
+                break
+
+
+async def download_object(path: str, token: str) -> bytes:
+    """Read a small object (e.g. a manifest) into memory"""
+    return b"".join([block async for block in iter_download(path, token)])
+
+
+async def create_signed_url(
+    filename: str, token: str, expires_in: int = SIGNED_URL_EXPIRES_IN, use_cache: bool = True
+) -> Optional[str]:
+    """Create a signed URL for a file in storage (served from cache until shortly before expiry)"""
+    cached = signed_url_cache.get(filename) if use_cache else None
+    if cached:
+        return cached
+
+    client = get_http_client()
+    response = await client.post(
+        f"{SUPABASE_URL}/storage/v1/object/sign/{BUCKET}/{filename}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "apikey": SUPABASE_KEY,
+            "Content-Type": "application/json"
+        },
+        json={"expiresIn": expires_in}
+    )
+
+    if response.status_code != 200:
+        logger.error(f"Failed to sign URL for {filename}: {response.text}")
+        return None
+
+    data = response.json()
+    # The signedURL returned is relative to the Supabase URL
+    signed_url = f"{SUPABASE_URL}/storage/v1{data['signedURL']}"
+    signed_url_cache.set(filename, signed_url, _cache_ttl(expires_in))
+    return signed_url
+
+
+async def _sign_individually(paths: List[str], token: str, expires_in: int, use_cache: bool = True) -> Dict[str, str]:
+    """Fallback when the bulk endpoint is unavailable: bounded-concurrency gather"""
+    sem = asyncio.Semaphore(SIGN_CONCURRENCY)
+
+    async def sign(path: str):
+        async with sem:
+            return path, await create_signed_url(path, token, expires_in, use_cache)
+
+    results = await asyncio.gather(*(sign(p) for p in paths))
+    return {path: url for path, url in results if url}
+
+
+async def create_signed_urls(
+    paths: List[str], token: str, expires_in: int = SIGNED_URL_EXPIRES_IN, use_cache: bool = True
+) -> Dict[str, str]:
+    """Sign many storage paths at once; returns {path: signed_url} for the ones that succeeded.
+
+    Cached URLs are reused (unless use_cache is False, for callers that need
+    the full expires_in from now); the rest go to Storage's bulk
+    /object/sign/{bucket} endpoint in a single round-trip.
+    """
+    signed: Dict[str, str] = {}
+    missing: List[str] = []
+    for path in dict.fromkeys(paths):
+        cached = signed_url_cache.get(path) if use_cache else None
+        if cached:
+            signed[path] = cached
+        else:
+            missing.append(path)
+    if not missing:
+        return signed
+
+    client = get_http_client()
+    try:
+        response = await client.post(
+            f"{SUPABASE_URL}/storage/v1/object/sign/{BUCKET}",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "apikey": SUPABASE_KEY,
+                "Content-Type": "application/json"
+            },
+            json={"expiresIn": expires_in, "paths": missing}
+        )
+    except Exception as e:
+        logger.warning(f"Bulk sign request failed, signing individually: {e}")
+        response = None
+
+    if response is None or response.status_code != 200:
+        if response is not None:
+            logger.warning(f"Bulk sign failed ({response.status_code}), signing individually: {response.text}")
+        signed.update(await _sign_individually(missing, token, expires_in, use_cache))
+        return signed
+
+    for item in response.json():
+        path = item.get("path")
+        if item.get("error") or not item.get("signedURL") or not path:
+            logger.error(f"Failed to sign URL for {path}: {item.get('error')}")
+            continue
+        signed_url = f"{SUPABASE_URL}/storage/v1{item['signedURL']}"
+        signed_url_cache.set(path, signed_url, _cache_ttl(expires_in))
+        signed[path] = signed_url
+    return signed
+
+
+async def delete_from_supabase_storage(filename: str, token: str) -> None:
+    """Delete a file from Supabase Storage (ignore missing)"""
+    signed_url_cache.pop(filename)
+    client = get_http_client()
+    response = await client.delete(
+        f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{filename}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "apikey": SUPABASE_KEY,
+        }
+    )
+    if response.status_code not in [200, 204]:
+        # Log but don't fail the entire request
+        logger.warning(f"Storage delete warning for {filename}: {response.status_code} {response.text}")
+
+
+async def delete_objects(paths: List[str], token: str) -> None:
+    """Delete several objects in one request (ignore missing)"""
+    if not paths:
+        return
+    for path in paths:
+        signed_url_cache.pop(path)
+    client = get_http_client()
+    response = await client.request(
+        "DELETE",
+        f"{SUPABASE_URL}/storage/v1/object/{BUCKET}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "apikey": SUPABASE_KEY,
+        },
+        json={"prefixes": paths}
+    )
+    if response.status_code not in [200, 204]:
+        logger.warning(f"Storage bulk delete warning ({len(paths)} objects): {response.status_code} {response.text}")
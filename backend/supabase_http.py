@@ -0,0 +1,114 @@
+"""
+Shared HTTP connection pool for Supabase REST, Storage and Auth traffic
+"""
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from metrics import SUPABASE_SECONDS, supabase_endpoint
+
+# Application-lifetime client (opened/closed by the FastAPI lifespan)
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["verbact_started"] = time.perf_counter()
+
+
+async def _observe_latency(response: httpx.Response) -> None:
+    request = response.request
+    started = request.extensions.get("verbact_started")
+    if started is not None:
+        SUPABASE_SECONDS.labels(
+            request.method, supabase_endpoint(request.url.path), f"{response.status_code // 100}xx"
+        ).observe(time.perf_counter() - started)
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled client from environment settings"""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    # HTTP/2 multiplexes concurrent requests over one connection; needs the h2 extra
+    http2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true" and _http2_available()
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        # Per-endpoint latency for /metrics (time to response headers)
+        event_hooks={"request": [_start_timer], "response": [_observe_latency]},
+    )
+
+
+async def open_pool() -> httpx.AsyncClient:
+    """Open the shared client (called once at application startup)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_pool() -> None:
+    """Close the shared client and drop all pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside of the lifespan (scripts, tests)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+class SupabaseSession:
+    """Per-request view over the shared pool that carries the caller's auth headers.
+
+    Usable as ``async with`` so existing call sites keep their shape, but leaving
+    the block does not close anything: the connections stay in the pool.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], client: Optional[httpx.AsyncClient] = None):
+        self.base_url = base_url.rstrip("/") if base_url else ""
+        self.headers = headers
+        self._client = client
+
+    async def __aenter__(self) -> "SupabaseSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    async def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> httpx.Response:
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        client = self._client or get_http_client()
+        return await client.request(method, f"{self.base_url}{url}", headers=merged, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
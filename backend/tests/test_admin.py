@@ -0,0 +1,81 @@
+import asyncio
+
+import admin
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = ""
+
+    def json(self):
+        return self.body
+
+
+class FakeAdminSession:
+    """increment_usage RPC semantics over an in-memory profile"""
+
+    def __init__(self, usage=100, rpc=True):
+        self.usage = usage
+        self.rpc = rpc
+        self.counted = {}
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def post(self, url, json):
+        self.calls.append(("POST", url))
+        if not self.rpc:
+            return FakeResponse(404)
+        delta = max(json["p_seconds"] - self.counted.get(json["p_session_id"], 0), 0)
+        self.counted[json["p_session_id"]] = self.counted.get(json["p_session_id"], 0) + delta
+        self.usage += delta
+        return FakeResponse(200, self.usage)
+
+    async def get(self, url, params):
+        self.calls.append(("GET", url))
+        return FakeResponse(200, [{"usage_seconds": self.usage}])
+
+    async def patch(self, url, params, json):
+        self.calls.append(("PATCH", url))
+        self.usage = json["usage_seconds"]
+        return FakeResponse(204)
+
+
+def test_repeated_saves_only_count_new_seconds(monkeypatch):
+    session = FakeAdminSession()
+    monkeypatch.setattr(admin, "admin_session", lambda: session)
+
+    async def saves():
+        return [
+            await admin.increment_usage("user-1", 30, "socket-a"),
+            # Auto-save after more audio, then a retry of the same save
+            await admin.increment_usage("user-1", 45, "socket-a"),
+            await admin.increment_usage("user-1", 45, "socket-a"),
+            await admin.increment_usage("user-1", 10, "socket-b"),
+        ]
+
+    assert asyncio.run(saves()) == [130, 145, 145, 155]
+    assert all(method == "POST" for method, _ in session.calls)
+
+
+def test_falls_back_to_read_and_update_without_the_rpc(monkeypatch):
+    session = FakeAdminSession(rpc=False)
+    monkeypatch.setattr(admin, "admin_session", lambda: session)
+
+    admin._counted_sessions.clear()
+
+    async def saves():
+        return [
+            await admin.increment_usage("user-1", 30, "socket-a"),
+            await admin.increment_usage("user-1", 45, "socket-a"),
+            await admin.increment_usage("user-1", 45, "socket-a"),
+        ]
+
+    assert asyncio.run(saves()) == [130, 145, 145]
+    assert [method for method, _ in session.calls] == ["POST", "GET", "PATCH"] * 2 + ["POST", "GET"]
@@ -0,0 +1,57 @@
+import io
+import os
+import wave
+
+from audio import AudioBuffer, WAV_HEADER_SIZE
+
+
+def reference_wav(pcm: bytes) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(pcm)
+    return buf.getvalue()
+
+
+def test_spilled_buffer_round_trips_to_wav():
+    buffer = AudioBuffer(memory_limit=10_000)
+    frames = [os.urandom(3200) for _ in range(25)]
+    for frame in frames:
+        buffer.add_chunk(frame)
+
+    pcm = b"".join(frames)
+    assert buffer.get_memory_bytes() < 10_000
+    assert buffer.get_byte_count() == len(pcm)
+    assert buffer.get_duration_seconds() == len(pcm) / 2 / 16000
+    assert b"".join(buffer.iter_pcm(block_size=4096)) == pcm
+    assert buffer.get_wav_bytes() == reference_wav(pcm)
+    assert buffer.get_wav_size() == WAV_HEADER_SIZE + len(pcm)
+    buffer.close()
+    assert buffer.get_byte_count() == 0
+
+
+def test_iter_wav_ignores_audio_added_while_streaming():
+    buffer = AudioBuffer(memory_limit=6400)
+    for _ in range(4):
+        buffer.add_chunk(b"\x01" * 3200)
+    blocks = buffer.iter_wav(block_size=3200)
+    header = next(blocks)
+    buffer.add_chunk(b"\x02" * 3200)
+    body = b"".join(blocks)
+    assert len(header) + len(body) == WAV_HEADER_SIZE + 4 * 3200
+    assert b"\x02" not in body
+
+
+def test_chunks_larger_than_window_and_views_survive_spill():
+    buffer = AudioBuffer(memory_limit=1000)
+    buffer.add_chunk(b"\x03" * 300)
+    blocks = list(buffer.iter_pcm())
+    assert all(isinstance(block, memoryview) for block in blocks)
+
+    buffer.add_chunk(b"\x04" * 2500)
+    assert bytes(blocks[0]) == b"\x03" * 300
+    assert buffer.get_byte_count() == 2800
+    assert buffer.get_memory_bytes() == 800
+    assert b"".join(buffer.iter_pcm(block_size=512)) == b"\x03" * 300 + b"\x04" * 2500
@@ -0,0 +1,134 @@
+import asyncio
+import base64
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+import auth
+from cache import TTLCache
+
+SECRET = "test-jwt-secret"
+
+
+def make_token(sub="user-1", exp_in=3600):
+    return jwt.encode(
+        {"sub": sub, "email": "a@b.c", "aud": "authenticated", "exp": int(time.time()) + exp_in},
+        SECRET,
+        algorithm="HS256",
+    )
+
+
+def test_ttl_cache_lru_eviction_and_expiry():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_local_verification_is_cached(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    auth.token_cache.clear()
+
+    async def no_network(token):
+        raise AssertionError("remote verification should be skipped")
+
+    monkeypatch.setattr(auth, "_verify_remotely", no_network)
+    token = make_token()
+
+    user = asyncio.run(auth.get_user(token))
+    assert user["id"] == "user-1"
+    hits = auth.token_cache.hits
+    assert asyncio.run(auth.get_user(token))["id"] == "user-1"
+    assert auth.token_cache.hits == hits + 1
+
+
+def test_bad_signature_and_expired_tokens_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    auth.token_cache.clear()
+    forged = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 60}, "other", algorithm="HS256")
+
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(auth.get_user(forged))
+    assert err.value.status_code == 401
+
+    with pytest.raises(HTTPException):
+        asyncio.run(auth.get_user(make_token(exp_in=-10)))
+
+
+@pytest.mark.parametrize("payload", [
+    b"[1, 2]", b'"user"', b'{"sub": "x", "exp": "soon"}', b'{"sub": "x", "exp": [1]}', b"not json",
+])
+def test_malformed_claims_are_401(monkeypatch, payload):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    auth.token_cache.clear()
+
+    async def no_network(token):
+        raise AssertionError("remote verification should be skipped")
+
+    monkeypatch.setattr(auth, "_verify_remotely", no_network)
+    token = "eyJhbGciOiJIUzI1NiJ9." + base64.urlsafe_b64encode(payload).decode().rstrip("=") + ".sig"
+
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(auth.get_user(token))
+    assert err.value.status_code == 401
+
+
+def test_get_or_load_shares_one_load_and_its_failure():
+    cache = TTLCache(maxsize=8, ttl=60)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=502)
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, HTTPException) for r in results)
+        assert len(calls) == 1
+
+        async def storing():
+            cache.set("k", "v")
+            return "v"
+
+        assert await cache.get_or_load("k", storing) == "v"
+        assert await cache.get_or_load("k", failing) == "v"  # served from cache
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_shared_load():
+    cache = TTLCache(maxsize=8, ttl=60)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        cache.set("k", "v")
+        return "v"
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_load("k", slow))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "v"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert cache.get("k") == "v"
+        assert not cache._inflight
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
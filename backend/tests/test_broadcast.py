@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import broadcast
+from broadcast import BroadcastHub, TranscriptHistory
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0, block: bool = False):
+        self.delay = delay
+        self.block = block
+        self.received = []
+        self.closed_with = None
+
+    async def send_text(self, text: str):
+        if self.block:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+
+def test_slow_viewer_does_not_delay_others():
+    async def scenario():
+        hub = BroadcastHub()
+        fast, slow = FakeSocket(), FakeSocket(delay=0.05)
+        hub.subscribe("rec", fast)
+        hub.subscribe("rec", slow)
+        for i in range(5):
+            hub.publish("rec", {"transcript": f"final {i}", "is_final": True})
+        await asyncio.sleep(0.01)
+        assert [m["transcript"] for m in fast.received] == [f"final {i}" for i in range(5)]
+        assert len(slow.received) < 5
+        await asyncio.sleep(0.3)
+        assert len(slow.received) == 5
+
+    asyncio.run(scenario())
+
+
+def test_interims_are_coalesced_and_finals_kept_in_order():
+    async def scenario():
+        hub = BroadcastHub()
+        socket = FakeSocket()
+        hub.subscribe("rec", socket, backlog=[json.dumps({"transcript": "history", "is_final": True})])
+        hub.publish("rec", {"transcript": "a", "is_final": False})
+        hub.publish("rec", {"transcript": "ab", "is_final": False})
+        hub.publish("rec", {"transcript": "abc", "is_final": True})
+        hub.publish("rec", {"transcript": "d", "is_final": False})
+        hub.publish("rec", {"transcript": "de", "is_final": False})
+        await asyncio.sleep(0.01)
+        assert [m["transcript"] for m in socket.received] == ["history", "abc", "de"]
+        assert hub.coalesced == 2
+
+    asyncio.run(scenario())
+
+
+def test_stalled_viewer_is_evicted(monkeypatch):
+    monkeypatch.setattr(broadcast, "BROADCAST_QUEUE_SIZE", 3)
+
+    async def scenario():
+        hub = BroadcastHub()
+        stuck = FakeSocket(block=True)
+        hub.subscribe("rec", stuck)
+        for i in range(5):
+            hub.publish("rec", {"transcript": str(i), "is_final": True})
+        await asyncio.sleep(0.01)
+        assert hub.viewer_count("rec") == 0
+        assert hub.evicted == 1
+        assert stuck.closed_with == broadcast.EVICT_CLOSE_CODE
+
+    asyncio.run(scenario())
+
+
+def test_deleting_a_recording_closes_its_viewers():
+    async def scenario():
+        hub = BroadcastHub()
+        viewers = [FakeSocket(), FakeSocket()]
+        other = FakeSocket()
+        for socket in viewers:
+            hub.subscribe("rec", socket)
+        hub.subscribe("other", other)
+        hub.close_recording("rec")
+        await asyncio.sleep(0.01)
+        assert hub.viewer_count("rec") == 0
+        assert [socket.closed_with for socket in viewers] == [1000, 1000]
+        assert other.closed_with is None and hub.evicted == 0
+
+    asyncio.run(scenario())
+
+
+def test_history_snapshot_keeps_finals_and_latest_interim():
+    history = TranscriptHistory()
+    for i in range(3):
+        for partial in ("w", "wo", "wor"):
+            history.add({"transcript": f"{partial} {i}", "is_final": False, "confidence": 0.5, "timestamp": 1.0})
+        history.add({"transcript": f"word {i}", "is_final": True, "confidence": 0.9, "start": i, "end": i + 1, "timestamp": 1.0})
+    history.add({"transcript": "tail", "is_final": False, "confidence": 0.4})
+
+    snapshot = json.loads(history.snapshot())
+    assert snapshot["type"] == "snapshot"
+    assert [f["transcript"] for f in snapshot["finals"]] == ["word 0", "word 1", "word 2"]
+    assert snapshot["finals"][1] == {"transcript": "word 1", "confidence": 0.9, "start": 1, "end": 2}
+    assert snapshot["interim"] == {"transcript": "tail", "confidence": 0.4}
+    assert history.finals == snapshot["finals"]
+
+    history.add({"transcript": "tail end", "is_final": True, "confidence": 0.8})
+    assert json.loads(history.snapshot())["interim"] is None
+    assert len(history) == 4
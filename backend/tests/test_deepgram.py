@@ -0,0 +1,89 @@
+import asyncio
+
+import deepgram
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_connect(outcomes, calls):
+    async def connect(api_key):
+        calls.append(api_key)
+        await asyncio.sleep(0.01)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return connect
+
+
+def test_speculative_connect_starts_before_get(monkeypatch):
+    connection, calls = FakeConnection(), []
+    monkeypatch.setattr(deepgram, "connect", fake_connect([connection], calls))
+
+    async def scenario():
+        upstream = deepgram.UpstreamConnection("key", speculative=True)
+        await asyncio.sleep(0)  # auth would run here
+        assert calls == ["key"]
+        return await upstream.get()
+
+    assert asyncio.run(scenario()) is connection
+    assert calls == ["key"]
+
+
+def test_failed_speculative_connect_falls_back_to_a_fresh_one(monkeypatch):
+    connection, calls = FakeConnection(), []
+    monkeypatch.setattr(deepgram, "connect", fake_connect([OSError("dns"), connection], calls))
+
+    async def scenario():
+        upstream = deepgram.UpstreamConnection("key", speculative=True)
+        return await upstream.get()
+
+    assert asyncio.run(scenario()) is connection
+    assert len(calls) == 2
+
+
+def test_connect_after_auth_when_prewarm_is_off(monkeypatch):
+    connection, calls = FakeConnection(), []
+    monkeypatch.setattr(deepgram, "connect", fake_connect([connection], calls))
+
+    async def scenario():
+        upstream = deepgram.UpstreamConnection("key", speculative=False)
+        await asyncio.sleep(0.02)
+        assert calls == []
+        return await upstream.get()
+
+    assert asyncio.run(scenario()) is connection
+
+
+def test_discard_closes_an_unused_connection(monkeypatch):
+    connection, calls = FakeConnection(), []
+    monkeypatch.setattr(deepgram, "connect", fake_connect([connection], calls))
+
+    async def scenario():
+        upstream = deepgram.UpstreamConnection("key", speculative=True)
+        await asyncio.sleep(0.05)  # connected while auth was failing
+        await upstream.discard()
+
+    asyncio.run(scenario())
+    assert connection.closed
+
+
+def test_discard_cancels_a_pending_connect(monkeypatch):
+    calls = []
+    monkeypatch.setattr(deepgram, "connect", fake_connect([FakeConnection()], calls))
+
+    async def scenario():
+        upstream = deepgram.UpstreamConnection("key", speculative=True)
+        await asyncio.sleep(0)
+        await upstream.discard()
+        return upstream
+
+    upstream = asyncio.run(scenario())
+    assert upstream._task is None
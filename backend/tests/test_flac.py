@@ -0,0 +1,168 @@
+import hashlib
+import math
+import random
+import struct
+
+import flac
+
+
+class BitReader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos * 8
+
+    def bits(self, n: int) -> int:
+        value = 0
+        for _ in range(n):
+            value = (value << 1) | ((self.data[self.pos >> 3] >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def signed(self, n: int) -> int:
+        value = self.bits(n)
+        return value - (1 << n) if value >> (n - 1) else value
+
+    def unary(self) -> int:
+        zeros = 0
+        while not self.bits(1):
+            zeros += 1
+        return zeros
+
+    def align(self) -> int:
+        self.pos += -self.pos % 8
+        return self.pos >> 3
+
+
+def decode_subframe(reader: BitReader, block_size: int) -> list:
+    assert reader.bits(1) == 0
+    kind = reader.bits(6)
+    assert reader.bits(1) == 0  # no wasted bits
+    if kind == 0:
+        return [reader.signed(16)] * block_size
+    assert kind & 0b111000 == 0b001000, f"unexpected subframe type {kind:06b}"
+    order = kind & 0b111
+    samples = [reader.signed(16) for _ in range(order)]
+
+    assert reader.bits(2) == 0  # 4-bit Rice parameters
+    partition_order = reader.bits(4)
+    residual = []
+    for index in range(1 << partition_order):
+        k = reader.bits(4)
+        assert k != 0b1111  # the encoder never escapes
+        for _ in range((block_size >> partition_order) - (order if index == 0 else 0)):
+            u = (reader.unary() << k) | reader.bits(k)
+            residual.append(u >> 1 if not u & 1 else ~(u >> 1))
+
+    coefficients = {0: [], 1: [1], 2: [2, -1], 3: [3, -3, 1], 4: [4, -6, 4, -1]}[order]
+    for e in residual:
+        samples.append(e + sum(c * samples[-1 - i] for i, c in enumerate(coefficients)))
+    return samples
+
+
+def decode_flac(data: bytes):
+    """Fixed-predictor + Rice decoder for what flac.py writes: (sample_rate, channels, md5, pcm)"""
+    assert data[:4] == b"fLaC" and data[4] == 0x80 and int.from_bytes(data[5:8], "big") == 34
+    packed = int.from_bytes(data[18:26], "big")
+    sample_rate, channels, total = packed >> 44, ((packed >> 41) & 7) + 1, packed & ((1 << 36) - 1)
+    md5 = data[26:42]
+
+    pos, frame_number, decoded = 42, 0, []
+    while pos < len(data):
+        start = pos
+        assert data[pos:pos + 2] == b"\xFF\xF8" and data[pos + 2] == 0b0111_0000
+        assert data[pos + 3] == ((channels - 1) << 4) | 0b1000
+        reader = BitReader(data, pos + 4)
+        first = reader.bits(8)
+        length = 0 if first < 0x80 else 8 - (first ^ 0xFF).bit_length()
+        number = first & (0x7F >> length) if length else first
+        for _ in range(max(length - 1, 0)):
+            number = (number << 6) | (reader.bits(8) & 0x3F)
+        assert number == frame_number
+        block_size = reader.bits(16) + 1
+        header_end = reader.align()
+        assert flac.crc8(data[start:header_end]) == data[header_end]
+        reader = BitReader(data, header_end + 1)
+        subframes = [decode_subframe(reader, block_size) for _ in range(channels)]
+        pos = reader.align()
+        assert flac.crc16(data[start:pos]) == int.from_bytes(data[pos:pos + 2], "big")
+        pos += 2
+        decoded.extend(s for frame in zip(*subframes) for s in frame)
+        frame_number += 1
+
+    assert len(decoded) == total * channels
+    return sample_rate, channels, md5, struct.pack(f"<{len(decoded)}h", *decoded)
+
+
+def test_crc_check_values():
+    # Standard check values for "123456789"
+    assert flac.crc8(b"123456789") == 0xF4
+    assert flac.crc16(b"123456789") == 0xFEE8
+
+
+def test_stream_info_and_frames():
+    samples = [int(1000 * ((i % 64) - 32)) for i in range(flac.BLOCK_SIZE + 100)]
+    pcm = struct.pack(f"<{len(samples)}h", *samples)
+    blocks = list(flac.iter_flac(pcm, sample_rate=16000))
+
+    info = blocks[0]
+    assert info[:4] == b"fLaC"
+    packed = int.from_bytes(info[18:26], "big")
+    assert packed >> 44 == 16000
+    assert packed & ((1 << 36) - 1) == len(samples)
+
+    # one full frame plus the short tail, each starting with the sync code and ending in its CRC-16
+    assert len(blocks) == 3
+    for frame in blocks[1:]:
+        assert frame[:2] == b"\xFF\xF8"
+        assert flac.crc16(frame[:-2]) == int.from_bytes(frame[-2:], "big")
+    assert sum(map(len, blocks)) < len(pcm)
+
+
+def test_silence_uses_constant_subframes():
+    pcm = b"\x00\x00" * flac.BLOCK_SIZE * 10
+    encoded = b"".join(flac.iter_flac(pcm))
+    assert len(encoded) < 200
+
+
+def test_segment_frames_concatenate_to_one_stream():
+    samples = [(i * 37) % 2000 - 1000 for i in range(flac.BLOCK_SIZE * 3 + 500)]
+    pcm = struct.pack(f"<{len(samples)}h", *samples)
+    split = flac.BLOCK_SIZE * 2 * 2  # two whole blocks
+
+    whole = b"".join(flac.iter_flac(pcm))
+    pieces = (
+        flac.stream_info(16000, 1, len(samples))
+        + b"".join(flac.iter_frames(pcm[:split]))
+        + b"".join(flac.iter_frames(pcm[split:], first_frame=2))
+    )
+    # identical apart from the MD5 that segmented streams leave unset
+    assert pieces[:26] == whole[:26]
+    assert pieces[42:] == whole[42:]
+
+
+def assert_round_trip(samples, channels):
+    pcm = struct.pack(f"<{len(samples)}h", *samples)
+    sample_rate, decoded_channels, md5, decoded = decode_flac(b"".join(flac.iter_flac(pcm, 16000, channels)))
+    assert (sample_rate, decoded_channels) == (16000, channels)
+    assert decoded == pcm
+    assert md5 == hashlib.md5(pcm).digest()
+
+
+def test_decodes_back_to_the_input_mono():
+    rng = random.Random(3)
+    n = flac.BLOCK_SIZE * 3 + 777  # short last block
+    smooth = [round(12000 * math.sin(i / 40)) for i in range(flac.BLOCK_SIZE)]  # high predictor orders
+    noise = [rng.randint(-32768, 32767) for _ in range(flac.BLOCK_SIZE)]  # order 0, large Rice codes
+    silence = [0] * flac.BLOCK_SIZE  # CONSTANT subframe
+    tail = [rng.randint(-300, 300) for _ in range(n - 3 * flac.BLOCK_SIZE)]
+    assert_round_trip(smooth + noise + silence + tail, 1)
+
+
+def test_decodes_back_to_the_input_stereo():
+    rng = random.Random(5)
+    frames = flac.BLOCK_SIZE * 2 + 1234
+    samples = []
+    for i in range(frames):
+        samples.append(round(8000 * math.sin(i / 25)) + rng.randint(-50, 50))
+        samples.append(-7 if i < flac.BLOCK_SIZE else rng.randint(-32768, 32767))
+    assert_round_trip(samples, 2)
@@ -0,0 +1,62 @@
+import pytest
+
+import latency
+from latency import TranscriptLatencyTracker
+
+CHUNK = 3200  # 100ms of 16kHz mono linear16
+
+
+def send_chunks(tracker, count, start_at=0.0, interval=0.1):
+    for i in range(count):
+        tracker.on_audio_sent(CHUNK, now=start_at + i * interval)
+
+
+def test_result_is_matched_to_the_chunk_holding_its_last_sample():
+    tracker = TranscriptLatencyTracker()
+    send_chunks(tracker, 20)  # chunk i covers audio up to (i + 1) * 0.1s, sent at i * 0.1s
+
+    # Audio 0.5s..1.25s ends inside chunk 12, which was sent at t=1.2
+    assert tracker.on_result(0.5, 0.75, is_final=False, now=1.5) == pytest.approx(0.3)
+    # Ending exactly on a chunk boundary belongs to that chunk (sent at t=0.9)
+    assert tracker.on_result(0.0, 1.0, is_final=True, now=1.6) == pytest.approx(0.7)
+
+    summary = tracker.summary()
+    assert summary["audio_seconds_sent"] == 2.0
+    assert summary["interim"]["count"] == 1
+    assert summary["final"]["count"] == 1
+    assert summary["clamped"] == 0
+
+
+def test_result_past_the_sent_audio_is_clamped_to_the_newest_chunk():
+    tracker = TranscriptLatencyTracker()
+    send_chunks(tracker, 5)
+
+    assert tracker.on_result(0.0, 0.5000001, is_final=True, now=0.45) == pytest.approx(0.05)
+    assert tracker.clamped == 0
+    assert tracker.on_result(0.0, 0.9, is_final=True, now=0.5) == pytest.approx(0.1)
+    assert tracker.clamped == 1
+
+
+def test_no_audio_means_no_measurement():
+    assert TranscriptLatencyTracker().on_result(0.0, 1.0, is_final=False) is None
+
+
+def test_marks_before_a_final_are_pruned():
+    tracker = TranscriptLatencyTracker()
+    send_chunks(tracker, 2000)
+
+    tracker.on_result(0.0, 150.0, is_final=True, now=200.0)
+    assert len(tracker._offsets) < 1000
+    # Results after the final still resolve against the remaining marks
+    assert tracker.on_result(150.0, 10.0, is_final=False, now=160.0) == pytest.approx(0.1)
+
+
+def test_results_feed_the_worker_wide_histogram():
+    before = latency.aggregate_stats()["final"]["count"]
+    tracker = TranscriptLatencyTracker()
+    send_chunks(tracker, 3)
+    tracker.on_result(0.0, 0.3, is_final=True, now=0.5)
+
+    stats = latency.aggregate_stats()["final"]
+    assert stats["count"] == before + 1
+    assert stats["max_ms"] >= 300
@@ -0,0 +1,55 @@
+import json
+import logging
+
+import pytest
+
+import logs
+
+
+@pytest.fixture
+def restore_logging(monkeypatch):
+    """Undo configure_logging's process-wide changes after the test"""
+    for flag in ("_srcfile", "logThreads", "logProcesses", "logMultiprocessing"):
+        monkeypatch.setattr(logging, flag, getattr(logging, flag))
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    quiet_levels = {name: logging.getLogger(name).level for name in logs._QUIET_LOGGERS}
+    # Start fresh even if importing main already configured logging
+    monkeypatch.setattr(logs, "_listener", None)
+    yield
+    logs.shutdown_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+    for name, level in quiet_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def test_json_lines_carry_context_and_rotate(tmp_path, monkeypatch, restore_logging):
+    log_file = tmp_path / "api.log"
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setenv("LOG_FILE_MAX_BYTES", "2000")
+    monkeypatch.setenv("LOG_FILE_BACKUPS", "2")
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    logs.configure_logging()
+    log = logging.LoggerAdapter(logging.getLogger("verbact.test"), {"client_id": "c-1"})
+    log.debug("dropped %s", "before formatting")
+    log.info("chunk %d of %s", 1, "session")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("save failed")
+    for i in range(25):
+        log.info("filler line %d", i)
+    logs.shutdown_logging()
+
+    lines = [json.loads(line) for path in sorted(tmp_path.iterdir()) for line in path.read_text().splitlines()]
+    messages = [line["msg"] for line in lines]
+    assert "chunk 1 of session" in messages
+    assert not any("dropped" in msg for msg in messages)
+    failure = next(line for line in lines if line["msg"] == "save failed")
+    assert failure["level"] == "ERROR"
+    assert failure["client_id"] == "c-1"
+    assert "ValueError: boom" in failure["exc"]
+    # Rotated at 2000 bytes, keeping at most two backups
+    assert 2 <= len(list(tmp_path.iterdir())) <= 3
+    assert all(path.stat().st_size <= 2000 for path in tmp_path.iterdir())
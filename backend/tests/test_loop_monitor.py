@@ -0,0 +1,20 @@
+import asyncio
+import time
+
+from loop_monitor import LoopLagMonitor
+
+
+def test_blocking_call_shows_up_as_lag():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.005)
+        monitor.start()
+        await asyncio.sleep(0.03)
+        time.sleep(0.12)  # a synchronous call on the loop
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["max_ms"] >= 100
+    assert stats["stalls"] == 1
+    assert stats["p50_ms"] < 100
@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, HistogramMetric, supabase_endpoint
+
+
+def test_histogram_buckets_are_upper_inclusive():
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 0, 1]
+    assert list(histogram.cumulative()) == [(0.1, 2), (0.5, 3), (1.0, 3), (math.inf, 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.45)
+    assert (histogram.min, histogram.max) == (0.05, 2.0)
+
+
+def test_histogram_quantile_stays_within_observed_range():
+    histogram = Histogram((0.01, 0.1, 1.0))
+    for i in range(100):
+        histogram.observe(0.02 + i * 0.0005)  # 20ms .. 69.5ms, all in one bucket
+
+    assert 0.02 <= histogram.quantile(0.5) <= 0.0695
+    assert histogram.quantile(0.5) == pytest.approx(0.045, abs=0.001)
+    assert histogram.quantile(1.0) == pytest.approx(0.0695)
+    assert Histogram().quantile(0.99) == 0.0
+
+
+def test_render_text_exposition():
+    requests = Counter("test_requests", "Requests handled", ("route",))
+    latency = HistogramMetric("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    try:
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc(2)
+        with latency.time():
+            pass
+
+        text = metrics.render()
+        assert "# TYPE test_requests counter" in text
+        assert 'test_requests_total{route="/a\\"b"} 3.0' in text
+        assert "# TYPE test_latency_seconds histogram" in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+        assert "test_latency_seconds_count 1" in text
+        assert text.endswith("\n")
+    finally:
+        metrics._registry.remove(requests)
+        metrics._registry.remove(latency)
+
+
+def test_unlabelled_metrics_render_before_first_observation():
+    uploads = Counter("test_uploads", "Uploads")
+    try:
+        assert "test_uploads_total 0.0" in metrics.render()
+    finally:
+        metrics._registry.remove(uploads)
+
+
+def test_supabase_endpoint_drops_ids_and_object_names():
+    assert supabase_endpoint("/rest/v1/recordings") == "/rest/v1/recordings"
+    assert supabase_endpoint("/rest/v1/rpc/increment_usage") == "/rest/v1/rpc/increment_usage"
+    assert supabase_endpoint("/storage/v1/object/recordings/u1/r1.flac") == "/storage/v1/object"
+    assert supabase_endpoint("/storage/v1/object/sign/recordings/u1/r1.flac") == "/storage/v1/object/sign"
+    assert supabase_endpoint("/auth/v1/user") == "/auth/v1/user"
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from broadcast import BroadcastHub
+from pubsub import LocalBroker, RedisBroker
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def send_text(self, text: str):
+        self.received.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def final(i: int) -> dict:
+    return {"transcript": f"final {i}", "is_final": True, "confidence": 0.9, "start": i, "end": i + 1}
+
+
+def test_local_broker_keeps_history_until_session_ends():
+    async def scenario():
+        broker = LocalBroker(BroadcastHub())
+        await broker.set_live("rec")
+        socket = FakeSocket()
+        broker.hub.subscribe("rec", socket)
+        broker.publish("rec", {"transcript": "fin", "is_final": False})
+        await asyncio.sleep(0.01)
+        broker.publish("rec", final(0))
+        await asyncio.sleep(0.01)
+        assert [m["transcript"] for m in socket.received] == ["fin", "final 0"]
+        assert (await broker.watch("rec")).finals[0]["transcript"] == "final 0"
+        assert await broker.is_live("rec")
+
+        await broker.end("rec")
+        assert not await broker.is_live("rec")
+        assert broker.history("rec") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_mirror_is_seeded_and_skips_duplicates():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        workers = []
+        for _ in range(2):
+            broker = RedisBroker(BroadcastHub(), "redis://localhost")
+            broker.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+            broker.pubsub = broker.redis.pubsub()
+            await broker.start()
+            workers.append(broker)
+        speaker, viewer_worker = workers
+
+        await speaker.set_live("rec")
+        for i in range(3):
+            speaker.publish("rec", final(i))
+        speaker.publish("rec", {"transcript": "tail", "is_final": False, "confidence": 0.5})
+        await asyncio.sleep(0.05)
+        assert await viewer_worker.is_live("rec")
+        # Without viewers here, the stored finals are read straight from Redis
+        assert [f["transcript"] for f in await viewer_worker.live_finals("rec")] == ["final 0", "final 1", "final 2"]
+
+        mirror = await viewer_worker.watch("rec")
+        assert [f["transcript"] for f in mirror.finals] == ["final 0", "final 1", "final 2"]
+        assert mirror.interim["transcript"] == "tail"
+
+        # A replayed final (already in the seed) is ignored; new ones reach local viewers
+        socket = FakeSocket()
+        viewer_worker.hub.subscribe("rec", socket)
+        viewer_worker._on_event({"recording_id": "rec", "origin": speaker.worker_id, "seq": 3, "message": final(2)})
+        speaker.publish("rec", final(3))
+        await asyncio.sleep(0.1)
+        assert [m["transcript"] for m in socket.received] == ["final 3"]
+        assert len(mirror.finals) == 4
+
+        await viewer_worker.unwatch("rec")
+        await speaker.end("rec")
+        for broker in workers:
+            await broker.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_follow_stops_buffering_messages():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        broker = RedisBroker(BroadcastHub(), "redis://localhost")
+        broker.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        broker.pubsub = broker.redis.pubsub()
+        await broker.start()
+
+        def broken_pipeline(transaction=True):
+            raise ConnectionError("redis went away")
+
+        broker.redis.pipeline = broken_pipeline
+        assert await broker.watch("rec") is None
+        assert "rec" not in broker._pending
+
+        # Messages still arriving on the channel are not kept for a mirror that never comes
+        broker._on_event({"recording_id": "rec", "origin": "other-worker", "seq": 1, "message": final(0)})
+        assert "rec" not in broker._pending
+
+        await broker.unwatch("rec")
+        await broker.close()
+
+    asyncio.run(scenario())
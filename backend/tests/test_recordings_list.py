@@ -0,0 +1,148 @@
+import re
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+KEYSET = re.compile(r'\(created_at\.lt\."(.+)",and\(created_at\.eq\."(.+)",id\.lt\.(.+)\)\)')
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def json(self):
+        return self.rows
+
+
+class FakeSession:
+    """PostgREST stand-in for /rest/v1/recordings: select, keyset `or`, order desc, limit"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, url, params):
+        self.requests.append(params)
+        rows = sorted(self.rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        if "or" in params:
+            created_at, _, rec_id = KEYSET.fullmatch(params["or"]).groups()
+            rows = [r for r in rows if (r["created_at"], r["id"]) < (created_at, rec_id)]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        if params["select"] != "*":
+            columns = params["select"].split(",")
+            rows = [{c: r[c] for c in columns} for r in rows]
+        return FakeResponse(rows)
+
+
+def make_rows(count, same_created_at_every=1):
+    """`count` recordings; `same_created_at_every` consecutive rows share a created_at"""
+    return [
+        {
+            "id": str(uuid.UUID(int=i + 1)),
+            "user_id": USER_ID,
+            "title": f"Recording {i}",
+            "audio_url": None,
+            "duration_seconds": 60,
+            "created_at": f"2026-01-01T00:{(i // same_created_at_every) % 60:02d}:00+00:00",
+            "updated_at": "2026-01-01T01:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    session = FakeSession([])
+
+    async def get_user(token):
+        return {"id": USER_ID}
+
+    async def get_supabase_client(token):
+        return session
+
+    monkeypatch.setattr(main, "get_user", get_user)
+    monkeypatch.setattr(main, "get_supabase_client", get_supabase_client)
+    return TestClient(main.app), session
+
+
+def test_cursor_round_trip():
+    row = {"created_at": "2026-01-01T00:00:00+00:00", "id": str(uuid.UUID(int=7))}
+    cursor = main.encode_recordings_cursor(row)
+    assert "=" not in cursor
+    assert main.decode_recordings_cursor(cursor) == (row["created_at"], row["id"])
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    main.encode_recordings_cursor({"created_at": "2026-01-01T00:00:00+00:00", "id": "not-a-uuid"}),
+    main.encode_recordings_cursor({"created_at": "yesterday", "id": str(uuid.UUID(int=7))}),
+    main.encode_recordings_cursor({"created_at": None, "id": str(uuid.UUID(int=7))}),
+])
+def test_malformed_cursor_is_rejected(cursor, api):
+    with pytest.raises(HTTPException) as e:
+        main.decode_recordings_cursor(cursor)
+    assert e.value.status_code == 400
+
+    client, _ = api
+    assert client.get("/api/recordings", params={"token": "t", "cursor": cursor}).status_code == 400
+
+
+def test_fields_outside_the_allowlist_are_rejected(api):
+    client, session = api
+    response = client.get("/api/recordings", params={"token": "t", "fields": "title,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+    assert session.requests == []
+
+    # Allowed projections keep the cursor columns
+    assert main.parse_recording_fields("title") == "title,created_at,id"
+
+
+def test_no_limit_or_cursor_returns_everything_unpaginated(api):
+    client, session = api
+    session.rows = make_rows(main.RECORDINGS_MAX_PAGE_SIZE + 50)
+
+    response = client.get("/api/recordings", params={"token": "t"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(session.rows)
+    assert "x-next-cursor" not in response.headers
+    assert "limit" not in session.requests[0]
+
+
+def test_next_cursor_walks_rows_sharing_created_at(api):
+    client, session = api
+    # Pages of 4 cut through runs of 3 rows with the same created_at
+    session.rows = make_rows(20, same_created_at_every=3)
+
+    seen = []
+    params = {"token": "t", "limit": 4, "fields": "title"}
+    while True:
+        response = client.get("/api/recordings", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert 0 < len(page) <= 4
+        seen.extend(row["id"] for row in page)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    expected = sorted(session.rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    assert seen == [row["id"] for row in expected]
+    assert len(session.requests) == 5
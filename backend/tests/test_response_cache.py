@@ -0,0 +1,58 @@
+import asyncio
+import gzip
+import json
+
+from starlette.requests import Request
+
+import response_cache
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_rendered_once_and_served_compressed():
+    response_cache.response_cache.clear()
+    version = ("recording", "rec-1", "2025-01-01T00:00:00+00:00", "https://audio")
+    payload = {"id": "rec-1", "transcripts": [{"text": f"segment {i}"} for i in range(200)]}
+
+    assert response_cache.lookup(version) is None
+    body = asyncio.run(response_cache.store(version, payload))
+    assert response_cache.lookup(version) is body
+
+    plain = response_cache.respond(make_request(), body)
+    assert json.loads(plain.body) == payload
+    assert plain.headers["etag"] == f'"{body.etag}"'
+    assert "content-encoding" not in plain.headers
+
+    packed = response_cache.respond(make_request(accept_encoding="gzip, deflate, br;q=0"), body)
+    assert packed.headers["content-encoding"] == "gzip"
+    assert packed.headers["etag"] == f'"{body.etag}-gzip"'
+    assert json.loads(gzip.decompress(packed.body)) == payload
+    assert len(packed.body) < len(plain.body)
+
+
+def test_large_bodies_skip_brotli(monkeypatch):
+    monkeypatch.setattr(response_cache, "BROTLI_MAX_BYTES", 4096)
+    payload = {"transcripts": [{"text": f"segment {i}"} for i in range(500)]}
+
+    body = asyncio.run(response_cache.store(("recording", "rec-2", "v1", None), payload))
+    assert body.br is None
+    assert json.loads(gzip.decompress(body.gzip)) == payload
+    packed = response_cache.respond(make_request(accept_encoding="br, gzip"), body)
+    assert packed.headers["content-encoding"] == "gzip"
+
+
+def test_if_none_match_is_answered_from_the_version_key():
+    version = ("share", "rec-1", "2025-01-01T00:00:00+00:00", None)
+    etag = response_cache.version_etag(version)
+
+    assert response_cache.not_modified(make_request(), version) is None
+    assert response_cache.not_modified(make_request(if_none_match='"other"'), version) is None
+    for held in (f'"{etag}"', f'"{etag}-gzip"', f'W/"{etag}-br", "other"'):
+        response = response_cache.not_modified(make_request(if_none_match=held), version)
+        assert response.status_code == 304
+
+    newer = version[:2] + ("2025-01-02T00:00:00+00:00",) + version[3:]
+    assert response_cache.not_modified(make_request(if_none_match=f'"{etag}"'), newer) is None
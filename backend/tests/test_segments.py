@@ -0,0 +1,218 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+from fastapi import HTTPException
+
+import segments
+
+MANIFEST_PATH = "user-1/rec-1/manifest.json"
+MANIFEST = {
+    "sample_rate": 16000, "channels": 1, "total_samples": 8192,
+    "segments": [
+        {"path": f"user-1/rec-1/segments/{i:05d}.flac", "samples": 4096, "size": 500} for i in range(2)
+    ],
+}
+
+
+def playback_query(url):
+    query = dict(parse_qsl(urlsplit(url).query))
+    return query["path"], int(query["expires"]), query["sig"]
+
+
+@pytest.fixture
+def service_storage(monkeypatch):
+    """Manifest reads and segment signing with the service role; records the tokens used"""
+    tokens = []
+    manifest = {**MANIFEST}
+
+    async def load_manifest(path, token):
+        tokens.append(token)
+        return manifest
+
+    async def create_signed_urls(paths, token, expires_in=3600, use_cache=True):
+        tokens.append(token)
+        return {p: f"http://supabase.test/storage/v1/object/sign/recordings/{p}?token=jwt" for p in paths}
+
+    monkeypatch.setattr(segments, "AUDIO_URL_SECRET", "test-secret")
+    monkeypatch.setattr(segments.admin, "SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr(segments.admin, "SUPABASE_SERVICE_ROLE_KEY", "service-key")
+    monkeypatch.setattr(segments, "load_manifest", load_manifest)
+    monkeypatch.setattr(segments.storage, "create_signed_urls", create_signed_urls)
+    segments.playback_plans.clear()
+    yield manifest, tokens
+    segments.playback_plans.clear()
+
+
+def test_playback_url_carries_only_path_expiry_and_signature(service_storage):
+    url = segments.playback_url("http://api.test/", MANIFEST_PATH, expires_in=60)
+
+    assert url.startswith("http://api.test/api/audio/stream?")
+    assert len(url) < 250
+    path, expires, sig = playback_query(url)
+    assert path == MANIFEST_PATH
+    assert segments.verify_playback(path, expires, sig)
+
+    # Edited URLs are rejected
+    assert not segments.verify_playback("user-2/rec-9/manifest.json", expires, sig)
+    assert not segments.verify_playback(path, expires + 3600, sig)
+    assert not segments.verify_playback(path, expires, "0" * 64)
+
+
+def test_playback_url_expires(service_storage):
+    assert not segments.verify_playback(*playback_query(segments.playback_url("http://api.test/", MANIFEST_PATH, expires_in=-1)))
+
+
+def test_playback_requires_a_secret(service_storage, monkeypatch):
+    url = segments.playback_url("http://api.test/", MANIFEST_PATH, expires_in=60)
+    monkeypatch.setattr(segments, "AUDIO_URL_SECRET", "")
+    assert not segments.verify_playback(*playback_query(url))
+
+
+def test_playback_plan_is_signed_server_side_and_cached(service_storage):
+    _, tokens = service_storage
+
+    async def load_twice():
+        return await segments.load_playback_plan(MANIFEST_PATH), await segments.load_playback_plan(MANIFEST_PATH)
+
+    plan, again = asyncio.run(load_twice())
+
+    assert plan is again
+    assert tokens == ["service-key", "service-key"]
+    assert plan["segments"] == [
+        (f"/object/sign/recordings/user-1/rec-1/segments/{i:05d}.flac?token=jwt", 500) for i in range(2)
+    ]
+    assert segments.playback_size(plan) == len(segments.flac.stream_info(16000, 1, 8192)) + 1000
+
+
+def test_playback_plan_rejects_objects_outside_the_recording(service_storage):
+    manifest, _ = service_storage
+    manifest["segments"] = [{"path": "user-2/rec-9/segments/00000.flac", "samples": 4096, "size": 500}]
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(segments.load_playback_plan(MANIFEST_PATH))
+    assert e.value.status_code == 403
+
+
+def test_playback_range_maps_onto_header_and_segments(monkeypatch):
+    objects = {"/a": bytes(range(10)), "/b": bytes(range(10, 20))}
+    requested = []
+
+    async def iter_signed_download(signed_path, byte_range=None):
+        requested.append((signed_path, byte_range))
+        lo, hi = byte_range or (0, len(objects[signed_path]))
+        yield objects[signed_path][lo:hi]
+
+    monkeypatch.setattr(segments.storage, "iter_signed_download", iter_signed_download)
+    plan = {"header": b"HEAD", "segments": [("/a", 10), ("/b", 10)]}
+    whole = b"HEAD" + objects["/a"] + objects["/b"]
+
+    async def read(start, end):
+        return b"".join([block async for block in segments.iter_playback_audio(plan, start, end)])
+
+    assert asyncio.run(read(0, 24)) == whole
+    assert requested == [("/a", None), ("/b", None)]
+
+    requested.clear()
+    assert asyncio.run(read(2, 16)) == whole[2:16]
+    assert requested == [("/a", None), ("/b", (0, 2))]
+
+    requested.clear()
+    assert asyncio.run(read(15, 24)) == whole[15:24]
+    assert requested == [("/b", (1, 10))]
+
+
+def test_parse_range():
+    assert segments.parse_range(None, 100) is None
+    assert segments.parse_range("bytes=0-", 100) == (0, 100)
+    assert segments.parse_range("bytes=10-19", 100) == (10, 20)
+    assert segments.parse_range("bytes=90-200", 100) == (90, 100)
+    assert segments.parse_range("bytes=-10", 100) == (90, 100)
+    assert segments.parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(HTTPException) as e:
+        segments.parse_range("bytes=100-", 100)
+    assert e.value.status_code == 416
+    assert e.value.headers["Content-Range"] == "bytes */100"
+
+
+def test_segments_are_whole_flac_blocks():
+    from audio import AudioBuffer
+
+    uploader = segments.SegmentUploader(AudioBuffer(), "u", "r", "t", segment_seconds=60)
+    assert uploader.segment_bytes % (segments.flac.BLOCK_SIZE * 2) == 0
+    assert uploader.segment_bytes >= 60 * 16000 * 2
+    assert uploader.manifest_path == "u/r/manifest.json"
+
+
+class FakeEncoded:
+    def __init__(self, data):
+        self.data, self.size = data, len(data)
+
+    def iter_blocks(self):
+        yield self.data
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """In-memory Storage for SegmentUploader; segments 'encode' to their raw PCM"""
+    objects = {}
+
+    async def encode_flac(buffer, start, end, first_frame=0, header=False):
+        return FakeEncoded(b"".join(bytes(block) for block in buffer.iter_pcm())[start:end])
+
+    async def upload_object(path, content, token, content_type, content_length=None):
+        objects[path] = content if isinstance(content, bytes) else b"".join(content)
+        return path
+
+    async def upload_to_supabase_storage(user_id, recording_id, audio, token, content_type, content_length=None):
+        objects[f"{user_id}/{recording_id}.flac"] = b"".join([block async for block in audio])
+        return f"{user_id}/{recording_id}.flac"
+
+    async def iter_download(path, token):
+        yield objects[path]
+
+    async def delete_objects(paths, token):
+        for path in paths:
+            objects.pop(path, None)
+
+    monkeypatch.setattr(segments, "encode_flac", encode_flac)
+    monkeypatch.setattr(segments.storage, "upload_object", upload_object)
+    monkeypatch.setattr(segments.storage, "upload_to_supabase_storage", upload_to_supabase_storage)
+    monkeypatch.setattr(segments.storage, "iter_download", iter_download)
+    monkeypatch.setattr(segments.storage, "delete_objects", delete_objects)
+    return objects
+
+
+def test_audio_after_compaction_never_points_at_deleted_segments(bucket):
+    from audio import AudioBuffer
+
+    async def record():
+        buffer = AudioBuffer()
+        uploader = segments.SegmentUploader(buffer, "u", "r", "t", segment_seconds=1)
+        compacted = []
+
+        async def on_compacted(path):
+            compacted.append(path)
+
+        buffer.add_chunk(b"\x01" * (uploader.segment_bytes + 100))
+        await uploader.finalize()
+        uploader.compact_in_background(on_compacted)
+        await uploader._compact_task
+        assert compacted == ["u/r.flac"]
+        assert not any(path.startswith("u/r/") for path in bucket)
+
+        # Recording resumes after the segments were deleted
+        buffer.add_chunk(b"\x02" * uploader.segment_bytes)
+        uploader.maybe_flush()
+        audio_path = await uploader.finalize()
+        manifest = json.loads(bucket[audio_path])
+        return buffer, manifest
+
+    buffer, manifest = asyncio.run(record())
+    assert all(segment["path"] in bucket for segment in manifest["segments"])
+    audio = b"".join(bucket[segment["path"]] for segment in manifest["segments"])
+    assert audio == b"".join(bytes(block) for block in buffer.iter_pcm())
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import shares
+
+
+def make_share(recording_id="rec-1", expires_in=None):
+    expires_at = None
+    if expires_in is not None:
+        expires_at = (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat()
+    return {
+        "recording_id": recording_id,
+        "is_active": True,
+        "expires_at": expires_at,
+        "recordings": {"id": recording_id, "title": "Talk", "transcripts": [{"text": "hello"}]},
+    }
+
+
+def test_concurrent_misses_share_one_lookup_and_invalidate(monkeypatch):
+    shares.share_cache.clear()
+    calls = []
+
+    async def fetch(share_token):
+        calls.append(share_token)
+        await asyncio.sleep(0.01)
+        return make_share() if share_token == "good" else None
+
+    monkeypatch.setattr(shares, "_fetch", fetch)
+
+    async def scenario():
+        results = await asyncio.gather(*(shares.resolve_share("good") for _ in range(20)))
+        assert all(r["recordings"]["title"] == "Talk" for r in results)
+        assert await shares.resolve_share("good") is results[0]
+        assert calls == ["good"]
+
+        # Unknown tokens are remembered briefly as well
+        assert await shares.resolve_share("bad") is None
+        assert await shares.resolve_share("bad") is None
+        assert calls == ["good", "bad"]
+
+        shares.invalidate_recording("rec-1")
+        await shares.resolve_share("good")
+        assert calls == ["good", "bad", "good"]
+
+    asyncio.run(scenario())
+
+
+def test_entry_never_outlives_share_expiry(monkeypatch):
+    shares.share_cache.clear()
+
+    async def fetch(share_token):
+        return make_share(expires_in=0.05)
+
+    monkeypatch.setattr(shares, "_fetch", fetch)
+
+    async def scenario():
+        share = await shares.resolve_share("soon")
+        assert not shares.is_expired(share)
+        await asyncio.sleep(0.06)
+        assert shares.share_cache.get("soon") is None
+        assert shares.is_expired(share)
+
+    asyncio.run(scenario())
+
+
+def test_viewer_check_selects_only_share_columns(monkeypatch):
+    shares.share_cache.clear()
+    shares.access_cache.clear()
+    selects = []
+
+    async def fetch(share_token, select=shares.SHARE_SELECT):
+        selects.append(select)
+        share = make_share()
+        if select == shares.SHARE_ACCESS_SELECT:
+            del share["recordings"]
+        return share
+
+    monkeypatch.setattr(shares, "_fetch", fetch)
+
+    async def scenario():
+        access = await shares.resolve_share_access("live")
+        assert access["recording_id"] == "rec-1" and "recordings" not in access
+        assert await shares.resolve_share_access("live") is access
+        assert selects == [shares.SHARE_ACCESS_SELECT]
+
+        # Once the share page has cached the full entry, viewers reuse it
+        full = await shares.resolve_share("page")
+        assert await shares.resolve_share_access("page") is full
+        assert selects == [shares.SHARE_ACCESS_SELECT, shares.SHARE_SELECT]
+
+        shares.invalidate_recording("rec-1")
+        assert shares.access_cache.get("live") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from io import BytesIO
+
+import httpx
+import pytest
+from fastapi import UploadFile
+
+import storage
+
+SUPABASE_URL = "http://supabase.test"
+
+
+@pytest.fixture
+def storage_api(monkeypatch):
+    """Routes Storage requests to `handler`; returns the list of requests seen"""
+    requests = []
+    routes = {}
+
+    def handler(request):
+        requests.append(request)
+        return routes["handler"](request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(storage, "SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setattr(storage, "SUPABASE_KEY", "anon-key")
+    monkeypatch.setattr(storage, "get_http_client", lambda: client)
+    storage.signed_url_cache.clear()
+    yield routes, requests
+    storage.signed_url_cache.clear()
+
+
+def sign_one(request):
+    """The per-object endpoint: /object/sign/recordings/{path}"""
+    path = request.url.path.split("/object/sign/recordings/", 1)[1]
+    return httpx.Response(200, json={"signedURL": f"/object/sign/recordings/{path}?token=one"})
+
+
+def test_bulk_response_is_parsed_and_per_item_errors_skipped(storage_api):
+    routes, requests = storage_api
+
+    def sign_bulk(request):
+        paths = json.loads(request.content)["paths"]
+        return httpx.Response(200, json=[
+            {"path": p, "error": "Object not found", "signedURL": None} if p == "u/missing.flac"
+            else {"path": p, "error": None, "signedURL": f"/object/sign/recordings/{p}?token=bulk"}
+            for p in paths
+        ])
+
+    routes["handler"] = sign_bulk
+    signed = asyncio.run(storage.create_signed_urls(["u/a.flac", "u/missing.flac", "u/a.flac"], "jwt"))
+
+    assert signed == {"u/a.flac": f"{SUPABASE_URL}/storage/v1/object/sign/recordings/u/a.flac?token=bulk"}
+    [request] = requests
+    assert request.url.path == "/storage/v1/object/sign/recordings"
+    assert request.headers["authorization"] == "Bearer jwt"
+    assert json.loads(request.content) == {"expiresIn": storage.SIGNED_URL_EXPIRES_IN, "paths": ["u/a.flac", "u/missing.flac"]}
+
+
+def test_cached_urls_are_reused(storage_api):
+    routes, requests = storage_api
+    routes["handler"] = lambda request: httpx.Response(200, json=[
+        {"path": p, "signedURL": f"/object/sign/recordings/{p}?token=bulk"} for p in json.loads(request.content)["paths"]
+    ])
+
+    first = asyncio.run(storage.create_signed_urls(["u/a.flac"], "jwt"))
+    second = asyncio.run(storage.create_signed_urls(["u/a.flac", "u/b.flac"], "jwt"))
+
+    assert second["u/a.flac"] == first["u/a.flac"]
+    assert json.loads(requests[1].content)["paths"] == ["u/b.flac"]
+
+    # Everything cached: no request at all
+    asyncio.run(storage.create_signed_urls(["u/a.flac", "u/b.flac"], "jwt"))
+    assert len(requests) == 2
+
+    # use_cache=False always signs afresh
+    asyncio.run(storage.create_signed_urls(["u/a.flac"], "jwt", use_cache=False))
+    assert len(requests) == 3
+
+
+def test_non_200_bulk_response_falls_back_to_individual_signing(storage_api):
+    routes, requests = storage_api
+
+    def handler(request):
+        if request.url.path == "/storage/v1/object/sign/recordings":
+            return httpx.Response(404, text="not here")
+        return sign_one(request)
+
+    routes["handler"] = handler
+    signed = asyncio.run(storage.create_signed_urls(["u/a.flac", "u/b.flac"], "jwt"))
+
+    assert signed == {p: f"{SUPABASE_URL}/storage/v1/object/sign/recordings/{p}?token=one" for p in ["u/a.flac", "u/b.flac"]}
+    assert sorted(r.url.path for r in requests[1:]) == [
+        "/storage/v1/object/sign/recordings/u/a.flac", "/storage/v1/object/sign/recordings/u/b.flac"
+    ]
+
+
+def test_failed_bulk_request_falls_back_to_individual_signing(storage_api):
+    routes, requests = storage_api
+
+    def handler(request):
+        if request.url.path == "/storage/v1/object/sign/recordings":
+            raise httpx.ConnectError("connection reset")
+        if request.url.path.endswith("/u/b.flac"):
+            return httpx.Response(400, text="Object not found")
+        return sign_one(request)
+
+    routes["handler"] = handler
+    signed = asyncio.run(storage.create_signed_urls(["u/a.flac", "u/b.flac"], "jwt"))
+
+    assert signed == {"u/a.flac": f"{SUPABASE_URL}/storage/v1/object/sign/recordings/u/a.flac?token=one"}
+    assert len(requests) == 3
+
+
+class RecordingClient:
+    """Captures upload_object's POST and drains the body the way httpx would"""
+
+    def __init__(self):
+        self.headers = None
+        self.body_type = None
+        self.blocks = []
+
+    async def post(self, url, headers=None, content=None):
+        self.headers = headers
+        self.body_type = type(content)
+        async for block in content:
+            self.blocks.append(block)
+        return httpx.Response(200, json={"Key": url})
+
+
+def test_upload_streams_an_upload_file_block_by_block(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(storage, "get_http_client", lambda: client)
+    monkeypatch.setattr(storage, "SUPABASE_KEY", "anon-key")
+    data = bytes(range(256)) * 40
+    upload = UploadFile(BytesIO(data), filename="talk.flac")
+    uploaded_before = storage.UPLOAD_BYTES.labels().value
+
+    path = asyncio.run(storage.upload_object(
+        "u/r.flac", storage.iter_upload_file(upload, block_size=1024), "jwt", "audio/flac", content_length=len(data)
+    ))
+
+    assert path == "u/r.flac"
+    assert client.headers["Content-Length"] == str(len(data))
+    # Sent as the async iterator itself, one block at a time, never joined into one bytes object
+    assert not issubclass(client.body_type, (bytes, bytearray, memoryview))
+    assert [len(block) for block in client.blocks] == [1024] * 10
+    assert b"".join(client.blocks) == data
+    assert storage.UPLOAD_BYTES.labels().value - uploaded_before == len(data)
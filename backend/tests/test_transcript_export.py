@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from transcript_index import TranscriptIndex
+from transcripts import fetch_all_transcripts, fetch_transcript_page, format_segments, stream_transcript_export
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def json(self):
+        return self.rows
+
+
+class FakeSession:
+    """Applies the keyset filter the way PostgREST would"""
+
+    def __init__(self, rows, max_rows=None):
+        self.rows = sorted(rows, key=lambda r: (r["start_time"], r["id"]))
+        # PostgREST's max-rows: silently caps every response
+        self.max_rows = max_rows
+        self.requests = []
+
+    async def get(self, url, params):
+        self.requests.append(params)
+        rows = self.rows
+        if "or" in params:
+            start = float(params["or"].split("start_time.gt.")[1].split(",")[0])
+            last_id = params["or"].split("id.gt.")[1].rstrip("))")
+            rows = [r for r in rows if (r["start_time"], r["id"]) > (start, last_id)]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        return FakeResponse(rows)
+
+
+def make_rows(count):
+    # Pairs of segments share a start_time so the id tie-break matters
+    return [
+        {"id": f"id-{i:04d}", "text": f"line {i}", "start_time": float(i // 2), "end_time": i // 2 + 0.5, "confidence": 0.9}
+        for i in range(count)
+    ]
+
+
+def test_srt_and_vtt_cues():
+    rows = [{"id": "a", "text": "Hello there", "start_time": 3661.5, "end_time": 3662.25}]
+    assert format_segments(rows, "srt", 7) == "7\n01:01:01,500 --> 01:01:02,250\nHello there\n\n"
+    assert format_segments(rows, "vtt") == "01:01:01.500 --> 01:01:02.250\nHello there\n\n"
+    assert json.loads(format_segments(rows, "ndjson")) == rows[0]
+
+
+def test_stream_pages_through_every_segment_once():
+    rows = make_rows(25)
+    session = FakeSession(rows)
+
+    async def export():
+        first = await fetch_transcript_page(session, "rec", page_size=4)
+        return [chunk async for chunk in stream_transcript_export(session, "rec", "ndjson", first, page_size=4)]
+
+    chunks = asyncio.run(export())
+    exported = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [r["id"] for r in exported] == [r["id"] for r in rows]
+    assert len(session.requests) == 7  # ceil(25 / 4) pages
+
+
+def test_full_read_pages_past_the_max_rows_cap():
+    rows = make_rows(2345)
+    session = FakeSession(rows, max_rows=1000)
+
+    fetched = asyncio.run(fetch_all_transcripts(session, "rec"))
+    assert fetched == session.rows
+    assert len(session.requests) == 5  # 500-row pages, the last one short
+
+    index = TranscriptIndex(fetched)
+    last = session.rows[-1]
+    assert index.window(last["start_time"], last["end_time"]) == [r for r in session.rows if r["start_time"] == last["start_time"]]
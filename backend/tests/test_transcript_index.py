@@ -0,0 +1,70 @@
+import asyncio
+import random
+
+import transcript_index
+from transcript_index import TranscriptIndex
+
+
+def make_rows(count, seed=7):
+    rng = random.Random(seed)
+    rows, t = [], 0.0
+    for i in range(count):
+        t += rng.uniform(0.0, 3.0)
+        # Mostly back-to-back segments, with the odd long one overlapping its neighbours
+        length = rng.uniform(0.5, 2.5) if rng.random() > 0.05 else rng.uniform(10, 30)
+        rows.append({"id": f"id-{i:05d}", "text": f"line {i}", "start_time": t, "end_time": t + length})
+    rng.shuffle(rows)
+    return rows
+
+
+def test_window_matches_a_linear_scan():
+    rows = make_rows(2000)
+    index = TranscriptIndex(rows)
+    rng = random.Random(1)
+    for _ in range(300):
+        start = rng.uniform(-5, 4000)
+        end = start + rng.uniform(0.1, 120)
+        expected = sorted(
+            (r for r in rows if r["start_time"] < end and r["end_time"] > start),
+            key=lambda r: r["start_time"]
+        )
+        assert index.window(start, end) == expected
+
+    assert index.window() == sorted(rows, key=lambda r: r["start_time"])
+    assert index.window(end=10.0) == [r for r in index.rows if r["start_time"] < 10.0]
+
+
+def test_concurrent_misses_load_once():
+    transcript_index.transcript_indexes.clear()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return make_rows(50)
+
+    async def seek_many():
+        key = ("rec-1", "2025-01-01T00:00:00+00:00")
+        indexes = await asyncio.gather(*(transcript_index.get_or_build(key, load) for _ in range(20)))
+        again = await transcript_index.get_or_build(key, load)
+        return indexes, again
+
+    indexes, again = asyncio.run(seek_many())
+    assert len(loads) == 1
+    assert all(index is again for index in indexes)
+    assert len(again) == 50
+
+
+def test_live_index_follows_the_session_finals():
+    transcript_index.live_indexes.clear()
+    finals = [{"transcript": f"final {i}", "confidence": 0.9, "start": i * 2.0, "end": i * 2.0 + 1.5} for i in range(5)]
+
+    index = transcript_index.live_index("rec", finals)
+    assert [r["text"] for r in index.window(3.0, 6.5)] == ["final 1", "final 2", "final 3"]
+    assert index.window(4.0, 4.5) == [{"id": None, "text": "final 2", "start_time": 4.0, "end_time": 5.5, "confidence": 0.9}]
+    assert transcript_index.live_index("rec", finals) is index
+
+    finals.append({"transcript": "final 5", "confidence": 0.9, "start": 10.0, "end": 11.0})
+    rebuilt = transcript_index.live_index("rec", finals)
+    assert rebuilt is not index
+    assert [r["text"] for r in rebuilt.window(9.5)] == ["final 5"]
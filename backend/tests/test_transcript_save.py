@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from models import TranscriptSegment
+from transcripts import TRANSCRIPT_BATCH_SIZE, insert_transcripts, replace_transcripts
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Records POSTs and answers each with the next queued response"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    async def post(self, url, json=None, headers=None):
+        self.posts.append((url, json))
+        return self.responses.pop(0) if self.responses else FakeResponse(201)
+
+
+def make_segments(count):
+    return [TranscriptSegment(text=f"segment {i}", start_time=i, end_time=i + 1) for i in range(count)]
+
+
+def test_insert_is_split_into_batches():
+    session = FakeSession()
+    count = TRANSCRIPT_BATCH_SIZE + 1
+
+    assert asyncio.run(insert_transcripts(session, "rec-1", make_segments(count))) == count
+
+    assert [len(rows) for _, rows in session.posts] == [TRANSCRIPT_BATCH_SIZE, 1]
+    assert all(url == "/rest/v1/transcripts" for url, _ in session.posts)
+    assert session.posts[1][1][0] == {
+        "recording_id": "rec-1", "text": f"segment {count - 1}",
+        "start_time": count - 1, "end_time": count, "confidence": None, "is_final": True,
+    }
+
+
+def test_insert_stops_at_a_failed_batch():
+    session = FakeSession(FakeResponse(400, text="bad row"))
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(insert_transcripts(session, "rec-1", make_segments(TRANSCRIPT_BATCH_SIZE + 1)))
+
+    assert e.value.status_code == 500
+    assert "bad row" in e.value.detail
+    assert len(session.posts) == 1
+
+
+def test_replace_sends_one_rpc_call():
+    count = TRANSCRIPT_BATCH_SIZE + 1
+    session = FakeSession(FakeResponse(200, count))
+
+    assert asyncio.run(replace_transcripts(session, "rec-1", make_segments(count))) == count
+
+    [(url, body)] = session.posts
+    assert url == "/rest/v1/rpc/replace_transcripts"
+    assert body["p_recording_id"] == "rec-1"
+    assert len(body["p_segments"]) == count
+
+
+@pytest.mark.parametrize("response, detail", [
+    (FakeResponse(404, text="Could not find the function"), "migration 007"),
+    (FakeResponse(403, text="Access denied"), "Access denied"),
+])
+def test_replace_rpc_errors_are_500(response, detail):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(replace_transcripts(FakeSession(response), "rec-1", make_segments(3)))
+    assert e.value.status_code == 500
+    assert detail in e.value.detail
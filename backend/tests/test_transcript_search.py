@@ -0,0 +1,74 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from transcripts import decode_search_cursor, encode_search_cursor, search_transcripts
+
+
+class FakeResponse:
+    def __init__(self, status_code, rows):
+        self.status_code = status_code
+        self.rows = rows
+        self.text = ""
+
+    def json(self):
+        return self.rows
+
+
+class FakeSession:
+    """Orders and pages hits the way the search_transcripts RPC does"""
+
+    def __init__(self, hits, status_code=200):
+        self.hits = sorted(hits, key=lambda h: (h["rank"], h["id"]), reverse=True)
+        self.status_code = status_code
+        self.bodies = []
+
+    async def post(self, url, json):
+        self.bodies.append(json)
+        hits = self.hits
+        if "p_after_rank" in json:
+            after = (json["p_after_rank"], json["p_after_id"])
+            hits = [h for h in hits if (h["rank"], h["id"]) < after]
+        return FakeResponse(self.status_code, hits[:json["p_limit"]])
+
+
+def make_hits(count):
+    # Few distinct ranks, so most of the ordering comes from the id tie-break
+    return [
+        {"id": str(uuid.UUID(int=i + 1)), "recording_id": "rec", "rank": round(0.1 * (i % 3), 1),
+         "start_time": float(i), "end_time": i + 1.0, "snippet": f"<mark>hello</mark> {i}"}
+        for i in range(count)
+    ]
+
+
+def test_pages_cover_every_hit_once_in_rank_order():
+    session = FakeSession(make_hits(23))
+
+    async def collect():
+        seen, cursor = [], None
+        while True:
+            hits, cursor = await search_transcripts(session, "hello", limit=5, cursor=cursor)
+            seen.extend(hits)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(collect())
+    assert [h["id"] for h in seen] == [h["id"] for h in session.hits]
+    assert len(session.bodies) == 5
+    assert all(body["p_limit"] == 6 for body in session.bodies)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    hit = make_hits(2)[1]
+    assert decode_search_cursor(encode_search_cursor(hit)) == (hit["rank"], hit["id"])
+    with pytest.raises(HTTPException) as exc:
+        decode_search_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_missing_rpc_is_reported():
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(search_transcripts(FakeSession([], status_code=404), "hello"))
+    assert exc.value.status_code == 501
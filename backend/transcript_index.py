@@ -0,0 +1,111 @@
+"""
+In-process time index over finished transcripts for playback seeks.
+
+GET /api/recordings/{id}/transcripts?from=&to= only needs the segments that
+overlap the window around the playhead. For finished recordings the full
+transcript is loaded once per version (recording id, updated_at) and kept as
+sorted arrays, so every seek after that is two bisects over floats:
+
+- starts: segment start times, ascending
+- reach: running maximum of end times, so everything left of
+  bisect_right(reach, from) is known to end before the window
+
+Live recordings are still growing and haven't been saved yet, so the
+database lags behind them. Their windows come from the session's in-memory
+finals instead, indexed once per new final (see live_index).
+"""
+import os
+from bisect import bisect_left, bisect_right
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from cache import TTLCache
+
+transcript_indexes = TTLCache(
+    maxsize=int(os.getenv("TRANSCRIPT_INDEX_MAX_ENTRIES", "64")),
+    ttl=float(os.getenv("TRANSCRIPT_INDEX_TTL_SECONDS", "3600")),
+)
+# Live sessions: recording id -> (version, index), rebuilt when a final arrives
+live_indexes = TTLCache(maxsize=int(os.getenv("TRANSCRIPT_INDEX_MAX_ENTRIES", "64")), ttl=60)
+builds = 0
+
+
+def _end(row: Dict) -> float:
+    end = row.get("end_time")
+    return end if end is not None else row.get("start_time") or 0.0
+
+
+class TranscriptIndex:
+    """Transcript rows sorted by start_time with bisectable bounds"""
+
+    __slots__ = ("rows", "starts", "reach")
+
+    def __init__(self, rows: List[Dict]):
+        self.rows = sorted(rows, key=lambda r: (r.get("start_time") or 0.0, r.get("id") or ""))
+        self.starts = [r.get("start_time") or 0.0 for r in self.rows]
+        self.reach = []
+        furthest = float("-inf")
+        for row in self.rows:
+            furthest = max(furthest, _end(row))
+            self.reach.append(furthest)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Segments overlapping [start, end); either bound may be open"""
+        lo = 0 if start is None else bisect_right(self.reach, start)
+        hi = len(self.rows) if end is None else bisect_left(self.starts, end)
+        if start is None:
+            return self.rows[lo:hi]
+        # reach only rules out a prefix; a long segment can still hide shorter ones behind it
+        return [r for r in self.rows[lo:hi] if _end(r) > start]
+
+
+def from_live_finals(finals: List[Dict]) -> TranscriptIndex:
+    """Index a live session's finals, as rows shaped like the saved transcripts"""
+    return TranscriptIndex([
+        {
+            "id": None,
+            "text": final["transcript"],
+            "start_time": final.get("start", 0),
+            "end_time": final.get("end", 0),
+            "confidence": final.get("confidence"),
+        }
+        for final in finals
+    ])
+
+
+def live_index(recording_id: str, finals: List[Dict]) -> TranscriptIndex:
+    """Index over a live session's finals, reused until the next final arrives"""
+    # Finals only grow during a session; the last end time tells a restarted one apart
+    version = (len(finals), finals[-1].get("end") if finals else None)
+    cached = live_indexes.get(recording_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    index = from_live_finals(finals)
+    live_indexes.set(recording_id, (version, index))
+    return index
+
+
+def lookup(key: Tuple[Hashable, ...]) -> Optional[TranscriptIndex]:
+    return transcript_indexes.get(key)
+
+
+def build(key: Tuple[Hashable, ...], rows: List[Dict]) -> TranscriptIndex:
+    global builds
+    builds += 1
+    index = TranscriptIndex(rows)
+    transcript_indexes.set(key, index)
+    return index
+
+
+async def get_or_build(key: Tuple[Hashable, ...], load: Callable[[], Awaitable[List[Dict]]]) -> TranscriptIndex:
+    """Cached index for this version, loading the transcript once on a miss"""
+    async def load_and_build() -> TranscriptIndex:
+        return build(key, await load())
+
+    return await transcript_indexes.get_or_load(key, load_and_build)
+
+
+def cache_stats() -> dict:
+    return {**transcript_indexes.stats(), "builds": builds}
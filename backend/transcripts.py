@@ -0,0 +1,235 @@
+"""
+Transcript persistence helpers (bulk insert / atomic replace via PostgREST),
+full reads, incremental export (keyset-paged NDJSON / SRT / WebVTT)
+and ranked full-text search (search_transcripts RPC)
+"""
+import base64
+import json
+import logging
+import os
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+
+from models import TranscriptSegment
+from supabase_http import SupabaseSession
+
+logger = logging.getLogger(__name__)
+
+# Rows per POST when appending segments (replace_transcripts is deliberately one call)
+TRANSCRIPT_BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "500"))
+# Rows per keyset page when streaming an export
+TRANSCRIPT_STREAM_PAGE_SIZE = int(os.getenv("TRANSCRIPT_STREAM_PAGE_SIZE", "500"))
+
+TRANSCRIPT_FIELDS = "id,text,start_time,end_time,confidence"
+# Every stored column except the generated search_vector (migration 011)
+TRANSCRIPT_COLUMNS = "id,recording_id,text,start_time,end_time,confidence,is_final,created_at"
+
+# Search results per page
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
+_segments_adapter = TypeAdapter(List[TranscriptSegment])
+
+
+def parse_segments(raw: str) -> List[TranscriptSegment]:
+    """Validate a JSON array of transcript segments (raises 422 on bad input)"""
+    try:
+        return _segments_adapter.validate_json(raw)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid transcripts: {e.errors(include_url=False)}")
+
+
+def segment_rows(recording_id: str, segments: List[TranscriptSegment]) -> List[Dict]:
+    return [{"recording_id": recording_id, **seg.model_dump()} for seg in segments]
+
+
+async def insert_transcripts(
+    supabase_client: SupabaseSession,
+    recording_id: str,
+    segments: List[TranscriptSegment],
+    batch_size: int = TRANSCRIPT_BATCH_SIZE
+) -> int:
+    """Append segments with chunked bulk inserts; returns the number of rows sent"""
+    rows = segment_rows(recording_id, segments)
+    for start in range(0, len(rows), batch_size):
+        response = await supabase_client.post(
+            "/rest/v1/transcripts",
+            json=rows[start:start + batch_size],
+            headers={"Prefer": "return=minimal"}
+        )
+        if response.status_code not in [200, 201, 204]:
+            raise HTTPException(status_code=500, detail=f"Transcript insert failed: {response.text}")
+    return len(rows)
+
+
+async def replace_transcripts(
+    supabase_client: SupabaseSession,
+    recording_id: str,
+    segments: List[TranscriptSegment]
+) -> int:
+    """Replace all segments of a recording in one transaction (replace_transcripts RPC).
+
+    Requires migration 007. There is no delete + insert fallback: RLS has no
+    DELETE policy on transcripts, so the delete would match nothing and the
+    insert would duplicate every segment.
+
+    All segments go in one request on purpose, ignoring TRANSCRIPT_BATCH_SIZE:
+    the RPC is the transaction, so splitting it would let readers see a
+    half-replaced transcript and let a failed batch leave the old segments
+    deleted. The body is bounded by the transcript itself (roughly 100 bytes
+    per segment, a few hundred KB for a multi-hour session).
+    """
+    response = await supabase_client.post(
+        "/rest/v1/rpc/replace_transcripts",
+        json={
+            "p_recording_id": recording_id,
+            "p_segments": [seg.model_dump() for seg in segments]
+        }
+    )
+    if response.status_code == 200:
+        return response.json()
+    if response.status_code == 404:
+        logger.error("❌ replace_transcripts RPC missing; run migration 007_replace_transcripts.sql")
+        raise HTTPException(status_code=500, detail="Transcript save failed: replace_transcripts RPC missing (migration 007)")
+    raise HTTPException(status_code=500, detail=f"Transcript save failed: {response.text}")
+
+
+async def fetch_transcript_page(
+    supabase_client: SupabaseSession,
+    recording_id: str,
+    after: Optional[Dict] = None,
+    page_size: int = TRANSCRIPT_STREAM_PAGE_SIZE
+) -> List[Dict]:
+    """One page of segments ordered by (start_time, id), starting after the `after` row.
+
+    The range filter on start_time walks idx_transcripts_time; id only breaks ties.
+    """
+    params = {
+        "recording_id": f"eq.{recording_id}",
+        "select": TRANSCRIPT_FIELDS,
+        "order": "start_time.asc,id.asc",
+        "limit": str(page_size)
+    }
+    if after is not None:
+        start = after["start_time"]
+        params["or"] = f"(start_time.gt.{start},and(start_time.eq.{start},id.gt.{after['id']}))"
+    return await _select_transcripts(supabase_client, params)
+
+
+async def _select_transcripts(supabase_client: SupabaseSession, params: Dict) -> List[Dict]:
+    response = await supabase_client.get("/rest/v1/transcripts", params=params)
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=f"Transcript fetch failed: {response.text}")
+    return response.json()
+
+
+async def fetch_all_transcripts(
+    supabase_client: SupabaseSession,
+    recording_id: str,
+    page_size: int = TRANSCRIPT_STREAM_PAGE_SIZE
+) -> List[Dict]:
+    """Every segment, in keyset pages.
+
+    A single unpaged select would be cut off silently at PostgREST's max-rows
+    (1000 on Supabase by default), so long recordings are read page by page
+    until a short page comes back. page_size must stay below that cap.
+    """
+    rows = await fetch_transcript_page(supabase_client, recording_id, page_size=page_size)
+    page = rows
+    while len(page) == page_size:
+        page = await fetch_transcript_page(supabase_client, recording_id, page[-1], page_size)
+        rows.extend(page)
+    return rows
+
+
+def _timestamp(seconds: Optional[float], separator: str) -> str:
+    millis = int(round(max(seconds or 0.0, 0.0) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def format_segments(rows: List[Dict], fmt: str, first_index: int = 1) -> str:
+    """Render rows as NDJSON lines or SRT/WebVTT cues (SRT cues are numbered from first_index)"""
+    if fmt == "ndjson":
+        return "".join(json.dumps(row) + "\n" for row in rows)
+    separator = "," if fmt == "srt" else "."
+    cues = []
+    for index, row in enumerate(rows, first_index):
+        # A blank line ends a cue, so keep each segment's text on consecutive lines
+        text = "\n".join(line for line in (row.get("text") or "").splitlines() if line.strip())
+        timing = f"{_timestamp(row.get('start_time'), separator)} --> {_timestamp(row.get('end_time'), separator)}"
+        cues.append(f"{index}\n{timing}\n{text}\n\n" if fmt == "srt" else f"{timing}\n{text}\n\n")
+    return "".join(cues)
+
+
+async def stream_transcript_export(
+    supabase_client: SupabaseSession,
+    recording_id: str,
+    fmt: str,
+    first_page: List[Dict],
+    page_size: int = TRANSCRIPT_STREAM_PAGE_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield an export page by page; only one page is ever held in memory"""
+    if fmt == "vtt":
+        yield b"WEBVTT\n\n"
+    page, index = first_page, 1
+    while page:
+        yield format_segments(page, fmt, index).encode("utf-8")
+        index += len(page)
+        if len(page) < page_size:
+            break
+        page = await fetch_transcript_page(supabase_client, recording_id, page[-1], page_size)
+
+
+def encode_search_cursor(hit: Dict) -> str:
+    """Opaque keyset cursor for the (rank, id) position of a search hit"""
+    raw = json.dumps([hit["rank"], hit["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, hit_id = json.loads(raw)
+        uuid.UUID(str(hit_id))
+        return float(rank), hit_id
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def search_transcripts(
+    supabase_client: SupabaseSession,
+    query: str,
+    limit: int = SEARCH_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """One ranked page of the caller's matching segments, plus the next page's cursor.
+
+    Matching, ranking and snippets all happen in Postgres (GIN index on
+    transcripts.search_vector); only the page itself crosses the wire.
+    """
+    body = {"p_query": query, "p_limit": limit + 1}
+    if cursor:
+        body["p_after_rank"], body["p_after_id"] = decode_search_cursor(cursor)
+    response = await supabase_client.post("/rest/v1/rpc/search_transcripts", json=body)
+    if response.status_code == 404:
+        raise HTTPException(status_code=501, detail="Transcript search is not available (run migration 011)")
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=f"Transcript search failed: {response.text}")
+    # One extra row tells us whether another page exists
+    hits = response.json()
+    if len(hits) > limit:
+        hits = hits[:limit]
+        return hits, encode_search_cursor(hits[-1])
+    return hits, None
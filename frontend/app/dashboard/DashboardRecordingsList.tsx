@@ -5,6 +5,8 @@ import Link from "next/link";
 import { Play, Calendar, Clock, ChevronRight } from "lucide-react";
 import { API_BASE_URL } from "@/utils/config";
 
+const LIST_FIELDS = "id,title,created_at,duration_seconds";
+
 interface Recording {
     id: string;
     title: string;
@@ -29,7 +31,7 @@ export default function DashboardRecordingsList({ token }: { token?: string }) {
                     return;
                 }
 
-                const response = await fetch(`${API_BASE_URL}/api/recordings?token=${session.access_token}`);
+                const response = await fetch(`${API_BASE_URL}/api/recordings?token=${session.access_token}&limit=5&fields=${LIST_FIELDS}`);
                 if (!response.ok) {
                     throw new Error("Failed to fetch recordings");
                 }
@@ -5,6 +5,9 @@ import Link from "next/link";
 import { Play, Calendar, Clock, FileAudio, Trash2, Mic } from "lucide-react";
 import { API_BASE_URL } from "@/utils/config";
 
+const PAGE_SIZE = 50;
+const LIST_FIELDS = "id,title,created_at,duration_seconds";
+
 interface Recording {
     id: string;
     title: string;
@@ -18,27 +21,36 @@ export default function RecordingsPage() {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [deletingId, setDeletingId] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const fetchPage = async (cursor: string | null) => {
+        const { createClient } = await import('@/utils/supabase/client');
+        const supabase = createClient();
+        const { data: { session } } = await supabase.auth.getSession();
+        if (!session) return null;
+
+        let url = `${API_BASE_URL}/api/recordings?token=${session.access_token}&limit=${PAGE_SIZE}&fields=${LIST_FIELDS}`;
+        if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error("Failed to fetch recordings");
+        }
+        const data: Recording[] = await response.json();
+        return { data, cursor: response.headers.get("X-Next-Cursor") };
+    };
 
     useEffect(() => {
         const fetchRecordings = async () => {
             try {
-                const { createClient } = await import('@/utils/supabase/client');
-                const supabase = createClient();
-                const { data: { session } } = await supabase.auth.getSession();
-
-                if (!session) {
+                const page = await fetchPage(null);
+                if (!page) {
                     setError("Please log in to view recordings");
-                    setLoading(false);
                     return;
                 }
-
-                const response = await fetch(`${API_BASE_URL}/api/recordings?token=${session.access_token}`);
-                if (!response.ok) {
-                    throw new Error("Failed to fetch recordings");
-                }
-
-                const data = await response.json();
-                setRecordings(data);
+                setRecordings(page.data);
+                setNextCursor(page.cursor);
             } catch (err) {
                 console.error("Error fetching recordings:", err);
                 setError("Failed to load recordings");
@@ -50,6 +62,22 @@ export default function RecordingsPage() {
         fetchRecordings();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(nextCursor);
+            if (page) {
+                setRecordings((prev) => [...prev, ...page.data]);
+                setNextCursor(page.cursor);
+            }
+        } catch (err) {
+            console.error("Error fetching more recordings:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const formatDuration = (seconds: number) => {
         const mins = Math.floor(seconds / 60);
         const secs = seconds % 60;
@@ -204,6 +232,15 @@ export default function RecordingsPage() {
                                 <Link href={`/recordings/${recording.id}`} className="absolute inset-0 sm:hidden" aria-label="View Recording" />
                             </div>
                         ))}
+                        {nextCursor && (
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="mx-auto mt-2 rounded-full border border-white/10 bg-white/5 px-6 py-2.5 text-sm font-medium text-[#BFC2CF] hover:bg-white/10 hover:text-white transition-colors disabled:opacity-50"
+                            >
+                                {loadingMore ? "Loading..." : "Load more"}
+                            </button>
+                        )}
                     </div>
                 )}
             </main>
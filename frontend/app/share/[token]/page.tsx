@@ -97,6 +97,27 @@ export default function SharePage({ params }: { params: Promise<{ token: string
         ws.onmessage = (event) => {
             try {
                 const data = JSON.parse(event.data);
+
+                // Late join: everything so far arrives as one snapshot frame
+                if (data.type === "snapshot") {
+                    const finals: { transcript: string; confidence: number; start: number; end: number }[] = data.finals || [];
+                    setRecording(prev => {
+                        if (!prev) return null;
+                        return {
+                            ...prev,
+                            transcripts: finals.map(f => ({
+                                id: crypto.randomUUID(),
+                                text: f.transcript,
+                                start_time: f.start,
+                                end_time: f.end,
+                                confidence: f.confidence
+                            }))
+                        };
+                    });
+                    setInterimText(data.interim ? data.interim.transcript : "");
+                    return;
+                }
+
                 const { transcript, is_final, confidence } = data;
 
                 if (transcript) {
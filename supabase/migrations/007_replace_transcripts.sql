@@ -0,0 +1,31 @@
+-- Atomically replace all transcript segments of a recording in one call.
+-- transcripts has no DELETE policy for users, so this runs as SECURITY DEFINER
+-- and checks ownership itself (same helper the live_shares policy uses).
+
+CREATE OR REPLACE FUNCTION public.replace_transcripts(p_recording_id UUID, p_segments JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  inserted INTEGER;
+BEGIN
+  IF NOT is_recording_owner(p_recording_id) THEN
+    RAISE EXCEPTION 'Access denied' USING ERRCODE = '42501';
+  END IF;
+
+  DELETE FROM transcripts WHERE recording_id = p_recording_id;
+
+  INSERT INTO transcripts (recording_id, text, start_time, end_time, confidence, is_final)
+  SELECT p_recording_id, s.text, s.start_time, s.end_time, s.confidence, COALESCE(s.is_final, true)
+  FROM jsonb_to_recordset(p_segments)
+    AS s(text TEXT, start_time REAL, end_time REAL, confidence REAL, is_final BOOLEAN);
+
+  GET DIAGNOSTICS inserted = ROW_COUNT;
+  RETURN inserted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.replace_transcripts(UUID, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.replace_transcripts(UUID, JSONB) TO authenticated;
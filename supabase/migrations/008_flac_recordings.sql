@@ -0,0 +1,4 @@
+-- Allow server-side FLAC recordings in the recordings bucket
+UPDATE storage.buckets
+SET allowed_mime_types = ARRAY['audio/wav', 'audio/mpeg', 'audio/webm', 'audio/ogg', 'audio/flac']
+WHERE id = 'recordings';
@@ -0,0 +1,7 @@
+-- Live sessions upload audio as FLAC segments plus a JSON manifest:
+--   {user_id}/{recording_id}/segments/00000.flac ...
+--   {user_id}/{recording_id}/manifest.json
+-- The existing per-user folder policies already cover these paths.
+UPDATE storage.buckets
+SET allowed_mime_types = ARRAY['audio/wav', 'audio/mpeg', 'audio/webm', 'audio/ogg', 'audio/flac', 'application/json']
+WHERE id = 'recordings';
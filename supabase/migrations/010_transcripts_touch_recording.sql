@@ -0,0 +1,48 @@
+-- Bump recordings.updated_at whenever a recording's transcripts change.
+-- The API caches rendered transcript responses per (recording id, updated_at),
+-- so every transcript write has to produce a new version. Statement-level
+-- triggers with transition tables touch each recording once per statement,
+-- not once per inserted segment.
+
+CREATE OR REPLACE FUNCTION public.touch_recordings_from_new_transcripts()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE recordings SET updated_at = NOW()
+  WHERE id IN (SELECT DISTINCT recording_id FROM new_transcripts);
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.touch_recordings_from_old_transcripts()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE recordings SET updated_at = NOW()
+  WHERE id IN (SELECT DISTINCT recording_id FROM old_transcripts);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS transcripts_insert_touch_recording ON transcripts;
+CREATE TRIGGER transcripts_insert_touch_recording
+  AFTER INSERT ON transcripts
+  REFERENCING NEW TABLE AS new_transcripts
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.touch_recordings_from_new_transcripts();
+
+DROP TRIGGER IF EXISTS transcripts_update_touch_recording ON transcripts;
+CREATE TRIGGER transcripts_update_touch_recording
+  AFTER UPDATE ON transcripts
+  REFERENCING NEW TABLE AS new_transcripts
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.touch_recordings_from_new_transcripts();
+
+DROP TRIGGER IF EXISTS transcripts_delete_touch_recording ON transcripts;
+CREATE TRIGGER transcripts_delete_touch_recording
+  AFTER DELETE ON transcripts
+  REFERENCING OLD TABLE AS old_transcripts
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.touch_recordings_from_old_transcripts();
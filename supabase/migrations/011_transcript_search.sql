@@ -0,0 +1,71 @@
+-- Full-text search over a user's transcripts.
+-- search_vector is a stored generated column, so every insert path (bulk
+-- insert, replace_transcripts) keeps it current without extra work, and the
+-- GIN index answers `search_vector @@ query` without touching the heap for
+-- non-matching segments. API selects name their transcript columns, so the
+-- vector itself is never sent to clients.
+
+ALTER TABLE transcripts
+  ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+  GENERATED ALWAYS AS (to_tsvector('english', text)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_transcripts_search ON transcripts USING GIN (search_vector);
+
+COMMENT ON COLUMN transcripts.search_vector IS 'English tsvector of text for full-text search (generated)';
+
+-- Ranked, keyset-paginated matches across the caller's own recordings.
+-- Pages are ordered by (rank DESC, id DESC); pass the last row's rank and id
+-- back as p_after_rank / p_after_id for the next page. Runs as the caller so
+-- RLS still applies; the explicit user_id filter keeps other people's
+-- publicly shared transcripts out of the results. Snippets are only built
+-- for the rows on the page, with the text HTML-escaped before <mark> tags
+-- are added.
+
+CREATE OR REPLACE FUNCTION public.search_transcripts(
+  p_query TEXT,
+  p_limit INTEGER DEFAULT 20,
+  p_after_rank REAL DEFAULT NULL,
+  p_after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+  id UUID,
+  recording_id UUID,
+  recording_title TEXT,
+  start_time REAL,
+  end_time REAL,
+  rank REAL,
+  snippet TEXT
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  WITH q AS (
+    SELECT websearch_to_tsquery('english', p_query) AS query
+  ),
+  page AS (
+    SELECT t.id, t.recording_id, r.title, t.text, t.start_time, t.end_time,
+           ts_rank_cd(t.search_vector, q.query) AS rank
+    FROM transcripts t
+    JOIN recordings r ON r.id = t.recording_id
+    CROSS JOIN q
+    WHERE t.search_vector @@ q.query
+      AND r.user_id = auth.uid()
+      AND (p_after_rank IS NULL
+           OR (ts_rank_cd(t.search_vector, q.query), t.id) < (p_after_rank, p_after_id))
+    ORDER BY rank DESC, t.id DESC
+    LIMIT LEAST(GREATEST(p_limit, 1), 201)
+  )
+  SELECT page.id, page.recording_id, page.title, page.start_time, page.end_time, page.rank,
+         ts_headline(
+           'english',
+           replace(replace(replace(page.text, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'),
+           q.query,
+           'StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "'
+         )
+  FROM page CROSS JOIN q
+  ORDER BY page.rank DESC, page.id DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.search_transcripts(TEXT, INTEGER, REAL, UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.search_transcripts(TEXT, INTEGER, REAL, UUID) TO authenticated;
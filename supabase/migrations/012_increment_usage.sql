@@ -0,0 +1,64 @@
+-- Atomic, idempotent usage accounting.
+-- The backend used to read profiles.usage_seconds, add the session length in
+-- Python and write the sum back, so two sessions of the same user finishing
+-- together could lose one of the increments. increment_usage() does the
+-- addition in a single UPDATE instead.
+--
+-- A live session can be saved more than once (explicit stop, then an
+-- auto-save when the socket drops with more audio), and each save reports
+-- the session's running total. usage_sessions remembers how much of every
+-- session has already been counted, so a repeated call only adds the
+-- difference and a retried call adds nothing.
+
+CREATE TABLE IF NOT EXISTS usage_sessions (
+  session_id TEXT PRIMARY KEY,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  seconds INTEGER NOT NULL DEFAULT 0 CHECK (seconds >= 0),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_sessions_user ON usage_sessions(user_id);
+
+-- Only the service role (which bypasses RLS) reads or writes this table
+ALTER TABLE usage_sessions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.increment_usage(p_user_id UUID, p_seconds INTEGER, p_session_id TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  counted INTEGER;
+  delta INTEGER;
+  total INTEGER;
+BEGIN
+  -- Lock (or create) the session's row so concurrent saves of one session serialize
+  INSERT INTO usage_sessions (session_id, user_id, seconds)
+  VALUES (p_session_id, p_user_id, 0)
+  ON CONFLICT (session_id) DO NOTHING;
+
+  SELECT seconds INTO counted FROM usage_sessions
+  WHERE session_id = p_session_id AND user_id = p_user_id
+  FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Session % belongs to another user', p_session_id USING ERRCODE = '42501';
+  END IF;
+
+  delta := GREATEST(COALESCE(p_seconds, 0) - counted, 0);
+  IF delta > 0 THEN
+    UPDATE usage_sessions SET seconds = counted + delta, updated_at = NOW()
+    WHERE session_id = p_session_id;
+    UPDATE profiles SET usage_seconds = COALESCE(usage_seconds, 0) + delta
+    WHERE id = p_user_id
+    RETURNING usage_seconds INTO total;
+  ELSE
+    SELECT usage_seconds INTO total FROM profiles WHERE id = p_user_id;
+  END IF;
+  RETURN total;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.increment_usage(UUID, INTEGER, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.increment_usage(UUID, INTEGER, TEXT) TO service_role;